@@ -5,6 +5,7 @@ This package contains the persistent server components including:
 - SQLAlchemy models (User, Listing, Vote, Comment, Commute)
 - Authentication helpers (JWT, password hashing)
 - Database connection management
+- Keyset-paginated listings query API (server.py)
 - Alembic migrations
 """
 
@@ -0,0 +1,32 @@
+"""Add sync_watermarks for incremental JSON sync
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per JSON source file: the state it was last synced at
+    op.create_table(
+        'sync_watermarks',
+        sa.Column('source', sa.String(500), primary_key=True),
+        sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('content_hash', sa.String(64), nullable=False),
+        sa.Column('synced_at', sa.TIMESTAMP(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('sync_watermarks')
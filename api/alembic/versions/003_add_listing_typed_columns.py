@@ -0,0 +1,184 @@
+"""Add normalised, indexed listing columns
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = [
+    sa.Column('suburb', sa.String(100), nullable=True),
+    sa.Column('price_min', sa.Integer(), nullable=True),
+    sa.Column('price_max', sa.Integer(), nullable=True),
+    sa.Column('land_size_m2', sa.Float(), nullable=True),
+    sa.Column('lat', sa.Float(), nullable=True),
+    sa.Column('lng', sa.Float(), nullable=True),
+    sa.Column('travel_seconds', sa.Integer(), nullable=True),
+]
+
+INDEXES = [
+    ('idx_listing_workflow_travel', ['workflow_status', 'travel_seconds', 'id']),
+    ('idx_listing_status_travel', ['status', 'travel_seconds', 'id']),
+    ('idx_listing_suburb_travel', ['suburb', 'travel_seconds']),
+    ('idx_listing_bedrooms_price', ['bedrooms', 'price_min']),
+    ('idx_listing_lat_lng', ['lat', 'lng']),
+]
+
+BACKFILL_BATCH = 1000
+
+
+# The backfill parses raw_data with a frozen copy of api/listing_fields.py as
+# of this revision, so later changes there don't change what this migration does.
+_AMOUNT = r'(\d[\d,]*(?:\.\d+)?)\s*(k|m(?:il(?:lion)?)?)?\b'
+PRICE_RE = re.compile(r'\$\s*' + _AMOUNT + r'(?:\s*(?:-|–|to)\s*\$?\s*' + _AMOUNT + r')?', re.I)
+LAND_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(m²|m2|sqm|sq\.?\s*m|square met(?:re|er)s|ha|hectares?|acres?)', re.I)
+SUBURB_RE = re.compile(r',\s*([^,]+?)\s+[A-Z]{2,3}\s+\d{4}\s*$')
+MIN_PRICE = 10000
+
+
+def _int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    m = re.search(r'\d+', str(value or ''))
+    return int(m.group(0)) if m else None
+
+
+def _float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _amount(number, suffix):
+    value = float(number.replace(',', ''))
+    suffix = (suffix or '').lower()
+    if suffix == 'k':
+        value *= 1_000
+    elif suffix.startswith('m'):
+        value *= 1_000_000
+    return int(round(value))
+
+
+def _price_range(text):
+    m = PRICE_RE.search(text or '')
+    if not m:
+        return None, None
+    low_number, low_suffix, high_number, high_suffix = m.groups()
+    if high_number and not low_suffix:
+        low_suffix = high_suffix
+    low = _amount(low_number, low_suffix)
+    high = _amount(high_number, high_suffix) if high_number else low
+    if low < MIN_PRICE:
+        return None, None
+    return low, max(high, low)
+
+
+def _land_size(text):
+    m = LAND_RE.search(text or '')
+    if not m:
+        return None
+    value = float(m.group(1).replace(',', ''))
+    unit = m.group(2).lower()
+    if unit in ('ha', 'hectare', 'hectares'):
+        value *= 10_000
+    elif unit.startswith('acre'):
+        value *= 4046.86
+    return round(value, 1)
+
+
+def _suburb(data):
+    if data.get('suburb'):
+        return data['suburb']
+    m = SUBURB_RE.search(data.get('address') or '')
+    return m.group(1).strip() if m else None
+
+
+def _coords(data):
+    lat, lng = _float(data.get('lat')), _float(data.get('lng'))
+    if lat is not None and lng is not None:
+        return lat, lng
+    try:
+        transit = data.get('google_transit') or {}
+        response = transit.get('response') or transit.get('raw_response') or {}
+        start = response['routes'][0]['legs'][0].get('start_location') or {}
+        return _float(start.get('lat')), _float(start.get('lng'))
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return None, None
+
+
+def normalised_fields(data):
+    price_min, price_max = _price_range(data.get('price'))
+    lat, lng = _coords(data)
+    return {
+        'suburb': _suburb(data),
+        'bedrooms': _int(data.get('bedrooms')),
+        'bathrooms': _int(data.get('bathrooms')),
+        'price_min': price_min,
+        'price_max': price_max,
+        'land_size_m2': _land_size(data.get('property_size') or data.get('land_size')),
+        'lat': lat,
+        'lng': lng,
+        'travel_seconds': _int(data.get('travel_duration_seconds')),
+    }
+
+
+def upgrade():
+    for column in NEW_COLUMNS:
+        op.add_column('listings', column)
+
+    # Fill the new columns (and re-parse bedrooms/bathrooms) from raw_data
+    listings = sa.table(
+        'listings',
+        sa.column('id', sa.Integer),
+        sa.column('raw_data', sa.JSON),
+        *[sa.column(c.name, c.type) for c in NEW_COLUMNS],
+        sa.column('bedrooms', sa.Integer),
+        sa.column('bathrooms', sa.Integer),
+    )
+    bind = op.get_bind()
+    update = (
+        listings.update()
+        .where(listings.c.id == sa.bindparam('listing_id'))
+        .values({name: sa.bindparam(f'new_{name}') for name in ['bedrooms', 'bathrooms'] + [c.name for c in NEW_COLUMNS]})
+    )
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(listings.c.id, listings.c.raw_data)
+            .where(listings.c.id > last_id)
+            .order_by(listings.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not batch:
+            break
+        rows = []
+        for listing_id, raw in batch:
+            row = {f'new_{name}': value for name, value in normalised_fields(raw or {}).items()}
+            row['listing_id'] = listing_id
+            rows.append(row)
+        bind.execute(update, rows)
+        last_id = batch[-1][0]
+
+    for name, columns in INDEXES:
+        op.create_index(name, 'listings', columns)
+
+
+def downgrade():
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='listings')
+    for column in NEW_COLUMNS:
+        op.drop_column('listings', column.name)
@@ -13,3 +13,10 @@ JWT_REFRESH_TOKEN_EXPIRE_DAYS = 30
 
 # Data directory for legacy JSON files (used during import)
 DATA_DIR = Path(__file__).parent.parent / 'backend'
+
+# Listings query API (api/server.py)
+API_HOST = os.getenv('API_HOST', '0.0.0.0')
+API_PORT = int(os.getenv('API_PORT', '8000'))
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '100'))
+COUNTS_CACHE_SECONDS = float(os.getenv('COUNTS_CACHE_SECONDS', '30'))
@@ -0,0 +1,116 @@
+"""Normalised listing fields parsed from the scraped listing JSON.
+
+Domain's text fields ('Guide $1.1m - $1.2m', '650m²', '3') become numbers so
+the `listings` table can filter and sort on indexed columns instead of
+digging through `raw_data`.
+"""
+import re
+
+_AMOUNT = r'(\d[\d,]*(?:\.\d+)?)\s*(k|m(?:il(?:lion)?)?)?\b'
+PRICE_RE = re.compile(r'\$\s*' + _AMOUNT + r'(?:\s*(?:-|–|to)\s*\$?\s*' + _AMOUNT + r')?', re.I)
+LAND_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(m²|m2|sqm|sq\.?\s*m|square met(?:re|er)s|ha|hectares?|acres?)', re.I)
+SUBURB_RE = re.compile(r',\s*([^,]+?)\s+[A-Z]{2,3}\s+\d{4}\s*$')
+
+# anything below this is a weekly rent or a stray number, not a sale price
+MIN_PRICE = 10000
+
+
+def parse_int(value):
+    """'3' / 3 / '3+' -> 3, otherwise None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    m = re.search(r'\d+', str(value or ''))
+    return int(m.group(0)) if m else None
+
+
+def parse_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _amount(number, suffix):
+    value = float(number.replace(',', ''))
+    suffix = (suffix or '').lower()
+    if suffix == 'k':
+        value *= 1_000
+    elif suffix.startswith('m'):
+        value *= 1_000_000
+    return int(round(value))
+
+
+def parse_price_range(text):
+    """'$1.1m - $1.25m' / 'Guide $950k' / 'Sold $1,200,000' -> (min, max) in dollars.
+
+    A single amount gives min == max; text without one ('Auction',
+    'Contact agent') gives (None, None).
+    """
+    m = PRICE_RE.search(text or '')
+    if not m:
+        return None, None
+    low_number, low_suffix, high_number, high_suffix = m.groups()
+    if high_number and not low_suffix:
+        low_suffix = high_suffix  # '$1.1 - 1.2m'
+    low = _amount(low_number, low_suffix)
+    high = _amount(high_number, high_suffix) if high_number else low
+    if low < MIN_PRICE:
+        return None, None
+    if high < low:
+        high = low
+    return low, high
+
+
+def parse_land_size(text):
+    """'650m²' / '1,012 sqm' / '0.4 ha' / '1 acre' -> square metres, or None."""
+    m = LAND_RE.search(text or '')
+    if not m:
+        return None
+    value = float(m.group(1).replace(',', ''))
+    unit = m.group(2).lower()
+    if unit in ('ha', 'hectare', 'hectares'):
+        value *= 10_000
+    elif unit.startswith('acre'):
+        value *= 4046.86
+    return round(value, 1)
+
+
+def listing_suburb(data):
+    """The listing's suburb, from step 4's field or else its address."""
+    if data.get('suburb'):
+        return data['suburb']
+    m = SUBURB_RE.search(data.get('address') or '')
+    return m.group(1).strip() if m else None
+
+
+def listing_coords(data):
+    """(lat, lng) as written by step 3, else the start of its transit route."""
+    lat, lng = parse_float(data.get('lat')), parse_float(data.get('lng'))
+    if lat is not None and lng is not None:
+        return lat, lng
+    try:
+        transit = data.get('google_transit') or {}
+        response = transit.get('response') or transit.get('raw_response') or {}
+        start = response['routes'][0]['legs'][0].get('start_location') or {}
+        return parse_float(start.get('lat')), parse_float(start.get('lng'))
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return None, None
+
+
+def normalised_fields(data):
+    """Typed column values for one listing's JSON."""
+    price_min, price_max = parse_price_range(data.get('price'))
+    lat, lng = listing_coords(data)
+    return {
+        'suburb': listing_suburb(data),
+        'bedrooms': parse_int(data.get('bedrooms')),
+        'bathrooms': parse_int(data.get('bathrooms')),
+        'price_min': price_min,
+        'price_max': price_max,
+        'land_size_m2': parse_land_size(data.get('property_size') or data.get('land_size')),
+        'lat': lat,
+        'lng': lng,
+        'travel_seconds': parse_int(data.get('travel_duration_seconds')),
+    }
@@ -0,0 +1,234 @@
+"""Listing search over Postgres: the frontend's `/api/listings` filters as one query.
+
+Pages are keyset-paginated. Each response carries an opaque `cursor` holding
+the last row's sort key `(travel_seconds, id)` (or `id` when unsorted), and
+the next page starts strictly after it. With sort=travel every workflow
+status is read as its own range of `idx_listing_workflow_travel`, seeking
+straight to the cursor, and the ranges are merged, so a deep page costs the
+same as the first one. The unfiltered totals shown alongside come from a
+separate grouped count that is cached for a few seconds.
+"""
+import base64
+import heapq
+import json
+import threading
+import time
+
+from sqlalchemy import and_, case, func, or_, select, tuple_
+from sqlalchemy.orm import aliased
+
+from .models import Comment, Listing, User, Vote
+
+SORTS = ('travel', 'none')
+EXCLUDE_MODES = ('none', 'tom', 'mq', 'either')
+VOTE_FILTERS = ('any', 'yes', 'no')
+
+
+def encode_cursor(sort, listing):
+    key = [sort, listing.travel_seconds, listing.id] if sort == 'travel' else [sort, listing.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor, sort):
+    """The sort key after which the next page starts; ValueError if it is malformed."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError('invalid cursor')
+    if not isinstance(key, list) or not key or key[0] != sort:
+        raise ValueError('cursor does not match sort')
+    if sort == 'travel' and len(key) == 3 and isinstance(key[2], int) and (key[1] is None or isinstance(key[1], int)):
+        return key[1], key[2]
+    if sort != 'travel' and len(key) == 2 and isinstance(key[1], int):
+        return key[1]
+    raise ValueError('invalid cursor')
+
+
+def user_ids(db):
+    """{'tom': id, 'mq': id}; a missing user maps to -1 so its vote joins match nothing."""
+    found = dict(db.execute(select(User.username, User.id).where(User.username.in_(['tom', 'mq']))).all())
+    return {name: found.get(name, -1) for name in ('tom', 'mq')}
+
+
+def _vote_filter(vote, mode):
+    if mode == 'yes':
+        return vote.value.is_(True)
+    if mode == 'no':
+        return vote.value.is_(False)
+    return None
+
+
+def listing_page(db, filters, limit, cursor=None):
+    """One page of listings matching `filters`; returns (rows, next_cursor).
+
+    `filters` is the dict built by server.listing_filters(). Each row is a
+    (Listing, Tom's Vote or None, MQ's Vote or None) tuple.
+    """
+    users = user_ids(db)
+    tom_vote = aliased(Vote)
+    mq_vote = aliased(Vote)
+    stmt = (
+        select(Listing, tom_vote, mq_vote)
+        .outerjoin(tom_vote, and_(tom_vote.listing_id == Listing.id, tom_vote.user_id == users['tom']))
+        .outerjoin(mq_vote, and_(mq_vote.listing_id == Listing.id, mq_vote.user_id == users['mq']))
+    )
+
+    if filters['status'] == 'sold':
+        stmt = stmt.where(Listing.status == 'sold')
+    elif filters['status'] == 'available':
+        stmt = stmt.where(or_(Listing.status != 'sold', Listing.status.is_(None)))
+
+    for vote, mode in ((tom_vote, filters['tom']), (mq_vote, filters['mq'])):
+        condition = _vote_filter(vote, mode)
+        if condition is not None:
+            stmt = stmt.where(condition)
+
+    # a missing vote row and a vote without a yes/no both count as not voted
+    exclude = filters['exclude_voted_mode']
+    if exclude in ('tom', 'either'):
+        stmt = stmt.where(tom_vote.value.is_(None))
+    if exclude in ('mq', 'either'):
+        stmt = stmt.where(mq_vote.value.is_(None))
+
+    if filters['travel_max'] is not None:
+        stmt = stmt.where(Listing.travel_seconds <= filters['travel_max'] * 60)
+    if filters['suburbs']:
+        stmt = stmt.where(Listing.suburb.in_(filters['suburbs']))
+    if filters['search']:
+        stmt = stmt.where(func.lower(Listing.address).contains(filters['search'].lower(), autoescape=True))
+
+    sort = filters['sort']
+    if sort == 'travel':
+        key = decode_cursor(cursor, sort) if cursor else None
+        rows = _travel_rows(db, stmt, filters['workflow_statuses'], limit + 1, key)
+    else:
+        stmt = stmt.where(Listing.workflow_status.in_(filters['workflow_statuses'])).order_by(Listing.id.asc())
+        if cursor:
+            stmt = stmt.where(Listing.id > decode_cursor(cursor, sort))
+        rows = db.execute(stmt.limit(limit + 1)).all()
+
+    next_cursor = encode_cursor(sort, rows[limit - 1][0]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _travel_key(row):
+    listing = row[0]
+    return (listing.travel_seconds is None, listing.travel_seconds or 0, listing.id)
+
+
+def _travel_rows(db, stmt, statuses, count, key):
+    """Up to `count` rows after `key` in (travel_seconds NULLS LAST, id) order.
+
+    Each status is paged on its own: listings with a travel time by a seek on
+    `(travel_seconds, id) > key`, then, once those run out, listings without
+    one in id order. An OR across the two segments or an IN over the statuses
+    would stop the index from being used for the seek and the ordering.
+    """
+    travel, last_id = key if key else (None, None)
+    segments = []
+    for status in dict.fromkeys(statuses):
+        ranged = stmt.where(Listing.workflow_status == status)
+        rows = []
+        if key is None or travel is not None:
+            timed = ranged.where(Listing.travel_seconds.is_not(None))
+            if key is not None:
+                timed = timed.where(tuple_(Listing.travel_seconds, Listing.id) > tuple_(travel, last_id))
+            rows = db.execute(timed.order_by(Listing.travel_seconds, Listing.id).limit(count)).all()
+        if len(rows) < count:
+            untimed = ranged.where(Listing.travel_seconds.is_(None))
+            if key is not None and travel is None:
+                untimed = untimed.where(Listing.id > last_id)
+            rows += db.execute(untimed.order_by(Listing.id).limit(count - len(rows))).all()
+        segments.append(rows)
+    return list(heapq.merge(*segments, key=_travel_key))[:count]
+
+
+def latest_comments(db, listing_ids, per_listing=3):
+    """{listing id: [comment, ...]} newest first, at most `per_listing` each."""
+    comments = {}
+    if not listing_ids:
+        return comments
+    stmt = (
+        select(Comment.listing_id, Comment.id, Comment.text, Comment.created_at, User.username)
+        .join(User, User.id == Comment.user_id)
+        .where(Comment.listing_id.in_(listing_ids))
+        .order_by(Comment.listing_id, Comment.created_at.desc())
+    )
+    for listing_id, comment_id, text, created_at, username in db.execute(stmt):
+        entries = comments.setdefault(listing_id, [])
+        if len(entries) < per_listing:
+            entries.append({
+                'id': comment_id,
+                'person': username,
+                'text': text,
+                'ts': created_at.timestamp() if created_at else None,
+            })
+    return comments
+
+
+def _carousel_images(data):
+    """Listing photos without agent portraits, logos or SVGs (as the frontend filters them)."""
+    urls = [u for u in (data.get('image_urls') or []) if u]
+    photos = [u for u in urls if not any(skip in u.lower() for skip in ('contact', 'logo', 'svg'))]
+    return photos or urls
+
+
+def listing_summary(listing, tom_vote, mq_vote, comments):
+    """The frontend's listing summary shape, from the columns plus raw_data."""
+    data = listing.raw_data or {}
+    images = listing.images or _carousel_images(data)
+    return {
+        'id': listing.external_id,
+        'address': listing.address,
+        'suburb': listing.suburb,
+        'bedrooms': listing.bedrooms,
+        'bathrooms': listing.bathrooms,
+        'price': listing.price,
+        'price_min': listing.price_min,
+        'price_max': listing.price_max,
+        'land_size_m2': listing.land_size_m2,
+        'travel_duration_text': data.get('travel_duration_text'),
+        'travel_duration_seconds': listing.travel_seconds,
+        'status': listing.status or 'unknown',
+        'property_type': listing.property_type,
+        'image': listing.image or (images[0] if images else None),
+        'images': images,
+        'url': listing.url or data.get('url'),
+        'google_maps_url': data.get('google_maps_url'),
+        'route_summary': data.get('route_summary'),
+        'lat': listing.lat,
+        'lng': listing.lng,
+        'inspections': data.get('inspections', []),
+        'auctions': data.get('auctions', []),
+        'workflow_status': listing.workflow_status,
+        'tom': tom_vote.value if tom_vote else None,
+        'mq': mq_vote.value if mq_vote else None,
+        'tom_score': tom_vote.score if tom_vote else None,
+        'mq_score': mq_vote.score if mq_vote else None,
+        'comments': comments,
+    }
+
+
+class CountsCache:
+    """Unfiltered total/available/sold counts, recomputed at most every `ttl` seconds."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = None
+        self._computed_at = 0.0
+
+    def get(self, db):
+        with self._lock:
+            if self._counts is not None and time.monotonic() - self._computed_at < self.ttl:
+                return self._counts
+            total, sold = db.execute(
+                select(func.count(Listing.id), func.coalesce(func.sum(case((Listing.status == 'sold', 1), else_=0)), 0))
+            ).one()
+            self._counts = {'total': total, 'available': total - sold, 'sold': sold}
+            self._computed_at = time.monotonic()
+            return self._counts
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
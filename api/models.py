@@ -1,7 +1,7 @@
 """SQLAlchemy models for housefinder application."""
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Boolean, Text, TIMESTAMP, 
+    Column, Integer, BigInteger, Float, String, Boolean, Text, TIMESTAMP, 
     ForeignKey, Index, JSON, CheckConstraint
 )
 from sqlalchemy.orm import relationship
@@ -35,9 +35,16 @@ class Listing(Base):
     id = Column(Integer, primary_key=True, index=True)
     external_id = Column(String(100), unique=True, nullable=False, index=True)  # Domain listing ID
     address = Column(String(500))
-    price = Column(String(100))
+    suburb = Column(String(100))
+    price = Column(String(100))  # Domain price text, e.g. "Guide $1.1m - $1.2m"
+    price_min = Column(Integer)  # Parsed from price (dollars)
+    price_max = Column(Integer)
     bedrooms = Column(Integer)
     bathrooms = Column(Integer)
+    land_size_m2 = Column(Float)
+    lat = Column(Float)
+    lng = Column(Float)
+    travel_seconds = Column(Integer)  # Commute time from step 3
     property_type = Column(String(100), index=True)
     url = Column(String(1000))
     image = Column(String(1000))  # Primary image
@@ -56,6 +63,11 @@ class Listing(Base):
     # Indexes
     __table_args__ = (
         Index('idx_listing_status_created', 'status', 'created_at'),
+        Index('idx_listing_workflow_travel', 'workflow_status', 'travel_seconds', 'id'),
+        Index('idx_listing_status_travel', 'status', 'travel_seconds', 'id'),
+        Index('idx_listing_suburb_travel', 'suburb', 'travel_seconds'),
+        Index('idx_listing_bedrooms_price', 'bedrooms', 'price_min'),
+        Index('idx_listing_lat_lng', 'lat', 'lng'),
     )
     
     def __repr__(self):
@@ -129,3 +141,17 @@ class Commute(Base):
     
     def __repr__(self):
         return f"<Commute(id={self.id}, listing_id={self.listing_id}, travel_seconds={self.travel_seconds})>"
+
+
+class SyncWatermark(Base):
+    """Last synced state of each JSON source file (see scripts/sync_json_to_pg.py)."""
+    __tablename__ = 'sync_watermarks'
+    
+    source = Column(String(500), primary_key=True)  # Path relative to the data directory
+    mtime_ns = Column(BigInteger, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_hash = Column(String(64), nullable=False)  # sha256 of the file contents
+    synced_at = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<SyncWatermark(source='{self.source}', size={self.size})>"
@@ -5,18 +5,42 @@ This script migrates:
 - Votes from backend/votes.json (mapped to Tom/MQ users)
 - Comments from listings (mapped to Tom/MQ users)
 - Commute data from backend/commute/*.json
+
+Rows are written set-based: existing keys are fetched in one query per table,
+then rows go in as multi-row `INSERT ... ON CONFLICT DO UPDATE` statements,
+committed every `--batch-size` rows (default `IMPORT_BATCH_SIZE`, 1000).
+Re-running refreshes existing rows instead of skipping them.
+
+Listing and commute files are decoded and turned into rows by a pool of
+`--workers` processes (default `IMPORT_WORKERS`, one per core), in order,
+while this process writes the batches: each file is parsed once and
+decoding overlaps the database writes.
+
+    python -m api.scripts.import_json_to_pg [--batch-size N] [--workers N]
 """
+import argparse
+import os
 import sys
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from datetime import datetime
 
+from sqlalchemy import bindparam, insert, select, update
+
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from api.database import SessionLocal, engine, Base
 from api.models import User, Listing, Vote, Comment, Commute
 from api.config import DATA_DIR
+from api.listing_fields import normalised_fields
+from backend.vote_events import replay_journal
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', str(os.cpu_count() or 1)))
 
 
 def load_json_file(filepath):
@@ -29,306 +53,391 @@ def load_json_file(filepath):
         return None
 
 
+def load_votes(votes_path):
+    """votes.json plus the frontend's pending votes.journal events."""
+    votes = load_json_file(votes_path) or {}
+    journal = votes_path.with_suffix('.journal')
+    if journal.exists():
+        replay_journal(votes, journal.read_bytes())
+    return votes
+
+
 def get_user_by_username(db, username):
     """Get user by username."""
     return db.query(User).filter(User.username == username.lower()).first()
 
 
-def import_listings(db, listings_dir):
-    """Import all listings from JSON files."""
+def upsert_statement(db, model, conflict_cols, update_cols):
+    """Multi-row INSERT ... ON CONFLICT (conflict_cols) DO UPDATE for the session's dialect."""
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise RuntimeError(f"Bulk upsert not supported for {dialect}")
+    stmt = dialect_insert(model.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=conflict_cols,
+        set_={col: stmt.excluded[col] for col in update_cols},
+    )
+
+
+def write_batches(db, stmt, rows, batch_size):
+    """Execute stmt over rows, committing every batch_size rows."""
+    for start in range(0, len(rows), batch_size):
+        db.execute(stmt, rows[start:start + batch_size])
+        db.commit()
+
+
+def report(label, new_count, updated_count, started, detail=None):
+    """Print row counts and throughput for one table."""
+    elapsed = time.monotonic() - started
+    total = new_count + updated_count
+    rate = total / elapsed if elapsed > 0 else 0
+    detail = detail or f"{updated_count} updated"
+    print(f"  ✓ {label}: {new_count} new, {detail} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+
+def listing_row(external_id, data, now):
+    """`listings` row for one listing file, with its normalised columns."""
+    row = {
+        'external_id': external_id,
+        'address': data.get('address'),
+        'price': data.get('price'),
+        'property_type': data.get('property_type'),
+        'url': data.get('url'),
+        'image': data.get('image'),
+        'images': data.get('images', []),
+        'status': data.get('status', 'available'),
+        'raw_data': data,
+        'created_at': now,
+        'updated_at': now,
+    }
+    row.update(normalised_fields(data))
+    return row
+
+
+def listing_upsert(db):
+    return upsert_statement(db, Listing, ['external_id'], [
+        'address', 'suburb', 'price', 'price_min', 'price_max', 'bedrooms',
+        'bathrooms', 'land_size_m2', 'lat', 'lng', 'travel_seconds',
+        'property_type', 'url', 'image', 'images', 'status', 'raw_data', 'updated_at',
+    ])
+
+
+def vote_rows(votes_data, listing_map, users, now):
+    """`votes` rows for each of Tom's and MQ's votes on a known listing."""
+    rows = []
+    for external_id, vote_data in votes_data.items():
+        listing_id = listing_map.get(external_id)
+        if not listing_id:
+            continue
+        for person, user in users.items():
+            if person in vote_data or f'{person}_score' in vote_data:
+                rows.append({
+                    'listing_id': listing_id,
+                    'user_id': user.id,
+                    'value': vote_data.get(person),
+                    'score': vote_data.get(f'{person}_score'),
+                    'created_at': now,
+                    'updated_at': now,
+                })
+    return rows
+
+
+def vote_upsert(db):
+    return upsert_statement(db, Vote, ['listing_id', 'user_id'], ['value', 'score', 'updated_at'])
+
+
+def update_workflow_statuses(db, votes_data, listing_map, batch_size=IMPORT_BATCH_SIZE):
+    """Copy each vote record's workflow_status onto its listing; returns listings changed."""
+    current = dict(db.execute(select(Listing.id, Listing.workflow_status)).all())
+    rows = []
+    for external_id, vote_data in votes_data.items():
+        listing_id = listing_map.get(external_id)
+        status = vote_data.get('workflow_status', 'active')
+        if listing_id and current.get(listing_id) != status:
+            rows.append({'b_id': listing_id, 'b_status': status})
+    table = Listing.__table__
+    stmt = update(table).where(table.c.id == bindparam('b_id')).values(workflow_status=bindparam('b_status'))
+    write_batches(db, stmt, rows, batch_size)
+    return len(rows)
+
+
+def comment_row(listing_id, user, comment_data):
+    ts = comment_data.get('ts')
+    created_at = datetime.fromtimestamp(ts) if ts else datetime.utcnow()
+    return {
+        'listing_id': listing_id,
+        'user_id': user.id,
+        'text': comment_data.get('text', ''),
+        'created_at': created_at,
+        'updated_at': created_at,
+    }
+
+
+def commute_row(listing_id, data, now):
+    """`commutes` row for one commute file."""
+    commutes_data = data.get('commutes', [])
+    return {
+        'listing_id': listing_id,
+        'commutes_data': commutes_data,
+        'nearest_station': data.get('nearest_station'),
+        'travel_seconds': commute_travel_seconds(commutes_data),
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def commute_upsert(db):
+    return upsert_statement(db, Commute, ['listing_id'], ['commutes_data', 'nearest_station', 'travel_seconds', 'updated_at'])
+
+
+def decode_listing(path, now):
+    """Worker: (external_id, listings row, comments) for one listing file, or None."""
+    data = load_json_file(path)
+    if not data:
+        return None
+    external_id = path.stem  # filename without extension
+    return external_id, listing_row(external_id, data, now), data.get('comments') or []
+
+
+def decode_commute(path, now):
+    """Worker: (external_id, commutes row without listing_id) for one commute file, or None."""
+    data = load_json_file(path)
+    if not data:
+        return None
+    return path.stem, commute_row(None, data, now)
+
+
+def decoded(decode, paths, workers):
+    """Yield decode(path) for each path in order, decoding in `workers` processes."""
+    if workers <= 1 or len(paths) < 2:
+        yield from map(decode, paths)
+        return
+    chunksize = max(1, min(64, len(paths) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(decode, paths, chunksize=chunksize)
+
+
+def stream_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_listings(db, listings_dir, batch_size=IMPORT_BATCH_SIZE, workers=IMPORT_WORKERS):
+    """Upsert all listings; returns ({external_id: listing id}, {external_id: comments})."""
     print("\n📦 Importing listings...")
-    
     listings_path = Path(listings_dir)
     if not listings_path.exists():
         print(f"  ✗ Listings directory not found: {listings_dir}")
-        return {}
-    
-    json_files = list(listings_path.glob('*.json'))
-    print(f"  Found {len(json_files)} listing files")
-    
-    listing_map = {}  # external_id -> Listing object
-    imported_count = 0
-    skipped_count = 0
-    
-    for json_file in json_files:
-        data = load_json_file(json_file)
-        if not data:
-            continue
-        
-        external_id = json_file.stem  # filename without extension
-        
-        # Check if listing already exists
-        existing = db.query(Listing).filter(Listing.external_id == external_id).first()
-        if existing:
-            listing_map[external_id] = existing
-            skipped_count += 1
-            continue
-        
-        # Create new listing
-        listing = Listing(
-            external_id=external_id,
-            address=data.get('address'),
-            price=data.get('price'),
-            bedrooms=data.get('bedrooms'),
-            bathrooms=data.get('bathrooms'),
-            property_type=data.get('property_type'),
-            url=data.get('url'),
-            image=data.get('image'),
-            images=data.get('images', []),
-            status=data.get('status', 'available'),
-            raw_data=data
-        )
-        
-        db.add(listing)
-        listing_map[external_id] = listing
-        imported_count += 1
-    
-    db.commit()
-    print(f"  ✓ Imported {imported_count} new listings, skipped {skipped_count} existing")
-    return listing_map
-
-
-def import_votes(db, votes_file, listing_map):
-    """Import votes from votes.json."""
+        return dict(db.execute(select(Listing.external_id, Listing.id)).all()), {}
+    paths = sorted(listings_path.glob('*.json'))
+    print(f"  Found {len(paths)} listing files")
+    started = time.monotonic()
+
+    existing = set(db.scalars(select(Listing.external_id)))
+    stmt = listing_upsert(db)
+    comments = {}
+    new_count = updated_count = 0
+    results = (r for r in decoded(partial(decode_listing, now=datetime.utcnow()), paths, workers) if r)
+    for batch in stream_batches(results, batch_size):
+        db.execute(stmt, [row for _, row, _ in batch])
+        db.commit()
+        for external_id, _, listing_comments in batch:
+            if listing_comments:
+                comments[external_id] = listing_comments
+            if external_id in existing:
+                updated_count += 1
+            else:
+                new_count += 1
+
+    report('Listings', new_count, updated_count, started)
+    return dict(db.execute(select(Listing.external_id, Listing.id)).all()), comments
+
+
+def import_votes(db, votes_file, listing_map, batch_size=IMPORT_BATCH_SIZE):
+    """Upsert Tom's and MQ's votes from votes.json."""
     print("\n🗳️  Importing votes...")
-    
+
     votes_path = Path(votes_file)
-    if not votes_path.exists():
+    if not votes_path.exists() and not votes_path.with_suffix('.journal').exists():
         print(f"  ⚠ Votes file not found: {votes_file}")
         return
-    
-    votes_data = load_json_file(votes_path)
+
+    votes_data = load_votes(votes_path)
     if not votes_data:
         return
-    
+
     # Get Tom and MQ users
     tom = get_user_by_username(db, 'tom')
     mq = get_user_by_username(db, 'mq')
-    
+
     if not tom or not mq:
         print("  ✗ Error: Tom or MQ user not found. Run seed_users.py first!")
         return
-    
-    imported_count = 0
-    skipped_count = 0
-    
-    for external_id, vote_data in votes_data.items():
-        listing = listing_map.get(external_id)
-        if not listing:
-            continue
-        
-        # Import Tom's vote
-        if 'tom' in vote_data or 'tom_score' in vote_data:
-            existing_vote = db.query(Vote).filter(
-                Vote.listing_id == listing.id,
-                Vote.user_id == tom.id
-            ).first()
-            
-            if not existing_vote:
-                tom_vote = Vote(
-                    listing_id=listing.id,
-                    user_id=tom.id,
-                    value=vote_data.get('tom'),
-                    score=vote_data.get('tom_score')
-                )
-                db.add(tom_vote)
-                imported_count += 1
-            else:
-                skipped_count += 1
-        
-        # Import MQ's vote
-        if 'mq' in vote_data or 'mq_score' in vote_data:
-            existing_vote = db.query(Vote).filter(
-                Vote.listing_id == listing.id,
-                Vote.user_id == mq.id
-            ).first()
-            
-            if not existing_vote:
-                mq_vote = Vote(
-                    listing_id=listing.id,
-                    user_id=mq.id,
-                    value=vote_data.get('mq'),
-                    score=vote_data.get('mq_score')
-                )
-                db.add(mq_vote)
-                imported_count += 1
-            else:
-                skipped_count += 1
-    
-    db.commit()
-    print(f"  ✓ Imported {imported_count} votes, skipped {skipped_count} existing")
+
+    started = time.monotonic()
+    existing = set(db.execute(select(Vote.listing_id, Vote.user_id)).all())
+    now = datetime.utcnow()
+    rows = vote_rows(votes_data, listing_map, {'tom': tom, 'mq': mq}, now)
+    write_batches(db, vote_upsert(db), rows, batch_size)
+    new_count = sum(1 for row in rows if (row['listing_id'], row['user_id']) not in existing)
+    status_count = update_workflow_statuses(db, votes_data, listing_map, batch_size)
+    report('Votes', new_count, len(rows) - new_count, started,
+           detail=f"{len(rows) - new_count} updated, {status_count} workflow statuses changed")
 
 
-def import_comments(db, listings_dir, listing_map):
-    """Import comments from listing JSON files."""
+def import_comments(db, comments, listing_map, batch_size=IMPORT_BATCH_SIZE):
+    """Insert comments ({external_id: comments} from the listing files) not in the database yet."""
     print("\n💬 Importing comments...")
-    
+
     # Get Tom and MQ users
     tom = get_user_by_username(db, 'tom')
     mq = get_user_by_username(db, 'mq')
-    
+
     if not tom or not mq:
         print("  ✗ Error: Tom or MQ user not found. Run seed_users.py first!")
         return
-    
+
     user_map = {'tom': tom, 'mq': mq}
-    
-    imported_count = 0
+    started = time.monotonic()
+
+    # comments have no natural key; match on listing, user and text as before
+    seen = set(db.execute(select(Comment.listing_id, Comment.user_id, Comment.text)).all())
+    rows = []
     skipped_count = 0
-    
-    listings_path = Path(listings_dir)
-    for json_file in listings_path.glob('*.json'):
-        data = load_json_file(json_file)
-        if not data or 'comments' not in data:
-            continue
-        
-        external_id = json_file.stem
-        listing = listing_map.get(external_id)
-        if not listing:
+    for external_id, listing_comments in comments.items():
+        listing_id = listing_map.get(external_id)
+        if not listing_id:
             continue
-        
-        for comment_data in data['comments']:
+
+        for comment_data in listing_comments:
             person = comment_data.get('person', '').lower()
             user = user_map.get(person)
             if not user:
                 continue
-            
-            # Use comment ID if available to check for duplicates
-            comment_id = comment_data.get('id')
+
             text = comment_data.get('text', '')
-            ts = comment_data.get('ts')
-            
-            # Check if comment already exists (by text and user for now)
-            existing = db.query(Comment).filter(
-                Comment.listing_id == listing.id,
-                Comment.user_id == user.id,
-                Comment.text == text
-            ).first()
-            
-            if existing:
+            key = (listing_id, user.id, text)
+            if key in seen:
                 skipped_count += 1
                 continue
-            
-            # Create timestamp
-            created_at = datetime.fromtimestamp(ts) if ts else datetime.utcnow()
-            
-            comment = Comment(
-                listing_id=listing.id,
-                user_id=user.id,
-                text=text,
-                created_at=created_at
-            )
-            db.add(comment)
-            imported_count += 1
-    
-    db.commit()
-    print(f"  ✓ Imported {imported_count} comments, skipped {skipped_count} existing")
-
-
-def import_commutes(db, commute_dir, listing_map):
-    """Import commute data from commute/*.json files."""
+            seen.add(key)
+            rows.append(comment_row(listing_id, user, comment_data))
+
+    write_batches(db, insert(Comment.__table__), rows, batch_size)
+    report('Comments', len(rows), 0, started, detail=f"{skipped_count} already present")
+
+
+def commute_travel_seconds(commutes_data):
+    """Duration of the first commute's route, if available."""
+    if not commutes_data:
+        return None
+    result = commutes_data[0].get('result') or {}
+    raw_response = result.get('raw_response') or {}
+    routes = raw_response.get('routes', [])
+    if routes and routes[0].get('legs'):
+        return routes[0]['legs'][0].get('duration', {}).get('value')
+    return None
+
+
+def import_commutes(db, commute_dir, listing_map, batch_size=IMPORT_BATCH_SIZE, workers=IMPORT_WORKERS):
+    """Upsert commute data from commute/*.json files."""
     print("\n🚗 Importing commute data...")
-    
+
     commute_path = Path(commute_dir)
     if not commute_path.exists():
         print(f"  ⚠ Commute directory not found: {commute_dir}")
         return
-    
-    imported_count = 0
-    skipped_count = 0
-    
-    for json_file in commute_path.glob('*.json'):
-        data = load_json_file(json_file)
-        if not data:
-            continue
-        
-        external_id = json_file.stem
-        listing = listing_map.get(external_id)
-        if not listing:
-            continue
-        
-        # Check if commute already exists
-        existing = db.query(Commute).filter(Commute.listing_id == listing.id).first()
-        if existing:
-            skipped_count += 1
-            continue
-        
-        # Extract travel seconds from first commute if available
-        travel_seconds = None
-        commutes_data = data.get('commutes', [])
-        if commutes_data:
-            first_commute = commutes_data[0]
-            result = first_commute.get('result', {})
-            raw_response = result.get('raw_response', {})
-            routes = raw_response.get('routes', [])
-            if routes and routes[0].get('legs'):
-                duration = routes[0]['legs'][0].get('duration', {})
-                travel_seconds = duration.get('value')
-        
-        commute = Commute(
-            listing_id=listing.id,
-            commutes_data=commutes_data,
-            nearest_station=data.get('nearest_station'),
-            travel_seconds=travel_seconds
-        )
-        db.add(commute)
-        imported_count += 1
-    
-    db.commit()
-    print(f"  ✓ Imported {imported_count} commute records, skipped {skipped_count} existing")
+
+    started = time.monotonic()
+    existing = set(db.scalars(select(Commute.listing_id)))
+    stmt = commute_upsert(db)
+    paths = [path for path in sorted(commute_path.glob('*.json')) if path.stem in listing_map]
+    new_count = updated_count = 0
+    results = (r for r in decoded(partial(decode_commute, now=datetime.utcnow()), paths, workers) if r)
+    for batch in stream_batches(results, batch_size):
+        rows = [dict(row, listing_id=listing_map[external_id]) for external_id, row in batch]
+        db.execute(stmt, rows)
+        db.commit()
+        for row in rows:
+            if row['listing_id'] in existing:
+                updated_count += 1
+            else:
+                new_count += 1
+
+    report('Commutes', new_count, updated_count, started)
 
 
 def main():
     """Main import process."""
+    parser = argparse.ArgumentParser(description='Import JSON data into Postgres')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                        help=f'rows per INSERT batch and commit (default {IMPORT_BATCH_SIZE})')
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS,
+                        help=f'processes decoding JSON files, 1 to decode inline (default {IMPORT_WORKERS})')
+    args = parser.parse_args()
+    batch_size = max(1, args.batch_size)
+    workers = max(1, args.workers)
+
     print("=" * 60)
     print("JSON to Postgres Migration Script")
     print("=" * 60)
-    
+
     # Create tables if they don't exist
     print("\n🔧 Ensuring database tables exist...")
     Base.metadata.create_all(bind=engine)
     print("  ✓ Tables ready")
-    
+
     db = SessionLocal()
     try:
         # Check that Tom and MQ users exist
         tom = get_user_by_username(db, 'tom')
         mq = get_user_by_username(db, 'mq')
-        
+
         if not tom or not mq:
             print("\n✗ ERROR: Tom and/or MQ users not found!")
             print("  Please run: python api/scripts/seed_users.py")
             return
-        
+
         print(f"\n✓ Found users: Tom (id={tom.id}), MQ (id={mq.id})")
-        
+
         # Import data
         listings_dir = DATA_DIR / 'listings'
         votes_file = DATA_DIR / 'votes.json'
         commute_dir = DATA_DIR / 'commute'
-        
-        listing_map = import_listings(db, listings_dir)
-        import_votes(db, votes_file, listing_map)
-        import_comments(db, listings_dir, listing_map)
-        import_commutes(db, commute_dir, listing_map)
-        
+
+        started = time.monotonic()
+        listing_map, comments = import_listings(db, listings_dir, batch_size, workers)
+        import_votes(db, votes_file, listing_map, batch_size)
+        import_comments(db, comments, listing_map, batch_size)
+        import_commutes(db, commute_dir, listing_map, batch_size, workers)
+
         print("\n" + "=" * 60)
-        print("✅ Migration complete!")
+        print(f"✅ Migration complete in {time.monotonic() - started:.2f}s")
         print("=" * 60)
-        
+
         # Print summary
         total_listings = db.query(Listing).count()
         total_votes = db.query(Vote).count()
         total_comments = db.query(Comment).count()
         total_commutes = db.query(Commute).count()
-        
+
         print(f"\n📊 Database Summary:")
         print(f"  • Listings: {total_listings}")
         print(f"  • Votes: {total_votes}")
         print(f"  • Comments: {total_comments}")
         print(f"  • Commutes: {total_commutes}")
         print(f"  • Users: 2 (Tom, MQ)")
-        
+
     except Exception as e:
         db.rollback()
         print(f"\n✗ Error during migration: {e}")
@@ -0,0 +1,294 @@
+"""Incrementally sync the backend's JSON files into Postgres.
+
+Every source file (`listings/<id>.json`, `commute/<id>.json`, `votes.json`
+and `votes.journal`) has a watermark in `sync_watermarks`: the mtime, size
+and sha256 it had when last synced. A pass stats each file, reads only the
+ones whose mtime or size moved, and upserts only those whose hash changed, so
+its cost follows the number of changes rather than the size of the corpus.
+Rows and the watermarks of the files they came from are committed together;
+after a crash the affected files are simply synced again.
+
+    python -m api.scripts.sync_json_to_pg              # one pass
+    python -m api.scripts.sync_json_to_pg --follow     # keep polling every SYNC_INTERVAL seconds
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import delete, insert, select
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from api.database import SessionLocal, engine, Base
+from api.models import Listing, Vote, Comment, SyncWatermark
+from api.config import DATA_DIR
+from api.scripts.import_json_to_pg import (
+    IMPORT_BATCH_SIZE, upsert_statement, get_user_by_username, load_votes,
+    listing_row, listing_upsert, vote_rows, vote_upsert, comment_row,
+    commute_row, commute_upsert, write_batches, stream_batches, update_workflow_statuses,
+)
+
+SYNC_INTERVAL = float(os.getenv('SYNC_INTERVAL', '30'))
+VOTE_SOURCES = ('votes.json', 'votes.journal')
+
+
+def scan_sources(data_dir):
+    """{source: (path, mtime_ns, size)} for every JSON source under data_dir."""
+    sources = {}
+    for subdir in ('listings', 'commute'):
+        try:
+            entries = os.scandir(data_dir / subdir)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.is_file():
+                    st = entry.stat()
+                    sources[f'{subdir}/{entry.name}'] = (Path(entry.path), st.st_mtime_ns, st.st_size)
+    for name in VOTE_SOURCES:
+        path = data_dir / name
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        sources[name] = (path, st.st_mtime_ns, st.st_size)
+    return sources
+
+
+def pending_sources(sources, watermarks, wanted):
+    """Yield (source, raw, mark) for sources in `wanted` that moved since their watermark.
+
+    `raw` is the new file contents, or None when the file was rewritten with
+    the same contents and only its watermark needs refreshing.
+    """
+    for source in wanted:
+        path, mtime_ns, size = sources[source]
+        known = watermarks.get(source)
+        if known and known[:2] == (mtime_ns, size):
+            continue
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            continue  # removed since the scan
+        digest = hashlib.sha256(raw).hexdigest()
+        mark = {'source': source, 'mtime_ns': mtime_ns, 'size': size,
+                'content_hash': digest, 'synced_at': datetime.utcnow()}
+        yield source, (None if known and known[2] == digest else raw), mark
+
+
+def parse_source(source, raw):
+    """Decoded JSON, or None for a file caught mid-write (retried next pass)."""
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        print(f"  ⚠ Skipping {source} for now: {e}")
+        return None
+
+
+def listing_ids_for(db, external_ids, batch_size):
+    """{external_id: listing id} for the given Domain ids that are in the database."""
+    external_ids = list(external_ids)
+    listing_map = {}
+    for start in range(0, len(external_ids), batch_size):
+        chunk = external_ids[start:start + batch_size]
+        listing_map.update(db.execute(
+            select(Listing.external_id, Listing.id).where(Listing.external_id.in_(chunk))
+        ).all())
+    return listing_map
+
+
+def watermark_upsert(db):
+    return upsert_statement(db, SyncWatermark, ['source'], ['mtime_ns', 'size', 'content_hash', 'synced_at'])
+
+
+def sync_listings(db, pending, users, batch_size):
+    """Upsert changed listing files and insert their new comments; returns listings synced."""
+    synced = 0
+    for batch in stream_batches(pending, batch_size):
+        now = datetime.utcnow()
+        rows, marks, comments = [], [], {}
+        for source, raw, mark in batch:
+            if raw is not None:
+                data = parse_source(source, raw)
+                if data is None:
+                    continue
+                external_id = Path(source).stem
+                rows.append(listing_row(external_id, data, now))
+                if data.get('comments'):
+                    comments[external_id] = data['comments']
+            marks.append(mark)
+        if rows:
+            db.execute(listing_upsert(db), rows)
+        if comments:
+            insert_new_comments(db, comments, users, batch_size)
+        if marks:
+            db.execute(watermark_upsert(db), marks)
+        db.commit()
+        synced += len(rows)
+    return synced
+
+
+def insert_new_comments(db, comments, users, batch_size):
+    """Insert listing-file comments not yet in the database (matched on listing, user, text)."""
+    listing_map = listing_ids_for(db, comments, batch_size)
+    seen = set(db.execute(
+        select(Comment.listing_id, Comment.user_id, Comment.text)
+        .where(Comment.listing_id.in_(list(listing_map.values())))
+    ).all())
+    rows = []
+    for external_id, entries in comments.items():
+        listing_id = listing_map.get(external_id)
+        if not listing_id:
+            continue
+        for comment_data in entries:
+            user = users.get(comment_data.get('person', '').lower())
+            if not user:
+                continue
+            key = (listing_id, user.id, comment_data.get('text', ''))
+            if key not in seen:
+                seen.add(key)
+                rows.append(comment_row(listing_id, user, comment_data))
+    if rows:
+        db.execute(insert(Comment.__table__), rows)
+
+
+def sync_commutes(db, pending, batch_size):
+    """Upsert changed commute files whose listing is in the database; returns commutes synced."""
+    synced = 0
+    for batch in stream_batches(pending, batch_size):
+        now = datetime.utcnow()
+        parsed, marks = {}, []
+        for source, raw, mark in batch:
+            if raw is None:
+                marks.append(mark)
+                continue
+            data = parse_source(source, raw)
+            if data is not None:
+                parsed[Path(source).stem] = (data, mark)
+        listing_map = listing_ids_for(db, parsed, batch_size)
+        rows = []
+        for external_id, (data, mark) in parsed.items():
+            listing_id = listing_map.get(external_id)
+            if not listing_id:
+                continue  # no watermark, so it is retried once the listing arrives
+            rows.append(commute_row(listing_id, data, now))
+            marks.append(mark)
+        if rows:
+            db.execute(commute_upsert(db), rows)
+        if marks:
+            db.execute(watermark_upsert(db), marks)
+        db.commit()
+        synced += len(rows)
+    return synced
+
+
+def sync_votes(db, data_dir, marks, users, batch_size):
+    """Upsert the votes and workflow statuses that differ from the database; returns rows changed."""
+    votes_data = load_votes(data_dir / 'votes.json')
+    listing_map = listing_ids_for(db, votes_data, batch_size)
+    current = {
+        (listing_id, user_id): (value, score)
+        for listing_id, user_id, value, score in db.execute(
+            select(Vote.listing_id, Vote.user_id, Vote.value, Vote.score)
+        )
+    }
+    rows = [
+        row for row in vote_rows(votes_data, listing_map, users, datetime.utcnow())
+        if current.get((row['listing_id'], row['user_id'])) != (row['value'], row['score'])
+    ]
+    write_batches(db, vote_upsert(db), rows, batch_size)
+    statuses = update_workflow_statuses(db, votes_data, listing_map, batch_size)
+    if marks:
+        db.execute(watermark_upsert(db), marks)
+    db.commit()
+    return len(rows) + statuses
+
+
+def sync_once(db, data_dir, batch_size=IMPORT_BATCH_SIZE, verbose=False):
+    """One sync pass; returns {'listings': n, 'commutes': n, 'votes': n}."""
+    started = time.monotonic()
+    tom = get_user_by_username(db, 'tom')
+    mq = get_user_by_username(db, 'mq')
+    if not tom or not mq:
+        print("✗ Tom and/or MQ users not found. Run seed_users.py first!")
+        return None
+    users = {'tom': tom, 'mq': mq}
+
+    sources = scan_sources(data_dir)
+    watermarks = {
+        source: (mtime_ns, size, content_hash)
+        for source, mtime_ns, size, content_hash in db.execute(
+            select(SyncWatermark.source, SyncWatermark.mtime_ns, SyncWatermark.size, SyncWatermark.content_hash)
+        )
+    }
+
+    def under(prefix):
+        return sorted(s for s in sources if s.startswith(prefix))
+
+    counts = {
+        'listings': sync_listings(db, pending_sources(sources, watermarks, under('listings/')), users, batch_size),
+        'commutes': sync_commutes(db, pending_sources(sources, watermarks, under('commute/')), batch_size),
+        'votes': 0,
+    }
+    vote_marks = [mark for _, _, mark in pending_sources(
+        sources, watermarks, [s for s in VOTE_SOURCES if s in sources])]
+    # new listings may make earlier votes linkable, so diff votes then too
+    if vote_marks or counts['listings']:
+        counts['votes'] = sync_votes(db, data_dir, vote_marks, users, batch_size)
+
+    gone = [source for source in watermarks if source not in sources]
+    if gone:
+        db.execute(delete(SyncWatermark).where(SyncWatermark.source.in_(gone)))
+        db.commit()
+
+    if verbose or any(counts.values()):
+        print(f"✓ Synced {counts['listings']} listings, {counts['commutes']} commutes, "
+              f"{counts['votes']} votes from {len(sources)} files in {time.monotonic() - started:.2f}s")
+    return counts
+
+
+def main():
+    """Sync once, or keep syncing with --follow."""
+    parser = argparse.ArgumentParser(description='Incrementally sync JSON data into Postgres')
+    parser.add_argument('--follow', action='store_true',
+                        help='keep running, syncing every --interval seconds')
+    parser.add_argument('--interval', type=float, default=SYNC_INTERVAL,
+                        help=f'seconds between passes with --follow (default {SYNC_INTERVAL:g})')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                        help=f'rows per INSERT batch and commit (default {IMPORT_BATCH_SIZE})')
+    args = parser.parse_args()
+    batch_size = max(1, args.batch_size)
+
+    Base.metadata.create_all(bind=engine)
+    if args.follow:
+        print(f"👀 Syncing {DATA_DIR} every {args.interval:g}s")
+
+    first = True
+    try:
+        while True:
+            db = SessionLocal()
+            try:
+                sync_once(db, DATA_DIR, batch_size, verbose=first)
+            except Exception as e:
+                db.rollback()
+                print(f"✗ Sync failed: {e}")
+                if not args.follow:
+                    raise
+            finally:
+                db.close()
+            first = False
+            if not args.follow:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""HTTP API over the Postgres listings.
+
+    gunicorn --bind 0.0.0.0:8000 api.server:app   # as the api_server service runs it
+    python -m api.server     # development server on API_HOST:API_PORT (default 0.0.0.0:8000)
+
+`GET /api/listings` takes the frontend's filters (workflow_status, status,
+tom, mq, exclude_voted_mode, travel_max, suburb, search, sort) plus `limit`
+and `cursor`, and returns one keyset-paginated page with a `next_cursor`
+(see listing_query.py). `GET /api/listings/counts` returns the cached totals.
+"""
+import sys
+from pathlib import Path
+
+from flask import Flask, jsonify, request
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.config import API_HOST, API_PORT, COUNTS_CACHE_SECONDS, MAX_PAGE_SIZE, PAGE_SIZE
+# the frontend owns the workflow statuses (frontend/ is mounted into the container)
+from frontend.config import WORKFLOW_STATUSES
+from api.database import SessionLocal
+from api.listing_query import (
+    EXCLUDE_MODES, SORTS, VOTE_FILTERS, CountsCache, latest_comments, listing_page, listing_summary,
+)
+
+app = Flask(__name__)
+counts_cache = CountsCache(COUNTS_CACHE_SECONDS)
+
+
+def listing_filters(args):
+    """Filters for listing_page() from the query string, with the frontend's defaults."""
+    workflow_statuses = []
+    for status in args.getlist('workflow_status') or ['active']:
+        if status in WORKFLOW_STATUSES:
+            workflow_statuses.append(status)
+        else:
+            app.logger.error(f"Invalid workflow_status received: {status}")
+    if not workflow_statuses:
+        app.logger.warning("No valid workflow_status values provided, defaulting to ['active']")
+        workflow_statuses = ['active']
+
+    travel_max = None
+    try:
+        value = args.get('travel_max')
+        if value is not None and value != 'any' and int(value) >= 0:
+            travel_max = int(value)
+    except ValueError:
+        pass
+
+    def choice(name, allowed, default):
+        value = args.get(name, default)
+        return value if value in allowed else default
+
+    return {
+        'workflow_statuses': workflow_statuses,
+        'status': choice('status', ('all', 'available', 'sold'), 'all'),
+        'tom': choice('tom', VOTE_FILTERS, 'any'),
+        'mq': choice('mq', VOTE_FILTERS, 'any'),
+        'exclude_voted_mode': choice('exclude_voted_mode', EXCLUDE_MODES, 'none'),
+        'travel_max': travel_max,
+        'suburbs': [s for s in args.getlist('suburb') if s],
+        'search': args.get('search', '').strip(),
+        'sort': choice('sort', SORTS, 'none'),
+    }
+
+
+@app.route('/api/listings')
+def api_listings():
+    """One page of listings. Query params: the frontend's filters, limit, cursor."""
+    try:
+        limit = int(request.args.get('limit', PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'invalid params'}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    filters = listing_filters(request.args)
+
+    db = SessionLocal()
+    try:
+        try:
+            rows, next_cursor = listing_page(db, filters, limit, request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        comments = latest_comments(db, [listing.id for listing, _, _ in rows])
+        counts = counts_cache.get(db)
+        return jsonify({
+            'listings': [listing_summary(listing, tom, mq, comments.get(listing.id, [])) for listing, tom, mq in rows],
+            'limit': limit,
+            'next_cursor': next_cursor,
+            **counts,
+        })
+    finally:
+        db.close()
+
+
+@app.route('/api/listings/counts')
+def api_listing_counts():
+    """Total, available and sold listings (cached for COUNTS_CACHE_SECONDS)."""
+    db = SessionLocal()
+    try:
+        return jsonify(counts_cache.get(db))
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    app.run(host=API_HOST, port=API_PORT)
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# api.database builds its engine at import time; the tests never use it (they
+# make their own SQLite databases), it only has to be constructible here
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'housefinder-api-tests.db'))
@@ -0,0 +1,112 @@
+import pytest
+
+from api.listing_fields import (
+    listing_coords,
+    listing_suburb,
+    normalised_fields,
+    parse_int,
+    parse_land_size,
+    parse_price_range,
+)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('$1.1m - $1.25m', (1_100_000, 1_250_000)),
+    ('Guide $950k', (950_000, 950_000)),
+    ('Sold $1,200,000', (1_200_000, 1_200_000)),
+    ('$1.1 - 1.2m', (1_100_000, 1_200_000)),
+    ('$900,000 to $950,000', (900_000, 950_000)),
+    ('Offers over $2 million', (2_000_000, 2_000_000)),
+    ('$1.5m – $1.4m', (1_500_000, 1_500_000)),
+    ('Contact agent', (None, None)),
+    ('Contact Agent - $1.3m expected', (1_300_000, 1_300_000)),
+    ('Auction', (None, None)),
+    ('$650 per week', (None, None)),
+    ('', (None, None)),
+    (None, (None, None)),
+])
+def test_parse_price_range(text, expected):
+    assert parse_price_range(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('650m²', 650.0),
+    ('1,012 sqm', 1012.0),
+    ('556 m2', 556.0),
+    ('0.4 ha', 4000.0),
+    ('1 acre', 4046.9),
+    ('Land size unknown', None),
+    (None, None),
+])
+def test_parse_land_size(text, expected):
+    assert parse_land_size(text) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('3', 3),
+    (3, 3),
+    (2.0, 2),
+    ('4+', 4),
+    ('Studio', None),
+    (None, None),
+    (True, None),
+])
+def test_parse_int(value, expected):
+    assert parse_int(value) == expected
+
+
+@pytest.mark.parametrize('data, expected', [
+    ({'suburb': 'Epping', 'address': '1 Test St, Ryde NSW 2112'}, 'Epping'),
+    ({'address': '1 Test St, North Epping NSW 2121'}, 'North Epping'),
+    ({'address': 'Unit 2, 10 Test St, Ryde NSW 2112'}, 'Ryde'),
+    ({'address': '1 Test St'}, None),
+    ({'address': '1 Test St, Epping'}, None),
+    ({'address': None}, None),
+    ({}, None),
+])
+def test_listing_suburb(data, expected):
+    assert listing_suburb(data) == expected
+
+
+@pytest.mark.parametrize('data, expected', [
+    ({'lat': -33.77, 'lng': 151.08}, (-33.77, 151.08)),
+    ({'lat': '-33.77', 'lng': '151.08'}, (-33.77, 151.08)),
+    ({'google_transit': {'response': {'routes': [{'legs': [{'start_location': {'lat': -33.7, 'lng': 151.1}}]}]}}},
+     (-33.7, 151.1)),
+    ({'google_transit': {'response': {'routes': []}}}, (None, None)),
+    ({}, (None, None)),
+])
+def test_listing_coords(data, expected):
+    assert listing_coords(data) == expected
+
+
+def test_normalised_fields_of_sparse_listing():
+    fields = normalised_fields({'price': 'Contact agent', 'address': '5 Test Ave'})
+    assert fields == {
+        'suburb': None,
+        'bedrooms': None,
+        'bathrooms': None,
+        'price_min': None,
+        'price_max': None,
+        'land_size_m2': None,
+        'lat': None,
+        'lng': None,
+        'travel_seconds': None,
+    }
+
+
+def test_normalised_fields_of_full_listing():
+    fields = normalised_fields({
+        'price': 'Guide $1.1m - $1.2m',
+        'address': '1 Test St, Epping NSW 2121',
+        'bedrooms': '4',
+        'bathrooms': 2,
+        'property_size': '650m²',
+        'lat': -33.77,
+        'lng': 151.08,
+        'travel_duration_seconds': 1860,
+    })
+    assert fields['suburb'] == 'Epping'
+    assert (fields['price_min'], fields['price_max']) == (1_100_000, 1_200_000)
+    assert (fields['bedrooms'], fields['bathrooms'], fields['land_size_m2']) == (4, 2, 650.0)
+    assert fields['travel_seconds'] == 1860
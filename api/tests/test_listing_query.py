@@ -0,0 +1,202 @@
+import itertools
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.database import Base
+from api.listing_query import CountsCache, decode_cursor, encode_cursor, listing_page
+from api.models import Listing, User, Vote
+
+STATUSES = ['active', 'reviewed', 'rejected']
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "listings.db"}')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def listings(db):
+    """60 listings over three statuses, with travel-time ties and missing times."""
+    tom = User(email='tom@example.com', username='tom', password_hash='x')
+    mq = User(email='mq@example.com', username='mq', password_hash='x')
+    db.add_all([tom, mq])
+    rows = []
+    for i in range(1, 61):
+        travel = None if i % 7 == 0 else 1800 + (i % 4) * 300  # four tied values
+        rows.append(Listing(
+            id=i,
+            external_id=f'ext{i}',
+            address=f'{i} Test St, Epping NSW 2121',
+            suburb='Epping' if i % 2 else 'Ryde',
+            status='sold' if i % 5 == 0 else 'available',
+            workflow_status=STATUSES[i % 3],
+            travel_seconds=travel,
+        ))
+    db.add_all(rows)
+    db.flush()
+    db.add_all([Vote(listing_id=i, user_id=tom.id, value=i % 2 == 0) for i in range(1, 61, 3)])
+    db.commit()
+    return rows
+
+
+def filters(**overrides):
+    base = {
+        'workflow_statuses': ['active'],
+        'status': 'all',
+        'tom': 'any',
+        'mq': 'any',
+        'exclude_voted_mode': 'none',
+        'travel_max': None,
+        'suburbs': [],
+        'search': '',
+        'sort': 'travel',
+    }
+    return dict(base, **overrides)
+
+
+def expected_ids(listings, statuses, sort, keep=lambda listing: True):
+    rows = [l for l in listings if l.workflow_status in statuses and keep(l)]
+    if sort == 'travel':
+        rows.sort(key=lambda l: (l.travel_seconds is None, l.travel_seconds or 0, l.id))
+    else:
+        rows.sort(key=lambda l: l.id)
+    return [l.id for l in rows]
+
+
+def all_pages(db, f, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = listing_page(db, f, limit, cursor)
+        ids += [listing.id for listing, _, _ in rows]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+        assert pages < 100
+
+
+class Row:
+    def __init__(self, travel_seconds, id):
+        self.travel_seconds, self.id = travel_seconds, id
+
+
+@pytest.mark.parametrize('sort, listing', [
+    ('travel', Row(1800, 7)),
+    ('travel', Row(None, 42)),
+    ('none', Row(1800, 7)),
+])
+def test_cursor_round_trip(sort, listing):
+    key = decode_cursor(encode_cursor(sort, listing), sort)
+    assert key == ((listing.travel_seconds, listing.id) if sort == 'travel' else listing.id)
+
+
+@pytest.mark.parametrize('cursor, sort', [
+    ('not base64 json', 'travel'),
+    (encode_cursor('none', Row(1, 2)), 'travel'),
+    (encode_cursor('travel', Row(1, 2)), 'none'),
+    (encode_cursor('travel', Row('1800', 2)), 'travel'),
+    (encode_cursor('travel', Row(1, None)), 'travel'),
+])
+def test_bad_cursor_is_rejected(cursor, sort):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, sort)
+
+
+@pytest.mark.parametrize('statuses, limit', list(itertools.product(
+    [['active'], ['active', 'reviewed'], STATUSES, ['reviewed', 'unknown']],
+    [1, 3, 7, 100],
+)))
+@pytest.mark.parametrize('sort', ['travel', 'none'])
+def test_pages_cover_every_row_once_in_order(db, listings, statuses, limit, sort):
+    ids, pages = all_pages(db, filters(workflow_statuses=statuses, sort=sort), limit)
+    want = expected_ids(listings, statuses, sort)
+    assert ids == want
+    assert pages == max(1, -(-len(want) // limit))
+
+
+def test_page_boundary_inside_a_tie_and_across_statuses(db, listings):
+    f = filters(workflow_statuses=['active', 'reviewed'])
+    want = expected_ids(listings, ['active', 'reviewed'], 'travel')
+    tied = [l.id for l in listings if l.id in want and l.travel_seconds == 2100]
+    assert {listings[i - 1].workflow_status for i in tied} == {'active', 'reviewed'}
+
+    # end the first page in the middle of the 2100s tie
+    limit = want.index(tied[0]) + 2
+    first, cursor = listing_page(db, f, limit)
+    assert [listing.id for listing, _, _ in first] == want[:limit]
+    second, _ = listing_page(db, f, limit, cursor)
+    assert [listing.id for listing, _, _ in second] == want[limit:2 * limit]
+
+
+def test_cursor_in_listings_without_travel_time(db, listings):
+    f = filters(workflow_statuses=STATUSES)
+    want = expected_ids(listings, STATUSES, 'travel')
+    first_null = next(i for i in want if listings[i - 1].travel_seconds is None)
+    cursor = encode_cursor('travel', listings[first_null - 1])
+    rows, _ = listing_page(db, f, 100, cursor)
+    assert [listing.id for listing, _, _ in rows] == want[want.index(first_null) + 1:]
+
+
+def test_filters_combine_with_paging(db, listings):
+    f = filters(workflow_statuses=STATUSES, status='available', suburbs=['Epping'], travel_max=35)
+    ids, _ = all_pages(db, f, 4)
+    assert ids == expected_ids(
+        listings, STATUSES, 'travel',
+        keep=lambda l: l.status != 'sold' and l.suburb == 'Epping'
+        and l.travel_seconds is not None and l.travel_seconds <= 35 * 60,
+    )
+
+
+def test_vote_filters(db, listings):
+    rows, _ = listing_page(db, filters(workflow_statuses=STATUSES, tom='yes', sort='none'), 100)
+    assert [listing.id for listing, _, _ in rows] == [i for i in range(1, 61, 3) if i % 2 == 0]
+    assert all(tom.value is True and mq is None for _, tom, mq in rows)
+
+    rows, _ = listing_page(db, filters(workflow_statuses=STATUSES, exclude_voted_mode='tom', sort='none'), 100)
+    assert [listing.id for listing, _, _ in rows] == [i for i in range(1, 61) if i % 3 != 1]
+
+
+def test_counts_cache(db, listings):
+    cache = CountsCache(ttl=60)
+    assert cache.get(db) == {'total': 60, 'available': 48, 'sold': 12}
+
+    db.add(Listing(id=61, external_id='ext61', status='sold'))
+    db.commit()
+    assert cache.get(db)['total'] == 60  # still within the ttl
+
+    cache.invalidate()
+    assert cache.get(db) == {'total': 61, 'available': 48, 'sold': 13}
+    assert CountsCache(ttl=0).get(db)['total'] == 61
+
+
+@pytest.fixture
+def client(db, listings, monkeypatch):
+    import api.server as server
+
+    monkeypatch.setattr(server, 'SessionLocal', sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(server, 'counts_cache', CountsCache(ttl=60))
+    return server.app.test_client()
+
+
+def test_endpoint_pages_with_cursor(client, listings):
+    query = {'workflow_status': ['active', 'bogus'], 'sort': 'travel', 'limit': 5}
+    ids, cursor = [], None
+    while True:
+        body = client.get('/api/listings', query_string=dict(query, **({'cursor': cursor} if cursor else {}))).get_json()
+        ids += [int(listing['id'][3:]) for listing in body['listings']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert ids == expected_ids(listings, ['active'], 'travel')
+    assert body['total'] == 60
+
+
+def test_endpoint_rejects_bad_cursor(client):
+    response = client.get('/api/listings', query_string={'sort': 'travel', 'cursor': 'zzz'})
+    assert response.status_code == 400
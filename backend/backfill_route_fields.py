@@ -0,0 +1,68 @@
+"""
+Backfill `route_summary`, `lat` and `lng` on listings step 3 processed before
+it started writing them.
+
+The values are derived from each listing's stored `google_transit.response`;
+listings without one, or already up to date, are left untouched.
+
+    python backfill_route_fields.py [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from directions_compact import route_summary_from_response, start_location_from_response
+
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+LISTINGS_DIR = os.path.join(DATA_DIR, "listings")
+
+
+def route_fields(listing):
+    resp = (listing.get("google_transit") or {}).get("response")
+    if not resp:
+        return None
+    lat, lng = start_location_from_response(resp)
+    return {"route_summary": route_summary_from_response(resp), "lat": lat, "lng": lng}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report how many listings would change without writing")
+    args = parser.parse_args()
+
+    if not os.path.isdir(LISTINGS_DIR):
+        print(f"❌ Listings directory '{LISTINGS_DIR}' not found")
+        return 1
+
+    updated = 0
+    for name in sorted(os.listdir(LISTINGS_DIR)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(LISTINGS_DIR, name)
+        try:
+            with open(path, "r", encoding="utf8") as f:
+                listing = json.load(f)
+        except Exception as e:
+            print(f"⚠ Could not read {path}: {e}")
+            continue
+
+        fields = route_fields(listing)
+        if not fields or all(listing.get(k) == v for k, v in fields.items()):
+            continue
+        listing.update(fields)
+        updated += 1
+        if args.dry_run:
+            continue
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf8") as f:
+            json.dump(listing, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    print(f"✔ {updated} listings {'would be ' if args.dry_run else ''}updated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Benchmark parse_listing across parser engines on saved Domain listing pages.
+
+Fixtures are plain `<listing_id>.html` files. Save some first with:
+
+    python bench_parse_listing.py --fetch 2018016977 2018016978
+
+then run the benchmark (default fixture dir: $DATA_DIR/html_fixtures):
+
+    python bench_parse_listing.py [FIXTURE_DIR] [--repeat 5]
+
+For every available engine it reports per-page parse time, peak Python heap
+per page (tracemalloc) and the peak RSS of a fresh process parsing all
+fixtures, which also covers memory allocated inside lxml/libxml2. Pages
+whose extracted fields differ between engines are listed at the end.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from listing_parser import available_engines
+
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+DEFAULT_FIXTURE_DIR = os.path.join(DATA_DIR, "html_fixtures")
+
+
+def load_fixtures(fixture_dir):
+    return [(p.stem, p.read_text(encoding="utf-8")) for p in sorted(Path(fixture_dir).glob("*.html"))]
+
+
+def fetch_fixtures(fixture_dir, listing_ids):
+    from step2_get_details import fetch_listing_html
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    for listing_id in listing_ids:
+        html = fetch_listing_html(listing_id)
+        if not html:
+            print(f"⚠ Could not fetch {listing_id}")
+            continue
+        path = os.path.join(fixture_dir, f"{listing_id}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"✔ Saved {path}")
+
+
+def bench_engine(engine, fixture_dir, repeat, results):
+    """Run in a fresh process so ru_maxrss reflects this engine alone."""
+    from step2_get_details import parse_listing
+
+    fixtures = load_fixtures(fixture_dir)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    outputs = {}
+    for listing_id, html in fixtures:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            outputs[listing_id] = parse_listing(html, listing_id, engine=engine)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    heap_peaks = []
+    for listing_id, html in fixtures:
+        tracemalloc.start()
+        parse_listing(html, listing_id, engine=engine)
+        heap_peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    results[engine] = {
+        "timings": timings,
+        "heap_peaks": heap_peaks,
+        # ru_maxrss is KiB on Linux
+        "rss_growth_kb": rss_after - rss_before,
+        "rss_peak_kb": rss_after,
+        "outputs": outputs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixture_dir", nargs="?", default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument("--repeat", type=int, default=5, help="parses per page; the fastest is reported")
+    parser.add_argument("--fetch", nargs="+", metavar="LISTING_ID", help="download listing pages into the fixture dir and exit")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_fixtures(args.fixture_dir, args.fetch)
+        return 0
+
+    fixtures = load_fixtures(args.fixture_dir)
+    if not fixtures:
+        print(f"❌ No *.html fixtures found in {args.fixture_dir}")
+        return 1
+    total_kb = sum(len(html.encode("utf-8")) for _, html in fixtures) / 1024
+    print(f"Benchmarking {len(fixtures)} pages ({total_kb:.0f} KiB) from {args.fixture_dir}\n")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Manager().dict()
+    for engine in available_engines():
+        proc = ctx.Process(target=bench_engine, args=(engine, args.fixture_dir, max(1, args.repeat), results))
+        proc.start()
+        proc.join()
+
+    print(f"{'engine':<8}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}{'heap peak KiB':>16}{'RSS peak MiB':>15}{'RSS growth MiB':>17}")
+    for engine, r in results.items():
+        ms = [t * 1000 for t in r["timings"]]
+        heap = max(r["heap_peaks"]) / 1024
+        print(
+            f"{engine:<8}{statistics.mean(ms):>10.2f}{statistics.median(ms):>10.2f}{max(ms):>10.2f}"
+            f"{heap:>16.0f}{r['rss_peak_kb'] / 1024:>15.1f}{r['rss_growth_kb'] / 1024:>17.1f}"
+        )
+
+    print("\nPer page (ms):")
+    engines = list(results.keys())
+    print(f"{'listing':<14}" + "".join(f"{e:>10}" for e in engines))
+    for i, (listing_id, _) in enumerate(fixtures):
+        print(f"{listing_id:<14}" + "".join(f"{results[e]['timings'][i] * 1000:>10.2f}" for e in engines))
+
+    if len(engines) > 1:
+        reference = results[engines[0]]["outputs"]
+        for engine in engines[1:]:
+            outputs = results[engine]["outputs"]
+            for listing_id, expected in reference.items():
+                diff = [k for k in expected if expected[k] != outputs[listing_id].get(k)]
+                if diff:
+                    print(f"⚠ {engine} differs from {engines[0]} on {listing_id}: {', '.join(diff)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
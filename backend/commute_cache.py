@@ -0,0 +1,98 @@
+"""
+Persistent cache of Directions results for step 3.
+
+Entries are keyed by (normalised origin, normalised destination, mode,
+day/time slot) rather than by listing, so listings that share an address,
+re-listed properties and unchanged commutes after a config edit reuse earlier
+results instead of querying Google again.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional, Dict, Any
+
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+CACHE_PATH = os.path.join(DATA_DIR, "commute_cache.json")
+CACHE_TTL_DAYS = float(os.environ.get("COMMUTE_CACHE_TTL_DAYS", "30"))
+
+
+def normalise_address(address: str) -> str:
+    """Case/spacing-insensitive form of an address: '1 Foo St ,Epping' -> '1 foo st, epping'."""
+    text = re.sub(r"\s+", " ", (address or "").strip().lower())
+    text = re.sub(r"\s*,\s*", ", ", text)
+    return text.strip(" ,")
+
+
+def normalise_slot(day: str, time_str: str) -> str:
+    """Arrival slot as '<day>@HH:MM', e.g. ('weekday', '9:00') -> 'weekday@09:00'."""
+    try:
+        hh, mm = [int(x) for x in (time_str or "").split(":")]
+    except ValueError:
+        hh, mm = 9, 0
+    return f"{(day or 'any').strip().lower()}@{hh:02d}:{mm:02d}"
+
+
+def commute_cache_key(origin: str, destination: str, mode: str, day: str, time_str: str) -> str:
+    return "|".join([
+        normalise_address(origin),
+        normalise_address(destination),
+        (mode or "transit").lower(),
+        normalise_slot(day, time_str),
+    ])
+
+
+class CommuteCache:
+    """Thread-safe key -> {result, cached_at} store with a TTL, saved as JSON."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl_days: float = CACHE_TTL_DAYS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str = CACHE_PATH, ttl_days: float = CACHE_TTL_DAYS) -> "CommuteCache":
+        cache = cls(path, ttl_days)
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf8") as f:
+                    cache._entries = json.load(f)
+            except Exception as e:
+                print(f"[WARN] Ignoring unreadable commute cache {path}: {e}")
+        return cache
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry.get("cached_at", 0) < self.ttl_seconds:
+                self.hits += 1
+                return entry["result"]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = {"result": result, "cached_at": int(time.time())}
+            self._dirty += 1
+
+    def save(self, min_changes: int = 1) -> None:
+        """Drop expired entries and write atomically once `min_changes` puts are pending."""
+        with self._lock:
+            if self._dirty < min_changes:
+                return
+            now = time.time()
+            self._entries = {
+                k: v for k, v in self._entries.items()
+                if now - v.get("cached_at", 0) < self.ttl_seconds
+            }
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self._dirty = 0
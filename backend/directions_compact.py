@@ -0,0 +1,157 @@
+"""
+Compact form of Google Directions responses stored by step 3.
+
+The full payload carries polylines, nested sub-steps, html instructions,
+fares and alternate routes that nothing downstream reads. The compact form
+keeps the original shape (`routes[0].legs[*].steps[*]`) so the frontend, the
+Postgres importer and older readers work unchanged, but holds only the best
+route and, per step, the mode, duration, plain-text instruction and transit
+line/headsign/stops, plus each leg's start/end location.
+
+Raw payloads can optionally be kept in a gzip side-archive
+(`commute_raw/<hash>.json.gz`) for debugging.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from typing import Optional, Dict, Any
+
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+RAW_ARCHIVE_DIR = os.path.join(DATA_DIR, "commute_raw")
+# Set STEP3_ARCHIVE_RAW=1 to keep the full Directions payloads
+ARCHIVE_RAW = os.environ.get("STEP3_ARCHIVE_RAW", "").lower() in ("1", "true", "yes")
+
+COMPACT_VERSION = 1
+
+
+def _strip_html(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return text
+    return re.sub(r"\s+", " ", re.sub(r"<[^>]+>", " ", text)).strip()
+
+
+def _compact_transit(td: Dict[str, Any]) -> Dict[str, Any]:
+    line = td.get("line") or {}
+    vehicle = line.get("vehicle") or {}
+    return {
+        "headsign": td.get("headsign"),
+        "num_stops": td.get("num_stops"),
+        "line": {
+            "short_name": line.get("short_name"),
+            "name": line.get("name"),
+            "vehicle": {"type": vehicle.get("type")},
+        },
+        "departure_stop": {"name": (td.get("departure_stop") or {}).get("name")},
+        "arrival_stop": {"name": (td.get("arrival_stop") or {}).get("name")},
+    }
+
+
+def _compact_step(step: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "travel_mode": step.get("travel_mode"),
+        "duration": step.get("duration"),
+        "instructions": step.get("instructions") or _strip_html(step.get("html_instructions")),
+    }
+    if step.get("transit_details"):
+        out["transit_details"] = _compact_transit(step["transit_details"])
+    return out
+
+
+def _compact_leg(leg: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "duration": leg.get("duration"),
+        "distance": leg.get("distance"),
+        "start_location": leg.get("start_location"),
+        "end_location": leg.get("end_location"),
+        "steps": [_compact_step(s) for s in leg.get("steps") or []],
+    }
+
+
+def best_route_index(data: Dict[str, Any]) -> Optional[int]:
+    """Index of the route with the smallest total leg duration (as step 3 picks it)."""
+    best = None
+    for idx, route in enumerate(data.get("routes") or []):
+        total = sum((leg.get("duration") or {}).get("value", 0) for leg in route.get("legs") or [])
+        if best is None or total < best[1]:
+            best = (idx, total)
+    return best[0] if best else None
+
+
+def compact_directions_response(data: Dict[str, Any], route_index: Optional[int] = None) -> Dict[str, Any]:
+    """Return the compact form of a Directions response; already compact input is returned as-is."""
+    if not isinstance(data, dict) or data.get("compact") or not data.get("routes"):
+        return data
+    if route_index is None:
+        route_index = best_route_index(data)
+    route = data["routes"][route_index]
+    return {
+        "status": data.get("status"),
+        "compact": COMPACT_VERSION,
+        "routes": [{
+            "summary": route.get("summary"),
+            "legs": [_compact_leg(leg) for leg in route.get("legs") or []],
+        }],
+    }
+
+
+def archive_raw_response(request: Dict[str, Any], data: Dict[str, Any]) -> Optional[str]:
+    """Write the full payload to the gzip side-archive, keyed by the request; returns the path."""
+    key = hashlib.sha1(json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf8")).hexdigest()[:16]
+    path = os.path.join(RAW_ARCHIVE_DIR, f"{key}.json.gz")
+    try:
+        os.makedirs(RAW_ARCHIVE_DIR, exist_ok=True)
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf8") as f:
+            json.dump({"request": request, "response": data}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+    except Exception as e:
+        print(f"  [WARN] Failed to archive raw response {path}: {e}")
+        return None
+
+
+def route_summary_from_response(resp: Optional[Dict[str, Any]]) -> Optional[str]:
+    """One-line summary of the first route's steps, e.g. 'Walk 5 mins → Heavy_Rail (T9) 20 mins'."""
+    try:
+        if not resp:
+            return None
+        steps = resp['routes'][0]['legs'][0]['steps']
+        parts = []
+        for step in steps:
+            mode = step.get('travel_mode')
+            dur = step.get('duration', {}).get('text')
+            if mode == 'WALKING':
+                parts.append(f"Walk{(' ' + dur) if dur else ''}")
+            elif mode == 'TRANSIT':
+                line = step.get('transit_details', {}).get('line', {})
+                vehicle = (line.get('vehicle') or {}).get('type')
+                name = line.get('short_name') or line.get('name')
+                label = vehicle.title() if vehicle else 'Transit'
+                if name:
+                    label = f"{label} ({name})"
+                if dur:
+                    label = f"{label} {dur}"
+                parts.append(label)
+            else:
+                parts.append(f"{(mode.title() if mode else 'Step')}{(' ' + dur) if dur else ''}")
+        # compress consecutive identical parts
+        compressed = []
+        for p in parts:
+            if not compressed or compressed[-1] != p:
+                compressed.append(p)
+        return ' → '.join(compressed)
+    except Exception:
+        return None
+
+
+def start_location_from_response(resp: Optional[Dict[str, Any]]):
+    """(lat, lng) of the first leg's start, or (None, None)."""
+    try:
+        leg = ((resp or {}).get('routes') or [{}])[0].get('legs', [{}])[0]
+        start_loc = leg.get('start_location') or {}
+        return start_loc.get('lat'), start_loc.get('lng')
+    except Exception:
+        return None, None
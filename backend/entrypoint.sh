@@ -16,4 +16,9 @@ python step3_comutedetails.py
 echo "Starting step 4: backfill suburb data"
 python step4_backfill_suburbs.py
 
+if [ "${LISTING_STORE:-json}" = "sqlite" ]; then
+  echo "Exporting the listing store as JSON for the frontend"
+  python listing_store.py export
+fi
+
 echo "All steps finished. Outputs are in ${DATA_DIR:-/data}"
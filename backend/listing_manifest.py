@@ -0,0 +1,144 @@
+"""
+Compact metadata manifest for the listings directory.
+
+`listings_manifest.json` maps listing id -> last_updated, checked_at, content
+fingerprints, status and file size, so planning a run is one small JSON read
+plus dict lookups instead of reading every stored listing. Every step that
+writes a listing updates its entry. Step 2 loads it with `reconcile=True` to
+check the entries against the store's id list, so listings deleted from (or
+never imported into) the store are not treated as known.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from listing_store import JsonListingStore, get_store
+
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+LISTINGS_DIR = os.path.join(DATA_DIR, "listings")
+MANIFEST_FILE = os.path.join(DATA_DIR, "listings_manifest.json")
+
+
+class ListingManifest:
+    """Thread-safe id -> metadata map persisted as a single JSON file."""
+
+    def __init__(self, path: str = MANIFEST_FILE, listings_dir: str = LISTINGS_DIR):
+        self.path = path
+        self.listings_dir = listings_dir
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = 0
+
+    @classmethod
+    def load(cls, path: str = MANIFEST_FILE, listings_dir: str = LISTINGS_DIR,
+             reconcile: bool = False) -> "ListingManifest":
+        """Read the manifest, bootstrapping it from the store if missing or unreadable.
+
+        With `reconcile`, also match an existing manifest to the store's ids.
+        """
+        manifest = cls(path, listings_dir)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest._entries = json.load(f)
+            except Exception as e:
+                print(f"⚠ Error reading {path}: {e}, rebuilding")
+            else:
+                if reconcile:
+                    manifest.reconcile()
+                    manifest.save()
+                return manifest
+        manifest.rebuild()
+        manifest.save()
+        return manifest
+
+    def _store(self):
+        if os.path.abspath(self.listings_dir) == os.path.abspath(LISTINGS_DIR):
+            return get_store()
+        return JsonListingStore(os.path.dirname(self.listings_dir))
+
+    def reconcile(self) -> None:
+        """Match the entries to the store's ids: drop missing listings, add unknown ones."""
+        store = self._store()
+        stored = set(store.listing_ids())
+        with self._lock:
+            gone = [listing_id for listing_id in self._entries if listing_id not in stored]
+            for listing_id in gone:
+                del self._entries[listing_id]
+            unknown = sorted(stored.difference(self._entries))
+            if gone:
+                self._dirty += 1
+        if gone:
+            print(f"⚠ {len(gone)} manifest entries have no stored listing, dropped")
+        for listing_id in unknown:
+            data = store.get_listing(listing_id)
+            if data is not None:
+                self.update(listing_id, last_updated=data.get("last_updated"), status=data.get("status"))
+
+    def record_listing(self, listing_id: str, data: Dict[str, Any], size: int) -> None:
+        """Refresh an entry after its listing was written to the store."""
+        self.update(listing_id, last_updated=data.get("last_updated"), status=data.get("status"), size=size)
+
+    def rebuild(self) -> None:
+        """One-off bootstrap: read every stored listing once to seed the manifest."""
+        entries = {}
+        store = self._store()
+        for name, data, size in store.iter_listings():
+            listing_id = str(data.get("id") or name)
+            entries[listing_id] = {
+                "last_updated": data.get("last_updated"),
+                "status": data.get("status"),
+                "size": size,
+            }
+
+        with self._lock:
+            self._entries = entries
+            self._dirty += 1
+
+    def get(self, listing_id: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(str(listing_id))
+
+    def __contains__(self, listing_id) -> bool:
+        return str(listing_id) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ids(self):
+        return list(self._entries.keys())
+
+    def update(self, listing_id: str, **fields) -> None:
+        with self._lock:
+            self._entries.setdefault(str(listing_id), {}).update(fields)
+            self._dirty += 1
+
+    def remove(self, listing_id: str) -> None:
+        with self._lock:
+            if self._entries.pop(str(listing_id), None) is not None:
+                self._dirty += 1
+
+    def last_refreshed(self, listing_id: str) -> Optional[datetime]:
+        """Latest of last_updated and checked_at, or None if unknown."""
+        entry = self.get(listing_id) or {}
+        stamps = []
+        for key in ("last_updated", "checked_at"):
+            try:
+                if entry.get(key):
+                    stamps.append(datetime.fromisoformat(entry[key]))
+            except ValueError:
+                continue
+        return max(stamps) if stamps else None
+
+    def save(self, min_changes: int = 1) -> None:
+        """Write atomically once at least `min_changes` updates are pending."""
+        with self._lock:
+            if self._dirty < min_changes:
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self._dirty = 0
@@ -0,0 +1,191 @@
+"""
+Parser engines for Domain listing pages.
+
+Each engine parses the HTML once and collects every node carrying a
+`data-testid` attribute, plus `<img src>` tags, in a single traversal. The
+extractors in step2_get_details.py then work off dictionary lookups and small
+subtree searches instead of walking the whole document a dozen times.
+
+Select an engine with STEP2_PARSER=auto|lxml|bs4. `auto` (the default) uses
+lxml when it is installed and falls back to BeautifulSoup with html.parser.
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Optional fast backend (gracefully degrades to BeautifulSoup if not available)
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Content of these tags is never visible text (matches BeautifulSoup.get_text)
+_NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+def _lxml_strings(el):
+    """Yield the text nodes under an lxml element in document order, skipping comments."""
+    if el.text and el.tag not in _NON_TEXT_TAGS:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+            yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+class LxmlNode:
+    """Thin wrapper giving lxml elements the interface the extractors use."""
+
+    __slots__ = ("el",)
+
+    def __init__(self, el):
+        self.el = el
+
+    @property
+    def tag(self):
+        return self.el.tag
+
+    def text(self, sep: str = "") -> str:
+        return sep.join(s.strip() for s in _lxml_strings(self.el) if s.strip())
+
+    def find_all(self, testid: Optional[str] = None, tag: Optional[str] = None):
+        for el in self.el.iterdescendants(tag) if tag else self.el.iterdescendants():
+            if not isinstance(el.tag, str):
+                continue
+            if testid is None or el.get("data-testid") == testid:
+                yield LxmlNode(el)
+
+    def find(self, testid: Optional[str] = None, tag: Optional[str] = None):
+        return next(self.find_all(testid, tag), None)
+
+    def has_ancestor(self, testid: str, tag: Optional[str] = None) -> bool:
+        for el in self.el.iterancestors(tag) if tag else self.el.iterancestors():
+            if el.get("data-testid") == testid:
+                return True
+        return False
+
+
+class SoupNode:
+    """Thin wrapper giving BeautifulSoup tags the interface the extractors use."""
+
+    __slots__ = ("el",)
+
+    def __init__(self, el):
+        self.el = el
+
+    @property
+    def tag(self):
+        return self.el.name
+
+    def text(self, sep: str = "") -> str:
+        return self.el.get_text(sep, strip=True)
+
+    def find_all(self, testid: Optional[str] = None, tag: Optional[str] = None):
+        attrs = {"data-testid": testid} if testid is not None else {}
+        for el in self.el.find_all(tag or True, attrs=attrs):
+            yield SoupNode(el)
+
+    def find(self, testid: Optional[str] = None, tag: Optional[str] = None):
+        return next(self.find_all(testid, tag), None)
+
+    def has_ancestor(self, testid: str, tag: Optional[str] = None) -> bool:
+        return self.el.find_parent(tag, {"data-testid": testid}) is not None
+
+
+class ParsedPage:
+    """Index of a parsed listing page: data-testid -> nodes, plus image sources."""
+
+    def __init__(self, by_testid: Dict[str, list], images: List[str], root):
+        self.by_testid = by_testid
+        self.images = images
+        self.root = root
+        self._full_text = {}
+
+    def all(self, testid: str, tag: Optional[str] = None) -> list:
+        nodes = self.by_testid.get(testid, [])
+        if tag is None:
+            return nodes
+        return [n for n in nodes if n.tag == tag]
+
+    def first(self, testid: str, tag: Optional[str] = None):
+        for node in self.by_testid.get(testid, []):
+            if tag is None or node.tag == tag:
+                return node
+        return None
+
+    def full_text(self, sep: str = " ") -> str:
+        """Visible text of the whole document; computed lazily and only once."""
+        if sep not in self._full_text:
+            self._full_text[sep] = self.root.text(sep)
+        return self._full_text[sep]
+
+
+def _parse_lxml(html: str) -> ParsedPage:
+    try:
+        root = lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        root = lxml.html.document_fromstring(html.encode("utf-8"))
+
+    by_testid = {}
+    images = []
+    # one C-level traversal collects everything the extractors need
+    for el in root.xpath("//*[@data-testid] | //img[@src]"):
+        testid = el.get("data-testid")
+        if testid is not None:
+            by_testid.setdefault(testid, []).append(LxmlNode(el))
+        if el.tag == "img" and el.get("src") is not None:
+            images.append(el.get("src"))
+    return ParsedPage(by_testid, images, LxmlNode(root))
+
+
+def _is_indexed(tag) -> bool:
+    return tag.has_attr("data-testid") or (tag.name == "img" and tag.has_attr("src"))
+
+
+def _parse_bs4(html: str) -> ParsedPage:
+    soup = BeautifulSoup(html, "html.parser")
+
+    by_testid = {}
+    images = []
+    for el in soup.find_all(_is_indexed):
+        testid = el.get("data-testid")
+        if testid is not None:
+            by_testid.setdefault(testid, []).append(SoupNode(el))
+        if el.name == "img" and el.has_attr("src"):
+            images.append(el.get("src"))
+    return ParsedPage(by_testid, images, SoupNode(soup))
+
+
+ENGINES = {
+    "lxml": _parse_lxml,
+    "bs4": _parse_bs4,
+}
+
+
+def available_engines() -> List[str]:
+    return [name for name in ENGINES if name != "lxml" or LXML_AVAILABLE]
+
+
+def resolve_engine(name: Optional[str] = None) -> str:
+    """Map an engine name (or STEP2_PARSER) to an installed engine."""
+    name = (name or os.environ.get("STEP2_PARSER", "auto")).strip().lower()
+    if name == "auto":
+        return "lxml" if LXML_AVAILABLE else "bs4"
+    if name not in ENGINES:
+        raise ValueError(f"Unknown parser engine '{name}', expected one of: auto, {', '.join(ENGINES)}")
+    if name == "lxml" and not LXML_AVAILABLE:
+        logger.warning("lxml is not installed, falling back to BeautifulSoup")
+        return "bs4"
+    return name
+
+
+def parse_page(html: str, engine: Optional[str] = None) -> ParsedPage:
+    return ENGINES[resolve_engine(engine)](html)
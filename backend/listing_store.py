@@ -0,0 +1,470 @@
+"""
+Storage for listings, commute results, listing ids and votes.
+
+Two interchangeable backends, picked with `LISTING_STORE`:
+
+- `json` (default): the original layout under DATA_DIR — `listings/<id>.json`,
+  `commute/<id>.json`, `listing_ids.json` and `votes.json`.
+- `sqlite`: a single `homefinder.db` in WAL mode. Each record is kept as its
+  JSON document, with suburb, status, travel time and workflow status copied
+  into indexed columns so filtering is a query rather than a directory walk.
+
+The steps only use the helpers below, so either backend can sit behind them.
+The frontend and API still read the JSON layout; with the SQLite store, run
+
+    python listing_store.py export [--out DIR]
+
+to write it out (and `python listing_store.py import` to load an existing
+JSON data directory into the database).
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from vote_events import replay_journal
+
+try:
+    import fcntl
+    FLOCK_AVAILABLE = True
+except ImportError:
+    FLOCK_AVAILABLE = False
+
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+LISTING_STORE = os.environ.get("LISTING_STORE", "json").lower()
+LISTING_DB = os.environ.get("LISTING_DB", os.path.join(DATA_DIR, "homefinder.db"))
+
+
+def _dump(data) -> str:
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def _write_atomic(path: str, text: str) -> int:
+    """Write text to path via a tmp file; returns the size in bytes.
+
+    A file that already holds exactly this text is left alone, so its mtime
+    only moves when the content does (the frontend's listing index and the
+    Postgres sync both key off mtimes).
+    """
+    encoded = text.encode("utf-8")
+    try:
+        if os.path.getsize(path) == len(encoded):
+            with open(path, "rb") as f:
+                if f.read() == encoded:
+                    return len(encoded)
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(encoded)
+    os.replace(tmp, path)
+    return len(encoded)
+
+
+def _read_json(path: str):
+    """Parsed JSON at path, or None if it is missing or unreadable."""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠ Could not read {path}: {e}")
+        return None
+
+
+@contextmanager
+def _shared_lock(lock_path: str):
+    """Shared flock on the frontend's votes.lock, so a compaction can't be read half-done."""
+    try:
+        f = open(lock_path, "a") if FLOCK_AVAILABLE else None
+    except OSError:
+        f = None  # read-only data dir: read without the lock
+    if f is None:
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_votes(votes_file: str) -> dict:
+    """votes.json with the frontend's pending `votes.journal` events applied.
+
+    The journal holds one event line per change made since the last
+    compaction (see frontend/vote_store.py), applied in order.
+    """
+    base = os.path.splitext(votes_file)[0]
+    with _shared_lock(base + ".lock"):
+        votes = _read_json(votes_file) or {}
+        try:
+            with open(base + ".journal", "rb") as f:
+                journal = f.read()
+        except OSError:
+            journal = b""
+    replay_journal(votes, journal)
+    return votes
+
+
+def votes_version(votes_file: str) -> str:
+    """Changes whenever votes.json or its journal does."""
+    parts = []
+    for path in (votes_file, os.path.splitext(votes_file)[0] + ".journal"):
+        try:
+            st = os.stat(path)
+            parts.append(f"{st.st_ino}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append("-")
+    return "|".join(parts)
+
+
+def _travel_seconds(data: dict) -> Optional[int]:
+    try:
+        return int(data["travel_duration_seconds"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _matches(data: dict, suburb=None, status=None, max_travel_seconds=None) -> bool:
+    if suburb is not None and (data.get("suburb") or "").lower() != suburb.lower():
+        return False
+    if status is not None and data.get("status") != status:
+        return False
+    if max_travel_seconds is not None:
+        seconds = _travel_seconds(data)
+        if seconds is None or seconds > max_travel_seconds:
+            return False
+    return True
+
+
+class JsonListingStore:
+    """The per-file layout under DATA_DIR."""
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self.listings_dir = os.path.join(data_dir, "listings")
+        self.commute_dir = os.path.join(data_dir, "commute")
+        self.listing_ids_file = os.path.join(data_dir, "listing_ids.json")
+        self.votes_file = os.path.join(data_dir, "votes.json")
+        self.location = self.listings_dir + "/"
+
+    # ---------- listings ----------
+
+    def listing_ids(self) -> List[str]:
+        if not os.path.isdir(self.listings_dir):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(self.listings_dir) if name.lower().endswith(".json"))
+
+    def get_listing(self, listing_id) -> Optional[dict]:
+        return _read_json(os.path.join(self.listings_dir, f"{listing_id}.json"))
+
+    def save_listing(self, listing_id, data: dict, merge: bool = True) -> Tuple[dict, int]:
+        """Store a listing, merged over the existing one unless merge=False.
+
+        Returns (stored_data, size_in_bytes).
+        """
+        if merge:
+            data = dict(self.get_listing(listing_id) or {}, **data)
+        size = _write_atomic(os.path.join(self.listings_dir, f"{listing_id}.json"), _dump(data))
+        return data, size
+
+    def iter_listings(self) -> Iterator[Tuple[str, dict, int]]:
+        """Yield (listing_id, data, size_in_bytes) for every readable listing."""
+        for listing_id in self.listing_ids():
+            path = os.path.join(self.listings_dir, f"{listing_id}.json")
+            data = _read_json(path)
+            if data is not None:
+                yield listing_id, data, os.path.getsize(path)
+
+    def query_listings(self, suburb=None, status=None, max_travel_seconds=None) -> List[dict]:
+        return [data for _, data, _ in self.iter_listings() if _matches(data, suburb, status, max_travel_seconds)]
+
+    # ---------- commutes ----------
+
+    def get_commutes(self, listing_id) -> Optional[dict]:
+        return _read_json(os.path.join(self.commute_dir, f"{listing_id}.json"))
+
+    def save_commutes(self, listing_id, data: dict) -> None:
+        _write_atomic(os.path.join(self.commute_dir, f"{listing_id}.json"), _dump(data))
+
+    # ---------- listing ids (step 1) ----------
+
+    def load_listing_ids(self):
+        """The listing_ids.json document (dict, or a legacy list), or None if missing.
+
+        An unreadable file raises rather than reading as empty, so step 1 can't
+        overwrite it with a fresh list.
+        """
+        if not os.path.isfile(self.listing_ids_file):
+            return None
+        with open(self.listing_ids_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_listing_ids(self, data) -> None:
+        _write_atomic(self.listing_ids_file, _dump(data))
+
+    # ---------- votes (written by the frontend) ----------
+
+    def load_votes(self) -> dict:
+        return read_votes(self.votes_file)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteListingStore:
+    """Listings, commutes, listing ids and votes in one SQLite database (WAL mode).
+
+    Connections are per thread, so the store can be shared by worker pools.
+    Votes stay owned by the frontend's votes.json and journal; the votes table
+    mirrors them and is refreshed whenever either file changes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS listings (
+            id TEXT PRIMARY KEY,
+            suburb TEXT,
+            status TEXT,
+            travel_duration_seconds INTEGER,
+            last_updated TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_listings_suburb ON listings (suburb COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_listings_status ON listings (status);
+        CREATE INDEX IF NOT EXISTS idx_listings_travel ON listings (travel_duration_seconds);
+        CREATE TABLE IF NOT EXISTS commutes (
+            listing_id TEXT PRIMARY KEY,
+            address TEXT,
+            queried_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS listing_ids (
+            id TEXT PRIMARY KEY,
+            status TEXT,
+            added_date TEXT,
+            updated_date TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_listing_ids_status ON listing_ids (status);
+        CREATE TABLE IF NOT EXISTS votes (
+            listing_id TEXT PRIMARY KEY,
+            workflow_status TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_votes_workflow ON votes (workflow_status);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path: str = LISTING_DB, data_dir: str = DATA_DIR):
+        self.path = path
+        self.location = path
+        self.votes_file = os.path.join(data_dir, "votes.json")
+        self._local = threading.local()
+        self._votes_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- listings ----------
+
+    def listing_ids(self) -> List[str]:
+        return [row[0] for row in self._conn().execute("SELECT id FROM listings ORDER BY id")]
+
+    def get_listing(self, listing_id) -> Optional[dict]:
+        row = self._conn().execute("SELECT data FROM listings WHERE id = ?", (str(listing_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_listing(self, listing_id, data: dict, merge: bool = True) -> Tuple[dict, int]:
+        conn = self._conn()
+        with conn:
+            if merge:
+                # BEGIN IMMEDIATE so concurrent merges of the same listing can't interleave
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT data FROM listings WHERE id = ?", (str(listing_id),)).fetchone()
+                if row:
+                    data = dict(json.loads(row[0]), **data)
+            text = _dump(data)
+            conn.execute(
+                "INSERT OR REPLACE INTO listings (id, suburb, status, travel_duration_seconds, last_updated, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(listing_id), data.get("suburb"), data.get("status"), _travel_seconds(data), data.get("last_updated"), text),
+            )
+        return data, len(text.encode("utf-8"))
+
+    def iter_listings(self) -> Iterator[Tuple[str, dict, int]]:
+        # look rows up one by one rather than holding a cursor open, so callers
+        # can save listings while iterating
+        for listing_id in self.listing_ids():
+            row = self._conn().execute("SELECT data FROM listings WHERE id = ?", (listing_id,)).fetchone()
+            if row:
+                yield listing_id, json.loads(row[0]), len(row[0].encode("utf-8"))
+
+    def query_listings(self, suburb=None, status=None, max_travel_seconds=None) -> List[dict]:
+        clauses, params = [], []
+        if suburb is not None:
+            clauses.append("suburb = ? COLLATE NOCASE")
+            params.append(suburb)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if max_travel_seconds is not None:
+            clauses.append("travel_duration_seconds <= ?")
+            params.append(int(max_travel_seconds))
+        sql = "SELECT data FROM listings"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return [json.loads(row[0]) for row in self._conn().execute(sql + " ORDER BY id", params)]
+
+    # ---------- commutes ----------
+
+    def get_commutes(self, listing_id) -> Optional[dict]:
+        row = self._conn().execute("SELECT data FROM commutes WHERE listing_id = ?", (str(listing_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_commutes(self, listing_id, data: dict) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO commutes (listing_id, address, queried_at, data) VALUES (?, ?, ?, ?)",
+                (str(listing_id), data.get("address"), data.get("queried_at"), _dump(data)),
+            )
+
+    # ---------- listing ids (step 1) ----------
+
+    def load_listing_ids(self):
+        rows = self._conn().execute("SELECT id, data FROM listing_ids ORDER BY rowid").fetchall()
+        if not rows:
+            return None
+        return {listing_id: json.loads(text) for listing_id, text in rows}
+
+    def save_listing_ids(self, data) -> None:
+        if isinstance(data, list):
+            data = {listing_id: {"id": listing_id} for listing_id in data}
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM listing_ids")
+            conn.executemany(
+                "INSERT INTO listing_ids (id, status, added_date, updated_date, data) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (str(listing_id), entry.get("status"), entry.get("added_date"), entry.get("updated_date"), json.dumps(entry, ensure_ascii=False))
+                    for listing_id, entry in data.items()
+                ],
+            )
+
+    # ---------- votes (written by the frontend) ----------
+
+    def _sync_votes(self) -> None:
+        """Re-import votes.json and its journal into the votes table if either changed since the last sync."""
+        version = votes_version(self.votes_file)
+        with self._votes_lock:
+            conn = self._conn()
+            row = conn.execute("SELECT value FROM meta WHERE key = 'votes_version'").fetchone()
+            if row and row[0] == version:
+                return
+            votes = read_votes(self.votes_file)
+            with conn:
+                conn.execute("DELETE FROM votes")
+                conn.executemany(
+                    "INSERT INTO votes (listing_id, workflow_status, data) VALUES (?, ?, ?)",
+                    [
+                        (str(listing_id), (vote or {}).get("workflow_status"), json.dumps(vote, ensure_ascii=False))
+                        for listing_id, vote in votes.items()
+                    ],
+                )
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('votes_version', ?)", (version,))
+
+    def load_votes(self) -> dict:
+        self._sync_votes()
+        return {listing_id: json.loads(text) for listing_id, text in self._conn().execute("SELECT listing_id, data FROM votes")}
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store selected by LISTING_STORE."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if LISTING_STORE == "sqlite":
+                _store = SqliteListingStore()
+            else:
+                if LISTING_STORE != "json":
+                    print(f"⚠ Unknown LISTING_STORE '{LISTING_STORE}', using json")
+                _store = JsonListingStore()
+        return _store
+
+
+def copy_store(source, target) -> Dict[str, int]:
+    """Copy every listing, commute result and the listing ids from source to target."""
+    counts = {"listings": 0, "commutes": 0, "listing_ids": 0}
+    for listing_id, data, _ in source.iter_listings():
+        target.save_listing(listing_id, data, merge=False)
+        counts["listings"] += 1
+        commutes = source.get_commutes(listing_id)
+        if commutes is not None:
+            target.save_commutes(listing_id, commutes)
+            counts["commutes"] += 1
+    ids = source.load_listing_ids()
+    if ids is not None:
+        target.save_listing_ids(ids)
+        counts["listing_ids"] = len(ids)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write the SQLite store out as the JSON layout")
+    export.add_argument("--out", default=DATA_DIR, help="data directory to write (default DATA_DIR)")
+    imp = sub.add_parser("import", help="load a JSON data directory into the SQLite store")
+    imp.add_argument("--from", dest="source", default=DATA_DIR, help="data directory to read (default DATA_DIR)")
+    query = sub.add_parser("query", help="list listing ids matching the filters")
+    query.add_argument("--suburb")
+    query.add_argument("--status")
+    query.add_argument("--max-travel-minutes", type=float)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        counts = copy_store(SqliteListingStore(), JsonListingStore(args.out))
+        print(f"✔ Exported {counts['listings']} listings, {counts['commutes']} commute files and {counts['listing_ids']} listing ids to {args.out}")
+    elif args.command == "import":
+        counts = copy_store(JsonListingStore(args.source), SqliteListingStore())
+        print(f"✔ Imported {counts['listings']} listings, {counts['commutes']} commute files and {counts['listing_ids']} listing ids into {LISTING_DB}")
+    else:
+        max_seconds = args.max_travel_minutes * 60 if args.max_travel_minutes is not None else None
+        for data in get_store().query_listings(args.suburb, args.status, max_seconds):
+            print(data.get("id"), data.get("suburb"), data.get("status"), data.get("travel_duration_text"), sep="\t")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
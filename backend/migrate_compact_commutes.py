@@ -0,0 +1,132 @@
+"""
+Shrink commute and listing JSON written before step 3 stored compact Directions responses.
+
+Rewrites, in place:
+
+- `commute/<id>.json`       every `commutes[*].result.raw_response`
+- `listings/<id>.json`      `google_transit.response`
+- `commute_cache.json`      every cached `result.raw_response`
+
+to the compact form from directions_compact.py. Files already compact are
+left untouched, so the script is safe to re-run.
+
+    python migrate_compact_commutes.py [--dry-run] [--archive]
+
+`--archive` first writes each full payload to `$DATA_DIR/commute_raw/`.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from directions_compact import archive_raw_response, compact_directions_response
+
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+LISTINGS_DIR = os.path.join(DATA_DIR, "listings")
+COMMUTE_DIR = os.path.join(DATA_DIR, "commute")
+CACHE_PATH = os.path.join(DATA_DIR, "commute_cache.json")
+
+
+def compact_in_place(holder, key, request, archive):
+    """Compact holder[key]; returns True if it changed."""
+    raw = holder.get(key)
+    compact = compact_directions_response(raw)
+    if compact is raw:
+        return False
+    if archive:
+        archive_raw_response(request, raw)
+    holder[key] = compact
+    return True
+
+
+def migrate_commute_file(data, archive):
+    changed = False
+    for item in data.get("commutes") or []:
+        result = item.get("result")
+        if not isinstance(result, dict):
+            continue
+        request = {
+            "origin": data.get("address"),
+            "destination": item.get("destination"),
+            "mode": item.get("mode"),
+            "arrival_timestamp": item.get("arrival_timestamp"),
+        }
+        changed |= compact_in_place(result, "raw_response", request, archive)
+    return changed
+
+
+def migrate_listing_file(data, archive):
+    transit = data.get("google_transit")
+    if not isinstance(transit, dict):
+        return False
+    request = dict(transit.get("request") or {}, arrival_timestamp=transit.get("arrival_timestamp"))
+    return compact_in_place(transit, "response", request, archive)
+
+
+def rewrite(path, migrate, archive, dry_run, indent=2):
+    """Migrate one JSON file; returns (bytes_before, bytes_after)."""
+    before = os.path.getsize(path)
+    try:
+        with open(path, "r", encoding="utf8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"  [WARN] Could not read {path}: {e}")
+        return before, before
+    if not migrate(data, archive):
+        return before, before
+    text = json.dumps(data, indent=indent, ensure_ascii=False)
+    after = len(text.encode("utf8"))
+    if not dry_run:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    return before, after
+
+
+def migrate_cache(data, archive):
+    changed = False
+    for entry in data.values():
+        result = entry.get("result")
+        if isinstance(result, dict):
+            # cached payloads duplicate the commute files, which are archived already
+            changed |= compact_in_place(result, "raw_response", None, False)
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report savings without writing")
+    parser.add_argument("--archive", action="store_true", help="save full payloads to the gzip side-archive first")
+    args = parser.parse_args()
+
+    targets = [
+        ("commute", COMMUTE_DIR, migrate_commute_file),
+        ("listings", LISTINGS_DIR, migrate_listing_file),
+    ]
+    for label, directory, migrate in targets:
+        if not os.path.isdir(directory):
+            print(f"⚠ {directory} not found, skipping")
+            continue
+        total_before = total_after = changed = 0
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            before, after = rewrite(os.path.join(directory, name), migrate, args.archive, args.dry_run)
+            total_before += before
+            total_after += after
+            changed += before != after
+        print(f"✔ {label}: {changed} files compacted, {total_before / 1024:.0f} KiB -> {total_after / 1024:.0f} KiB")
+
+    if os.path.isfile(CACHE_PATH):
+        before, after = rewrite(CACHE_PATH, migrate_cache, args.archive, args.dry_run, indent=None)
+        print(f"✔ commute cache: {before / 1024:.0f} KiB -> {after / 1024:.0f} KiB")
+
+    if args.dry_run:
+        print("Dry run, nothing written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
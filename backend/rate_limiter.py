@@ -0,0 +1,67 @@
+"""
+Rate limiting and latency bookkeeping shared by the scraping steps.
+"""
+
+import threading
+import time
+from typing import Dict, Any
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second.
+
+    `capacity` is the burst size; the default of 1 keeps requests evenly
+    spaced. A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class LatencyStats:
+    """Collects per-request latencies (seconds) from multiple threads."""
+
+    def __init__(self):
+        self._samples = []
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return count, mean, p50, p95 and max latency in seconds."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": 0, "mean": None, "p50": None, "p95": None, "max": None}
+
+        def pct(p):
+            return samples[min(len(samples) - 1, int(round(p * (len(samples) - 1))))]
+
+        return {
+            "count": len(samples),
+            "mean": round(sum(samples) / len(samples), 3),
+            "p50": round(pct(0.50), 3),
+            "p95": round(pct(0.95), 3),
+            "max": round(samples[-1], 3),
+        }
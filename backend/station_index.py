@@ -0,0 +1,194 @@
+"""
+Local catalogue of train stations for step 3's nearest-station lookup.
+
+Stations are fetched from Google Places one grid cell at a time and kept in
+`stations.json` together with the time each cell was last searched, so a cell
+is only re-queried every STATION_CATALOGUE_TTL_DAYS. Lookups scan the block of
+cells around the query point that the search radius can reach in an in-memory
+grid, and walking legs to the chosen station are cached by (rounded origin,
+station).
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+DATA_DIR = os.environ.get("DATA_DIR", ".")
+STATIONS_PATH = os.path.join(DATA_DIR, "stations.json")
+CATALOGUE_TTL_DAYS = float(os.environ.get("STATION_CATALOGUE_TTL_DAYS", "90"))
+# ~2.8km x 2.3km in Sydney; lookups widen past the 3x3 block for larger radii
+CELL_DEGREES = 0.025
+# origins are rounded to ~10m for the walking leg cache
+ORIGIN_PRECISION = 4
+EARTH_RADIUS_M = 6371000
+WALKING_SPEED_MPS = 1.3
+# street network detour over straight-line distance
+WALKING_DETOUR = 1.3
+
+Station = Dict[str, Any]
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def estimate_walk(distance_m: float) -> Dict[str, Any]:
+    """Walking leg estimated from straight-line distance, for when Directions is unavailable."""
+    walking_distance = distance_m * WALKING_DETOUR
+    return {
+        "walking_seconds": int(walking_distance / WALKING_SPEED_MPS),
+        "walking_distance_m": int(walking_distance),
+        "estimated": True,
+    }
+
+
+def cell_of(lat: float, lng: float) -> Tuple[int, int]:
+    return (math.floor(lat / CELL_DEGREES), math.floor(lng / CELL_DEGREES))
+
+
+def cell_key(cell: Tuple[int, int]) -> str:
+    return f"{cell[0]}:{cell[1]}"
+
+
+def cell_centre(cell: Tuple[int, int]) -> Tuple[float, float]:
+    return ((cell[0] + 0.5) * CELL_DEGREES, (cell[1] + 0.5) * CELL_DEGREES)
+
+
+def cells_within(lat: float, lng: float, radius_m: float) -> List[Tuple[int, int]]:
+    """Every cell holding points within `radius_m` of (lat, lng).
+
+    A cell is ~2.8km tall but narrower east-west away from the equator, so the
+    block is ceil(radius / cell size) cells either side of the query cell,
+    measured at the poleward edge of the search where cells are narrowest.
+    """
+    row, col = cell_of(lat, lng)
+    cell_height_m = math.radians(CELL_DEGREES) * EARTH_RADIUS_M
+    rows = max(1, math.ceil(radius_m / cell_height_m))
+    edge_lat = min(abs(lat) + math.degrees(radius_m / EARTH_RADIUS_M), 89.0)
+    cols = max(1, math.ceil(radius_m / (cell_height_m * math.cos(math.radians(edge_lat)))))
+    return [(row + dr, col + dc) for dr in range(-rows, rows + 1) for dc in range(-cols, cols + 1)]
+
+
+def cell_radius_m(cell: Tuple[int, int]) -> int:
+    """Search radius from the cell centre that covers the whole cell."""
+    lat, lng = cell_centre(cell)
+    half = CELL_DEGREES / 2
+    return int(haversine_m(lat, lng, lat + half, lng + half)) + 50
+
+
+class StationIndex:
+    """Grid-indexed station catalogue plus walking leg cache, saved as JSON.
+
+    `fetch_stations(lat, lng, radius_m)` returns a list of {name, lat, lng}
+    for that circle, or None if the lookup failed (the cell is then left
+    uncovered and retried on a later run).
+    """
+
+    def __init__(self, path: str = STATIONS_PATH, ttl_days: float = CATALOGUE_TTL_DAYS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self._lock = threading.Lock()
+        # serialises Places fetches so concurrent lookups don't search the same cell twice
+        self._coverage_lock = threading.Lock()
+        self.stations: Dict[str, Station] = {}
+        self.cells: Dict[str, int] = {}
+        self.walks: Dict[str, Dict[str, Any]] = {}
+        self._grid: Dict[Tuple[int, int], List[Station]] = {}
+        self._failed_cells = set()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: str = STATIONS_PATH, ttl_days: float = CATALOGUE_TTL_DAYS) -> "StationIndex":
+        index = cls(path, ttl_days)
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf8") as f:
+                    data = json.load(f)
+                index.stations = data.get("stations", {})
+                index.cells = data.get("cells", {})
+                index.walks = data.get("walks", {})
+            except Exception as e:
+                print(f"[WARN] Ignoring unreadable station catalogue {path}: {e}")
+        index._rebuild_grid()
+        return index
+
+    def _rebuild_grid(self) -> None:
+        self._grid = {}
+        for station in self.stations.values():
+            self._grid.setdefault(cell_of(station["lat"], station["lng"]), []).append(station)
+
+    def _add(self, station: Station) -> None:
+        key = f"{station['name']}@{station['lat']:.5f},{station['lng']:.5f}"
+        if key not in self.stations:
+            self.stations[key] = station
+            self._grid.setdefault(cell_of(station["lat"], station["lng"]), []).append(station)
+
+    def ensure_coverage(self, lat: float, lng: float, radius_m: float, fetch_stations: Callable) -> None:
+        """Search Places for any cell within `radius_m` of (lat, lng) that is missing or stale."""
+        now = time.time()
+        cells = cells_within(lat, lng, radius_m)
+        if all(self._covered(cell_key(cell), now) for cell in cells):
+            return
+        with self._coverage_lock:
+            for cell in cells:
+                key = cell_key(cell)
+                if self._covered(key, now):
+                    continue
+                clat, clng = cell_centre(cell)
+                found = fetch_stations(clat, clng, cell_radius_m(cell))
+                with self._lock:
+                    if found is None:
+                        self._failed_cells.add(key)
+                        continue
+                    for station in found:
+                        self._add({"name": station["name"], "lat": float(station["lat"]), "lng": float(station["lng"])})
+                    self.cells[key] = int(now)
+                    self._dirty = True
+
+    def _covered(self, key: str, now: float) -> bool:
+        """True if the cell was searched within the TTL (or already failed this run)."""
+        with self._lock:
+            return now - self.cells.get(key, 0) < self.ttl_seconds or key in self._failed_cells
+
+    def nearest(self, lat: float, lng: float, max_distance_m: float) -> Optional[Tuple[Station, float]]:
+        """Closest known station within `max_distance_m`, with its straight-line distance."""
+        best = None
+        for cell in cells_within(lat, lng, max_distance_m):
+            for station in self._grid.get(cell, ()):
+                d = haversine_m(lat, lng, station["lat"], station["lng"])
+                if d <= max_distance_m and (best is None or d < best[1]):
+                    best = (station, d)
+        return best
+
+    def walking_leg(self, lat: float, lng: float, station: Station, fetch_walk: Callable) -> Dict[str, Any]:
+        """Cached walking leg to `station`; estimated from distance if `fetch_walk` returns None."""
+        key = f"{round(lat, ORIGIN_PRECISION)},{round(lng, ORIGIN_PRECISION)}|{station['name']}"
+        with self._lock:
+            cached = self.walks.get(key)
+        if cached:
+            return cached
+        walk = fetch_walk(lat, lng, station["lat"], station["lng"])
+        if walk is None:
+            # not cached so a later online run fetches the real route
+            return estimate_walk(haversine_m(lat, lng, station["lat"], station["lng"]))
+        with self._lock:
+            self.walks[key] = walk
+            self._dirty = True
+        return walk
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf8") as f:
+                json.dump({"stations": self.stations, "cells": self.cells, "walks": self.walks}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self._dirty = False
@@ -2,24 +2,24 @@ from curl_cffi import requests
 from bs4 import BeautifulSoup
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import time
 import os
+import threading
 
 from step1_summary import write_step1_summary
+from rate_limiter import TokenBucket, LatencyStats
+from listing_store import get_store
 
 # For loading votes to check rejected status
 def load_votes():
-    """Load votes.json to check for rejected listings."""
-    votes_file = os.path.join(os.environ.get("DATA_DIR", "."), "votes.json")
-    if os.path.exists(votes_file):
-        try:
-            with open(votes_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"⚠ Error loading votes: {e}")
-            return {}
-    return {}
+    """Load votes to check for rejected listings."""
+    try:
+        return get_store().load_votes()
+    except Exception as e:
+        print(f"⚠ Error loading votes: {e}")
+        return {}
 
 def is_rejected(listing_id: str, votes: dict) -> bool:
     """Check if a listing is marked as rejected."""
@@ -27,108 +27,123 @@ def is_rejected(listing_id: str, votes: dict) -> bool:
         return votes[listing_id].get('workflow_status') == 'rejected'
     return False
 
-BASE_URL = (
-    "https://www.domain.com.au/sale/?suburb="
-    "cheltenham-nsw-2119,"
-    "epping-nsw-2121,"
-    "north-epping-nsw-2121,"
-    "eastwood-nsw-2122,"
-    "marsfield-nsw-2122,"
-    "denistone-nsw-2114,"
-    "north-ryde-nsw-2113,"
-    "ryde-nsw-2112,"
-    "bexley-nsw-2207,"
-    "hurstville-nsw-2220,"
-    "earlwood-nsw-2206,"
-    "kingsgrove-nsw-2208,"
-    "rockdale-nsw-2216,"
-    "bexley-north-nsw-2207,"
-    "roselands-nsw-2196,"
-    "como-nsw-2226,"
-    "belmore-nsw-2192,"
-    "canterbury-nsw-2193,"
-    "peakhurst-heights-nsw-2210,"
-    "blakehurst-nsw-2221,"
-    "carlingford-nsw-2118,"
-    "telopea-nsw-2117,"
-    "west-ryde-nsw-2114,"
-    "meadowbank-nsw-2114,"
-    "macquarie-park-nsw-2113,"
-    "pennant-hills-nsw-2120,"
-    "beecroft-nsw-2119,"
-    "gladesville-nsw-2111,"
-    "kogarah-nsw-2217,"
-    "kogarah-bay-nsw-2217,"
-    "allawah-nsw-2218,"
-    "penshurst-nsw-2222,"
-    "mortdale-nsw-2223,"
-    "riverwood-nsw-2210,"
-    "campsie-nsw-2194,"
-    "lakemba-nsw-2195,"
-    "punchbowl-nsw-2196,"
-    "narwee-nsw-2209,"
-    "turrella-nsw-2205,"
-    "bardwell-park-nsw-2207,"
-    "bardwell-valley-nsw-2207,"
-    "hunters-hill-nsw-2110,"
-    "wollstonecraft-nsw-2065,"
-    "lane-cove-nsw-2066,"
-    "oatley-nsw-2223,"
-    "sans-souci-nsw-2219,"
-    "killara-nsw-2071,"
-    "roseville-nsw-2069,"
-    "gordon-nsw-2072,"
-    "croydon-park-nsw-2133,"
-    "warrawee-nsw-2074"
-    "&ptype=free-standing&bedrooms=3-any&bathrooms=2-any&price=0-2500000&excludeunderoffer=1"
-)
+SEARCH_URL = "https://www.domain.com.au/sale/?suburb="
+
+SUBURBS = [
+    "cheltenham-nsw-2119",
+    "epping-nsw-2121",
+    "north-epping-nsw-2121",
+    "eastwood-nsw-2122",
+    "marsfield-nsw-2122",
+    "denistone-nsw-2114",
+    "north-ryde-nsw-2113",
+    "ryde-nsw-2112",
+    "bexley-nsw-2207",
+    "hurstville-nsw-2220",
+    "earlwood-nsw-2206",
+    "kingsgrove-nsw-2208",
+    "rockdale-nsw-2216",
+    "bexley-north-nsw-2207",
+    "roselands-nsw-2196",
+    "como-nsw-2226",
+    "belmore-nsw-2192",
+    "canterbury-nsw-2193",
+    "peakhurst-heights-nsw-2210",
+    "blakehurst-nsw-2221",
+    "carlingford-nsw-2118",
+    "telopea-nsw-2117",
+    "west-ryde-nsw-2114",
+    "meadowbank-nsw-2114",
+    "macquarie-park-nsw-2113",
+    "pennant-hills-nsw-2120",
+    "beecroft-nsw-2119",
+    "gladesville-nsw-2111",
+    "kogarah-nsw-2217",
+    "kogarah-bay-nsw-2217",
+    "allawah-nsw-2218",
+    "penshurst-nsw-2222",
+    "mortdale-nsw-2223",
+    "riverwood-nsw-2210",
+    "campsie-nsw-2194",
+    "lakemba-nsw-2195",
+    "punchbowl-nsw-2196",
+    "narwee-nsw-2209",
+    "turrella-nsw-2205",
+    "bardwell-park-nsw-2207",
+    "bardwell-valley-nsw-2207",
+    "hunters-hill-nsw-2110",
+    "wollstonecraft-nsw-2065",
+    "lane-cove-nsw-2066",
+    "oatley-nsw-2223",
+    "sans-souci-nsw-2219",
+    "killara-nsw-2071",
+    "roseville-nsw-2069",
+    "gordon-nsw-2072",
+    "croydon-park-nsw-2133",
+    "warrawee-nsw-2074",
+]
+
+SEARCH_FILTERS = "&ptype=free-standing&bedrooms=3-any&bathrooms=2-any&price=0-2500000&excludeunderoffer=1"
+
+
+def build_search_url(suburbs):
+    return SEARCH_URL + ",".join(suburbs) + SEARCH_FILTERS
+
+
+BASE_URL = build_search_url(SUBURBS)
 
 DATA_DIR = os.environ.get("DATA_DIR", ".")
-OUTPUT_FILE = os.path.join(DATA_DIR, "listing_ids.json")
 TODAY = datetime.now().strftime("%Y-%m-%d")
 
+# Search pages are fetched in windows of PAGE_WINDOW concurrent requests,
+# sharing a politeness budget of PAGE_RATE_LIMIT requests per second
+PAGE_WINDOW = int(os.environ.get("STEP1_PAGE_WINDOW", "4"))
+PAGE_RATE_LIMIT = float(os.environ.get("STEP1_RATE_LIMIT", "3"))
+
+# The suburb list is split into shards of SHARD_SIZE suburbs, each searched
+# with its own paging cursor; SHARD_WORKERS shards run at the same time.
+SHARD_SIZE = int(os.environ.get("STEP1_SHARD_SIZE", "8"))
+SHARD_WORKERS = int(os.environ.get("STEP1_SHARD_WORKERS", "3"))
+CHECKPOINT_FILE = os.path.join(DATA_DIR, "step1_checkpoint.json")
+
 
 # ---------- persistence ----------
 
 def load_saved_ids():
-    try:
-        with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-            # OLD FORMAT: list of IDs
-            if isinstance(data, list):
-                print("⚠ Detected legacy ID list — migrating format")
-                today = datetime.now().strftime("%Y-%m-%d")
-                return {
-                    id_: {
-                        "id": id_,
-                        "added_date": today,
-                        "updated_date": today,
-                        "status": "missing"
-                    }
-                    for id_ in data
-                }
-
-            # NEW FORMAT: dict
-            if isinstance(data, dict):
-                return data
-
-            print("⚠ Unknown JSON format — starting fresh")
-            return {}
-
-    except FileNotFoundError:
+    data = get_store().load_listing_ids()
+    if data is None:
         return {}
 
+    # OLD FORMAT: list of IDs
+    if isinstance(data, list):
+        print("⚠ Detected legacy ID list — migrating format")
+        today = datetime.now().strftime("%Y-%m-%d")
+        return {
+            id_: {
+                "id": id_,
+                "added_date": today,
+                "updated_date": today,
+                "status": "missing"
+            }
+            for id_ in data
+        }
+
+    # NEW FORMAT: dict
+    if isinstance(data, dict):
+        return data
+
+    print("⚠ Unknown JSON format — starting fresh")
+    return {}
+
 
 def save_ids(data):
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    get_store().save_listing_ids(data)
 
 
 # ---------- scraping ----------
 
-def fetch_page(page_num):
-    url = BASE_URL + f"&page={page_num}"
+def fetch_page(page_num, base_url=BASE_URL):
+    url = base_url + f"&page={page_num}"
 
     headers = {
         "User-Agent": (
@@ -158,27 +173,183 @@ def extract_ids_from_html(html):
     return ids
 
 
-def fetch_all_listing_ids():
-    all_ids = set()
-    page = 1
+def fetch_page_ids(page_num, base_url, limiter, latency):
+    """Fetch one search page once the rate limiter allows it; returns (ids, seconds)."""
+    limiter.acquire()
+    started = time.monotonic()
+    html = fetch_page(page_num, base_url)
+    elapsed = time.monotonic() - started
+    latency.record(elapsed)
+    return extract_ids_from_html(html), elapsed
+
+
+def fetch_all_listing_ids(base_url=BASE_URL, window=PAGE_WINDOW, metrics=None,
+                          limiter=None, latency=None, start_page=1, seen_ids=None, on_window=None):
+    """
+    Page through a search in concurrent windows of `window` pages.
+
+    Pages are evaluated in order and paging stops at the first page that is
+    empty or only repeats IDs already seen. If `metrics` is given it is
+    filled with pages_scraped and per-page latency.
+
+    `start_page` and `seen_ids` resume a search from a checkpoint;
+    `on_window(next_page, ids)` is called after every completed window.
+    """
+    all_ids = set(seen_ids or ())
+    page = start_page
+    window = max(1, window)
+    limiter = limiter or TokenBucket(PAGE_RATE_LIMIT)
+    latency = latency or LatencyStats()
+    page_latencies = {}
+
+    with ThreadPoolExecutor(max_workers=window) as pool:
+        while True:
+            pages = list(range(page, page + window))
+            print(f"Fetching pages {pages[0]}–{pages[-1]}...")
+            futures = [pool.submit(fetch_page_ids, n, base_url, limiter, latency) for n in pages]
+
+            finished = False
+            for n, future in zip(pages, futures):
+                if finished:
+                    # past the end of the results: drop pages that were
+                    # still queued, only record latency of ones in flight
+                    if not future.cancel() and future.exception() is None:
+                        page_latencies[n] = round(future.result()[1], 3)
+                    continue
+
+                ids, elapsed = future.result()
+                page_latencies[n] = round(elapsed, 3)
+                print(f" → Page {n}: found {len(ids)} IDs")
+
+                if not ids:
+                    finished = True
+                elif ids.issubset(all_ids):
+                    print("Page repeated — stopping.")
+                    finished = True
+                else:
+                    all_ids |= ids
+
+            if finished:
+                break
+            page += window
+            if on_window:
+                on_window(page, all_ids)
+
+    if metrics is not None:
+        metrics["pages_scraped"] = metrics.get("pages_scraped", 0) + len(page_latencies)
+        metrics.setdefault("page_latency_seconds", {}).update({str(n): t for n, t in page_latencies.items()})
+        metrics["page_latency_summary"] = latency.summary()
+
+    return all_ids
 
-    while True:
-        print(f"Fetching page {page}...")
-        html = fetch_page(page)
-        ids = extract_ids_from_html(html)
 
-        print(f" → Found {len(ids)} IDs")
+# ---------- sharded search ----------
 
-        if not ids:
-            break
+def make_shards(suburbs, size=SHARD_SIZE):
+    size = max(1, size)
+    return [suburbs[i:i + size] for i in range(0, len(suburbs), size)]
 
-        if ids.issubset(all_ids):
-            print("Page repeated — stopping.")
-            break
 
-        all_ids |= ids
-        page += 1
-        time.sleep(0.3)
+def shard_key(suburbs):
+    return ",".join(suburbs)
+
+
+def load_checkpoint():
+    """Return per-shard progress saved today for the current search filters."""
+    try:
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠ Ignoring unreadable checkpoint {CHECKPOINT_FILE}: {e}")
+        return {}
+
+    # a checkpoint from an earlier day or a different search is stale
+    if checkpoint.get("date") != TODAY or checkpoint.get("filters") != SEARCH_FILTERS:
+        return {}
+    return checkpoint.get("shards", {})
+
+
+def save_checkpoint(shards):
+    tmp = CHECKPOINT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"date": TODAY, "filters": SEARCH_FILTERS, "shards": shards}, f)
+    os.replace(tmp, CHECKPOINT_FILE)
+
+
+def clear_checkpoint():
+    try:
+        os.remove(CHECKPOINT_FILE)
+    except FileNotFoundError:
+        pass
+
+
+def search_all_shards(suburbs=SUBURBS, metrics=None):
+    """
+    Search every suburb shard concurrently and merge their IDs.
+
+    Progress is checkpointed after every page window, so a crashed run
+    resumes each shard from its cursor instead of re-scraping. Raises
+    RuntimeError if any shard failed; completed shards stay checkpointed.
+    """
+    limiter = TokenBucket(PAGE_RATE_LIMIT)
+    latency = LatencyStats()
+    lock = threading.Lock()
+    progress = load_checkpoint()
+    shards = make_shards(suburbs)
+    shard_metrics = {}
+
+    def record(key, **fields):
+        with lock:
+            progress.setdefault(key, {}).update(fields)
+            save_checkpoint(progress)
+
+    def run_shard(index, shard):
+        key = shard_key(shard)
+        state = progress.get(key, {})
+        if state.get("done"):
+            print(f"[shard {index}] already complete ({len(state.get('ids', []))} IDs), skipping")
+            return set(state.get("ids", []))
+
+        start_page = state.get("next_page", 1)
+        if start_page > 1:
+            print(f"[shard {index}] resuming at page {start_page}")
+        m = shard_metrics.setdefault(key, {})
+        ids = fetch_all_listing_ids(
+            base_url=build_search_url(shard),
+            metrics=m,
+            limiter=limiter,
+            latency=latency,
+            start_page=start_page,
+            seen_ids=state.get("ids"),
+            on_window=lambda next_page, seen: record(key, next_page=next_page, ids=sorted(seen)),
+        )
+        record(key, done=True, ids=sorted(ids))
+        print(f"[shard {index}] {len(shard)} suburbs → {len(ids)} IDs")
+        return ids
+
+    resumed = sum(1 for shard in shards if progress.get(shard_key(shard)))
+    all_ids = set()
+    errors = []
+    print(f"Searching {len(suburbs)} suburbs in {len(shards)} shards ({SHARD_WORKERS} at a time)")
+    with ThreadPoolExecutor(max_workers=max(1, SHARD_WORKERS)) as pool:
+        futures = {pool.submit(run_shard, i, shard): shard for i, shard in enumerate(shards, 1)}
+        for future in as_completed(futures):
+            try:
+                all_ids |= future.result()
+            except Exception as e:
+                errors.append(f"{shard_key(futures[future])}: {type(e).__name__}: {e}")
+
+    if metrics is not None:
+        metrics["pages_scraped"] = sum(m.get("pages_scraped", 0) for m in shard_metrics.values())
+        metrics["page_latency_summary"] = latency.summary()
+        metrics["shards"] = len(shards)
+        metrics["shards_resumed"] = resumed
+        metrics["shard_metrics"] = shard_metrics
+
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(shards)} shards failed: " + "; ".join(errors))
 
     return all_ids
 
@@ -187,6 +358,7 @@ def fetch_all_listing_ids():
 
 if __name__ == "__main__":
     print("Fetching latest listings:", TODAY)
+    started = time.monotonic()
 
     # Load votes to check for rejected listings
     votes = load_votes()
@@ -194,7 +366,14 @@ if __name__ == "__main__":
     print(f"Loaded votes with {rejected_count} rejected listings")
 
     existing = load_saved_ids()
-    current_ids = fetch_all_listing_ids()
+    fetch_metrics = {}
+    try:
+        current_ids = search_all_shards(metrics=fetch_metrics)
+    except RuntimeError as e:
+        # existing IDs must not be marked missing from an incomplete search
+        print(f"❌ {e}")
+        print(f"Completed shards are checkpointed in {CHECKPOINT_FILE}; re-run to resume.")
+        raise SystemExit(1)
 
     # Mark all existing IDs as missing by default
     for id_, record in existing.items():
@@ -220,27 +399,21 @@ if __name__ == "__main__":
             }
 
     save_ids(existing)
+    clear_checkpoint()
 
     print(f"\n✔ Total IDs tracked: {len(existing)}")
     print(f"✔ Active: {sum(1 for v in existing.values() if v['status'] == 'active')}")
     print(f"✔ Missing: {sum(1 for v in existing.values() if v['status'] == 'missing')}")
     
-    # Extract suburbs from BASE_URL for summary
-    # Find the suburb= parameter and parse it
-    suburb_match = re.search(r'suburb=([^&]+)', BASE_URL)
-    suburbs_list = []
-    if suburb_match:
-        suburbs_raw = suburb_match.group(1).split(',')
-        suburbs_list = [
-            s.replace('-', ' ').title() for s in suburbs_raw
-        ]
+    suburbs_list = [s.replace('-', ' ').title() for s in SUBURBS]
     
     # Write Step 1 summary for downstream processes
     summary_file, summary = write_step1_summary(
         existing_ids=existing,
         current_ids=current_ids,
         data_dir=DATA_DIR,
-        execution_time_seconds=0.0,
+        execution_time_seconds=round(time.monotonic() - started, 2),
         suburbs_targeted=suburbs_list,
+        fetch_metrics=fetch_metrics,
     )
     print(f"✔ Summary written to: {summary_file}")
@@ -26,6 +26,7 @@ def write_step1_summary(
     suburbs_targeted: List[str] = None,
     errors: List[str] = None,
     warnings: List[str] = None,
+    fetch_metrics: Dict[str, Any] = None,
 ) -> str:
     """
     Write Step 1 execution summary to JSON file.
@@ -38,6 +39,7 @@ def write_step1_summary(
         suburbs_targeted: List of suburbs searched
         errors: List of errors encountered
         warnings: List of warnings
+        fetch_metrics: Search paging metrics (pages_scraped, page latencies)
         
     Returns:
         Path to saved summary file
@@ -75,7 +77,8 @@ def write_step1_summary(
             "new_ids": len(new_ids),
             "active_ids": active_count,
             "missing_ids": missing_count,
-            "pages_scraped": 0,  # Can be tracked separately if needed
+            "pages_scraped": 0,
+            **(fetch_metrics or {}),
         },
         suburbs_targeted=suburbs_targeted or [],
         search_criteria=search_criteria,
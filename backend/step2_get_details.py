@@ -1,47 +1,56 @@
 from curl_cffi import requests, CurlOpt
-from bs4 import BeautifulSoup
 import json
 import csv
+import hashlib
 import os
 import time
 import re
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
 from step1_summary import read_step1_summary
 from notification_client import MQTTNotificationClient
 from schema import NewListingsPayload, NewListingDetail
+from rate_limiter import TokenBucket, LatencyStats
+from listing_parser import parse_page, resolve_engine
+from listing_manifest import ListingManifest
+from listing_store import get_store
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 DATA_DIR = os.environ.get("DATA_DIR", ".")
-LISTING_IDS_FILE = os.path.join(DATA_DIR, "listing_ids.json")
-VOTES_FILE = os.path.join(DATA_DIR, "votes.json")
-OUTPUT_FOLDER = os.path.join(DATA_DIR, "listings")
 SUMMARY_CSV = os.path.join(DATA_DIR, "summary.csv")
 SUBURBS_FILE = os.path.join(DATA_DIR, "suburbs.json")
 
 BASE_URL = "https://www.domain.com.au/"
 
+# Concurrent fetching: number of in-flight requests and the shared
+# politeness budget (requests per second across all workers)
+FETCH_WORKERS = int(os.environ.get("STEP2_WORKERS", "8"))
+FETCH_RATE_LIMIT = float(os.environ.get("STEP2_RATE_LIMIT", "4"))
+
+# HTML parser backend (see listing_parser.py): auto, lxml or bs4
+PARSER_ENGINE = resolve_engine()
+
 
 def load_listing_ids():
-    with open(LISTING_IDS_FILE, "r") as f:
-        return json.load(f)
+    ids = get_store().load_listing_ids()
+    if ids is None:
+        raise FileNotFoundError("no listing ids stored, run step 1 first")
+    return ids
 
 
 def load_votes():
-    """Load votes.json to check for rejected listings."""
-    if os.path.exists(VOTES_FILE):
-        try:
-            with open(VOTES_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            logger.warning(f"Error loading votes: {e}")
-            return {}
-    return {}
+    """Load votes to check for rejected listings."""
+    try:
+        return get_store().load_votes()
+    except Exception as e:
+        logger.warning(f"Error loading votes: {e}")
+        return {}
 
 
 def is_rejected(listing_id: str, votes: dict) -> bool:
@@ -59,35 +68,42 @@ def load_suburbs():
     return set()
 
 
-def needs_update(listing_id: str, hours_since_update: int = 24) -> bool:
+# Scripts, styles and comments carry per-request noise (build ids, nonces,
+# tracking state) that says nothing about the listing itself
+_VOLATILE_HTML = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<noscript\b.*?</noscript>|<!--.*?-->", re.S | re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def html_fingerprint(html: str) -> str:
+    """Hash of the page markup with volatile sections stripped; no DOM parse needed."""
+    content = _WHITESPACE.sub(" ", _VOLATILE_HTML.sub("", html))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def data_fingerprint(data: dict) -> str:
+    """Hash of the extracted listing fields, ignoring the update timestamp."""
+    relevant = {k: v for k, v in data.items() if k != "last_updated"}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def needs_update(listing_id: str, manifest: ListingManifest, hours_since_update: int = 24) -> bool:
     """
     Check if a listing needs updating.
-    Returns True if listing is new or last updated > hours_since_update ago.
+    Returns True if listing is new or last refreshed > hours_since_update ago.
+    A recent unchanged-content check (checked_at) counts as a refresh.
     """
-    json_file = os.path.join(OUTPUT_FOLDER, f"{listing_id}.json")
-    
-    if not os.path.exists(json_file):
+    if listing_id not in manifest:
         # New listing
         return True
-    
-    try:
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        # Check if file has update timestamp
-        if "last_updated" not in data:
-            # Old format without timestamp, update it
-            return True
-        
-        last_updated = datetime.fromisoformat(data["last_updated"])
-        hours_ago = (datetime.now() - last_updated).total_seconds() / 3600
-        
-        return hours_ago >= hours_since_update
-    
-    except Exception as e:
-        logger.warning(f"Error checking update time for {listing_id}: {e}, will update")
+
+    last_refreshed = manifest.last_refreshed(listing_id)
+    if last_refreshed is None:
+        # Old format without timestamp, update it
         return True
 
+    hours_ago = (datetime.now() - last_refreshed).total_seconds() / 3600
+    return hours_ago >= hours_since_update
+
 
 def save_suburbs(suburbs_set):
     """Save suburbs list sorted alphabetically"""
@@ -117,25 +133,26 @@ def extract_suburb_from_address(address):
     return suburb if suburb else None
 
 
-def extract_property_type(soup):
-    el = soup.find("div", {"data-testid": "listing-summary-property-type"})
+def extract_property_type(page):
+    el = page.first("listing-summary-property-type", "div")
     if el:
-        span = el.find("span")
+        span = el.find(tag="span")
         if span:
-            return span.get_text(strip=True)
+            return span.text()
     return None
 
 
-def extract_size(soup):
-    size_el = soup.find("span", {"data-testid": "listing-details__property-size"})
+def extract_size(page):
+    size_el = page.first("listing-details__property-size", "span")
     if size_el:
-        return size_el.get_text(strip=True)
+        return size_el.text()
 
-    size_el = soup.find("div", {"data-testid": "property-size"})
+    size_el = page.first("property-size", "div")
     if size_el:
-        return size_el.get_text(strip=True)
+        return size_el.text()
 
-    text = soup.get_text(" ", strip=True)
+    # last resort: scan the visible text of the whole document
+    text = page.full_text(" ")
     match = re.search(r"(\d[\d,\.]*)\s*(m²|sqm|square metres|square meters)", text, re.IGNORECASE)
     if match:
         return match.group(0).replace("square metres", "m²")
@@ -147,23 +164,24 @@ def extract_size(soup):
     return None
 
 
-def extract_features(soup):
+def extract_features(page):
     features = {"bedrooms": None, "bathrooms": None, "parking": None}
-    wrapper = soup.find("div", {"data-testid": "property-features-wrapper"})
+    wrapper = page.first("property-features-wrapper", "div")
     if not wrapper:
         return features
 
-    for item in wrapper.find_all("span", {"data-testid": "property-features-feature"}):
-        text_container = item.find("span", {"data-testid": "property-features-text-container"})
+    for item in wrapper.find_all("property-features-feature", "span"):
+        text_container = item.find("property-features-text-container", "span")
         if not text_container:
             continue
 
-        label_span = text_container.find("span", {"data-testid": "property-features-text"})
+        label_span = text_container.find("property-features-text", "span")
         if not label_span:
             continue
 
-        label = label_span.get_text(strip=True).lower()
-        number = text_container.get_text(strip=True).replace(label_span.get_text(strip=True), "").strip()
+        label_text = label_span.text()
+        label = label_text.lower()
+        number = text_container.text().replace(label_text, "").strip()
 
         if "bed" in label:
             features["bedrooms"] = number
@@ -175,51 +193,50 @@ def extract_features(soup):
     return features
 
 
-def extract_inspection_times(soup):
+def _extract_time_blocks(section, skip_auction_blocks=False):
+    """Collect {day, time} pairs from the inspection-style blocks of a section."""
+    blocks = []
+    for block in section.find_all("listing-details__inspections-block", "div"):
+        # Check if this block is in the auction section
+        if skip_auction_blocks and block.has_ancestor("listing-details__auction-times", "div"):
+            continue
+
+        day_el = block.find("listing-details__inspections-block-day", "span")
+        time_el = block.find("listing-details__inspections-block-time", "span")
+
+        if day_el and time_el:
+            blocks.append({
+                "day": day_el.text(),
+                "time": time_el.text()
+            })
+    return blocks
+
+
+def extract_inspection_times(page):
     """Extract inspection times from the listing page"""
     inspections = []
     try:
-        inspections_section = soup.find("div", {"data-testid": "listing-details__inspections"})
+        inspections_section = page.first("listing-details__inspections", "div")
         if not inspections_section:
             return inspections
         
         # Find all inspection blocks (exclude auction section)
-        for block in inspections_section.find_all("div", {"data-testid": "listing-details__inspections-block"}):
-            # Check if this block is in the auction section
-            if block.find_parent("div", {"data-testid": "listing-details__auction-times"}):
-                continue
-            
-            day_el = block.find("span", {"data-testid": "listing-details__inspections-block-day"})
-            time_el = block.find("span", {"data-testid": "listing-details__inspections-block-time"})
-            
-            if day_el and time_el:
-                inspections.append({
-                    "day": day_el.get_text(strip=True),
-                    "time": time_el.get_text(strip=True)
-                })
+        inspections = _extract_time_blocks(inspections_section, skip_auction_blocks=True)
     except Exception as e:
         print(f"Error extracting inspection times: {e}")
     
     return inspections
 
 
-def extract_auction_times(soup):
+def extract_auction_times(page):
     """Extract auction times from the listing page"""
     auctions = []
     try:
-        auction_section = soup.find("div", {"data-testid": "listing-details__auction-times"})
+        auction_section = page.first("listing-details__auction-times", "div")
         if not auction_section:
             return auctions
         
-        for block in auction_section.find_all("div", {"data-testid": "listing-details__inspections-block"}):
-            day_el = block.find("span", {"data-testid": "listing-details__inspections-block-day"})
-            time_el = block.find("span", {"data-testid": "listing-details__inspections-block-time"})
-            
-            if day_el and time_el:
-                auctions.append({
-                    "day": day_el.get_text(strip=True),
-                    "time": time_el.get_text(strip=True)
-                })
+        auctions = _extract_time_blocks(auction_section)
     except Exception as e:
         print(f"Error extracting auction times: {e}")
     
@@ -259,9 +276,19 @@ def fetch_listing_html(listing_id):
         return None
 
 
-def extract_text(soup, selector):
-    el = soup.select_one(selector)
-    return el.get_text(strip=True) if el else None
+def fetch_with_limits(listing_id, limiter: TokenBucket, latency: LatencyStats):
+    """Fetch a listing once the shared rate limiter allows it, recording latency."""
+    limiter.acquire()
+    print(f" → Fetching listing {listing_id}…")
+    started = time.monotonic()
+    html = fetch_listing_html(listing_id)
+    latency.record(time.monotonic() - started)
+    return html
+
+
+def extract_text(page, testid, tag=None):
+    el = page.first(testid, tag)
+    return el.text() if el else None
 
 
 # ✅ NEW: sold detection helper
@@ -280,66 +307,70 @@ def extract_status_and_sold_price(price_text):
     return "sold", sold_price
 
 
-def parse_listing(html, listing_id):
-    soup = BeautifulSoup(html, "html.parser")
+def parse_listing(html, listing_id, engine=None):
+    page = parse_page(html, engine or PARSER_ENGINE)
 
     data = {"id": listing_id}
 
-    data["address"] = extract_text(soup, "[data-testid='listing-details__button-copy-wrapper']")
+    data["address"] = extract_text(page, "listing-details__button-copy-wrapper")
     data["suburb"] = extract_suburb_from_address(data["address"])
-    data["price"] = extract_text(soup, "[data-testid='listing-details__summary-title']")
+    data["price"] = extract_text(page, "listing-details__summary-title")
 
     # ✅ NEW: status + sold price
     status, sold_price = extract_status_and_sold_price(data["price"])
     data["status"] = status
     data["sold_price"] = sold_price
 
-    data["headline"] = extract_text(soup, "h1[data-testid='listing-details__headline']")
+    data["headline"] = extract_text(page, "listing-details__headline", "h1")
 
-    desc_el = soup.select_one("[data-testid='listing-details__description']")
-    data["description"] = desc_el.get_text("\n", strip=True) if desc_el else None
+    desc_el = page.first("listing-details__description")
+    data["description"] = desc_el.text("\n") if desc_el else None
 
-    features = extract_features(soup)
+    features = extract_features(page)
     data.update(features)
 
-    data["property_type"] = extract_property_type(soup)
-    data["property_size"] = extract_size(soup)
+    data["property_type"] = extract_property_type(page)
+    data["property_size"] = extract_size(page)
 
-    data["agent_name"] = extract_text(soup, "[data-testid='listing-details__agent-name']")
-    data["agent_phone"] = extract_text(soup, "[data-testid='listing-details__agent-phone']")
+    data["agent_name"] = extract_text(page, "listing-details__agent-name")
+    data["agent_phone"] = extract_text(page, "listing-details__agent-phone")
 
     # ✅ NEW: inspection and auction times
-    data["inspections"] = extract_inspection_times(soup)
-    data["auctions"] = extract_auction_times(soup)
-
-    images = []
-    for img in soup.select("img[src]"):
-        src = img.get("src")
-        if "domainstatic" in src:
-            images.append(src)
+    data["inspections"] = extract_inspection_times(page)
+    data["auctions"] = extract_auction_times(page)
 
-    data["image_urls"] = images
+    data["image_urls"] = [src for src in page.images if "domainstatic" in src]
     data["url"] = BASE_URL + listing_id
 
     return data
 
 
-def save_listing_json(listing_id, data):
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-    path = os.path.join(OUTPUT_FOLDER, f"{listing_id}.json")
-    
-    # Load existing data if file exists
-    existing_data = {}
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            existing_data = json.load(f)
-    
-    # Merge existing data with new data, preserving existing fields
-    merged_data = existing_data.copy()
-    merged_data.update(data)
-    
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(merged_data, f, indent=2, ensure_ascii=False)
+def refresh_from_page(listing_id: str, html: str, manifest: ListingManifest, is_new: bool, now: str):
+    """
+    Compare a fetched page with the manifest's fingerprints, parsing only if needed.
+    Returns ("unchanged_html", None) when the page is unchanged (no parse),
+    ("unchanged_data", data) when only the markup changed, else ("changed", data).
+    New listings always count as changed so they get written and notified.
+    """
+    known = manifest.get(listing_id) or {}
+    html_fp = html_fingerprint(html)
+    if not is_new and known.get("html_fingerprint") == html_fp:
+        manifest.update(listing_id, checked_at=now)
+        return "unchanged_html", None
+
+    data = parse_listing(html, listing_id)
+    data_fp = data_fingerprint(data)
+    unchanged = not is_new and known.get("data_fingerprint") == data_fp
+    manifest.update(listing_id, html_fingerprint=html_fp, data_fingerprint=data_fp, checked_at=now)
+    return ("unchanged_data" if unchanged else "changed"), data
+
+
+def save_listing_json(listing_id, data, manifest: ListingManifest = None):
+    # Merged over the stored listing, preserving existing fields
+    merged_data, size = get_store().save_listing(listing_id, data)
+
+    if manifest is not None:
+        manifest.record_listing(listing_id, merged_data, size)
 
 
 def main():
@@ -359,6 +390,10 @@ def main():
     print(f"Found {len(ids)} IDs — scraping each listing…")
 
     suburbs = load_suburbs()
+    # reconciled with the store, so a lost listing is not treated as known
+    manifest = ListingManifest.load(reconcile=True)
+    unchanged_html = 0
+    unchanged_data = 0
     summary_rows = []
     new_listings_details = []  # Track new listings for MQTT notification
 
@@ -372,45 +407,66 @@ def main():
         
         if listing_id in new_ids_from_step1:
             listings_to_process.append((0, listing_id))  # Priority 0 = new
-        elif needs_update(listing_id):
+        elif needs_update(listing_id, manifest):
             listings_to_process.append((1, listing_id))  # Priority 1 = needs update
     
     listings_to_process.sort()  # Sort by priority, then ID
     
     logger.info(f"Processing {len(listings_to_process)} listings ({len([l for l in listings_to_process if l[0] == 0])} new, {len([l for l in listings_to_process if l[0] == 1])} need update)")
 
-    for _, listing_id in listings_to_process:
-        print(f" → Fetching listing {listing_id}…")
-        html = fetch_listing_html(listing_id)
-        if not html:
-            logger.info(f"⏭ Skipping listing {listing_id} (fetch failed)")
-            continue
+    # Fetch concurrently; submission order keeps new listings ahead of updates
+    limiter = TokenBucket(FETCH_RATE_LIMIT)
+    latency = LatencyStats()
+    started = time.monotonic()
+    logger.info(f"Fetching with {FETCH_WORKERS} workers at up to {FETCH_RATE_LIMIT} requests/s")
+
+    with ThreadPoolExecutor(max_workers=max(1, FETCH_WORKERS)) as pool:
+        futures = {
+            pool.submit(fetch_with_limits, listing_id, limiter, latency): (order, listing_id)
+            for order, (_, listing_id) in enumerate(listings_to_process)
+        }
+
+        for future in as_completed(futures):
+            order, listing_id = futures[future]
+            html = future.result()
+            if not html:
+                logger.info(f"⏭ Skipping listing {listing_id} (fetch failed)")
+                continue
 
-        data = parse_listing(html, listing_id)
-        data["last_updated"] = datetime.now().isoformat()  # Add update timestamp
-        save_listing_json(listing_id, data)
-
-        # Track suburb if found
-        if data.get("suburb"):
-            suburbs.add(data["suburb"])
-
-        summary_rows.append({
-            "id": listing_id,
-            "url": data["url"],
-            "address": data.get("address"),
-            "suburb": data.get("suburb"),
-            "status": data.get("status"),
-            "price": data.get("price"),
-            "sold_price": data.get("sold_price"),
-            "bedrooms": data.get("bedrooms"),
-            "bathrooms": data.get("bathrooms"),
-            "parking": data.get("parking"),
-        })
-
-        # Collect new listings for MQTT notification
-        if listing_id in new_ids_from_step1:
-            new_listings_details.append(
-                NewListingDetail(
+            now = datetime.now().isoformat()
+            outcome, data = refresh_from_page(listing_id, html, manifest, listing_id in new_ids_from_step1, now)
+            if outcome == "unchanged_html":
+                unchanged_html += 1
+                continue
+            if outcome == "unchanged_data":
+                unchanged_data += 1
+                continue
+
+            data["last_updated"] = now  # Add update timestamp
+            save_listing_json(listing_id, data, manifest)
+            # keep progress if the run is interrupted
+            manifest.save(min_changes=100)
+
+            # Track suburb if found
+            if data.get("suburb"):
+                suburbs.add(data["suburb"])
+
+            summary_rows.append({
+                "id": listing_id,
+                "url": data["url"],
+                "address": data.get("address"),
+                "suburb": data.get("suburb"),
+                "status": data.get("status"),
+                "price": data.get("price"),
+                "sold_price": data.get("sold_price"),
+                "bedrooms": data.get("bedrooms"),
+                "bathrooms": data.get("bathrooms"),
+                "parking": data.get("parking"),
+            })
+
+            # Collect new listings for MQTT notification
+            if listing_id in new_ids_from_step1:
+                new_listings_details.append((order, NewListingDetail(
                     id=listing_id,
                     address=data.get("address", ""),
                     suburb=data.get("suburb"),
@@ -427,10 +483,15 @@ def main():
                     agent_phone=data.get("agent_phone"),
                     url=data.get("url", ""),
                     image_urls=data.get("image_urls", []),
-                )
-            )
+                )))
+
+    # Results arrive in completion order; restore the priority order
+    new_listings_details = [detail for _, detail in sorted(new_listings_details, key=lambda x: x[0])]
 
-        time.sleep(0.4)
+    elapsed = time.monotonic() - started
+    logger.info(f"Fetched {len(listings_to_process)} listings in {elapsed:.1f}s, latency: {latency.summary()}")
+    logger.info(f"Unchanged listings skipped: {unchanged_html} by page fingerprint, {unchanged_data} by data fingerprint")
+    manifest.save()
 
     # Save suburbs list
     save_suburbs(suburbs)
@@ -471,7 +532,7 @@ def main():
     heartbeat_client.disconnect()
     
     print("\n🎉 Done!")
-    print(f"📁 Listing JSON stored in: {OUTPUT_FOLDER}/")
+    print(f"📁 Listings stored in: {get_store().location}")
     print(f"📍 Found {len(suburbs)} unique suburbs → {SUBURBS_FILE}")
 
 
@@ -5,62 +5,188 @@ import csv
 import urllib.parse
 import requests
 import datetime
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional
 from zoneinfo import ZoneInfo  # Python 3.9+
 
+from commute_cache import CommuteCache, commute_cache_key
+from station_index import StationIndex
+from listing_manifest import ListingManifest
+from listing_store import get_store
+from rate_limiter import TokenBucket, LatencyStats
+from directions_compact import (
+    ARCHIVE_RAW,
+    archive_raw_response,
+    compact_directions_response,
+    route_summary_from_response,
+    start_location_from_response,
+)
+
 DATA_DIR = os.environ.get("DATA_DIR", ".")
 API_KEY = os.environ.get("GOOGLE_API_KEY")
-LISTINGS_DIR = os.path.join(DATA_DIR, "listings")
 COMMUTE_DIR = os.path.join(DATA_DIR, "commute")
 CONFIG_PATH = os.path.join(DATA_DIR, "commute_config.json")
 OUTPUT_CSV = os.path.join(DATA_DIR, "travel_times.csv")
 TIMEZONE = "Australia/Sydney"
+PLACES_RADIUS = int(os.environ.get("PLACES_RADIUS", "2000"))
+# Listings processed concurrently, and so Google requests and HTTP connections in flight
+STEP3_WORKERS = int(os.environ.get("STEP3_WORKERS", "8"))
+# Requests per second allowed per Google host (0 disables the limit)
+STEP3_RATE_LIMIT = float(os.environ.get("STEP3_RATE_LIMIT", "10"))
+STEP3_MAX_RETRIES = int(os.environ.get("STEP3_MAX_RETRIES", "4"))
 
 if not API_KEY:
     print("[ERROR] GOOGLE_API_KEY environment variable not set. Aborting.")
     raise SystemExit(1)
 
-def has_travel_time(listing: dict, listing_id: Optional[str] = None) -> bool:
-    """Return True if commute output file exists for this listing.
+# One pooled session shared by every worker thread
+SESSION = requests.Session()
+SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max(1, STEP3_WORKERS)))
+_http_slots = threading.BoundedSemaphore(max(1, STEP3_WORKERS))
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+latency = LatencyStats()
+
+
+def _host_limiter(host: str) -> TokenBucket:
+    with _host_limiters_lock:
+        if host not in _host_limiters:
+            _host_limiters[host] = TokenBucket(STEP3_RATE_LIMIT)
+        return _host_limiters[host]
+
+
+def _parse_json(resp) -> Optional[dict]:
+    """The body of an HTTP 200 response as a dict, or None."""
+    if resp.status_code != 200:
+        return None
+    try:
+        data = resp.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _over_query_limit(status_code: int, data: Optional[dict]) -> bool:
+    return status_code == 429 or (data is not None and data.get("status") == "OVER_QUERY_LIMIT")
+
 
-    New behaviour: prefer the presence of `commute/<listing_id>.json`.
-    If `listing_id` is not provided, try to read it from `listing['id']`.
+def google_request(method: str, url: str, **kwargs):
+    """Send a request through the shared session, honouring the per-host rate
+    limit and concurrency cap, and retrying OVER_QUERY_LIMIT / HTTP 429 with
+    exponential backoff. Returns `(resp, data)`, where `data` is the JSON body
+    of an HTTP 200 response parsed once (None otherwise). Request exceptions
+    propagate to the caller.
     """
+    host = urllib.parse.urlsplit(url).netloc
+    limiter = _host_limiter(host)
+    for attempt in range(STEP3_MAX_RETRIES + 1):
+        limiter.acquire()
+        with _http_slots:
+            started = time.monotonic()
+            resp = SESSION.request(method, url, **kwargs)
+            latency.record(time.monotonic() - started)
+        data = _parse_json(resp)
+        if attempt == STEP3_MAX_RETRIES or not _over_query_limit(resp.status_code, data):
+            return resp, data
+        delay = 2 ** attempt + random.uniform(0, 1)
+        print(f"  [WARN] Over query limit on {host}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def commute_config_hash(commute: dict) -> str:
+    """Stable hash of one commute definition, with the same defaults process_listings applies."""
+    definition = {
+        "name": commute.get("name") or commute.get("address"),
+        "address": commute.get("address"),
+        "mode": commute.get("mode") or "transit",
+        "day": commute.get("day") or "any",
+        "time": commute.get("time") or "09:00",
+    }
+    raw = json.dumps(definition, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf8")).hexdigest()[:16]
+
+
+def _legacy_entry_matches(item: dict, commute: dict) -> bool:
+    """Match a commute entry written before config hashes by name, destination, mode and arrival time."""
+    if item.get("name") != (commute.get("name") or commute.get("address")):
+        return False
+    if item.get("destination") != commute.get("address"):
+        return False
+    if (item.get("mode") or "transit") != (commute.get("mode") or "transit"):
+        return False
+    ts = item.get("arrival_timestamp")
+    if not ts:
+        return False
+    arrival = datetime.datetime.fromtimestamp(ts, ZoneInfo(TIMEZONE))
     try:
-        lid = listing_id or listing.get("id")
-        if not lid:
-            return False
+        hh, mm = [int(x) for x in (commute.get("time") or "09:00").split(':')]
+    except Exception:
+        hh, mm = 9, 0
+    if (arrival.hour, arrival.minute) != (hh, mm):
+        return False
+    day = commute.get("day") or "any"
+    if day == "weekday":
+        return arrival.weekday() < 5
+    if day == "weekend":
+        return arrival.weekday() >= 5
+    return True
 
-        commute_file = os.path.join(COMMUTE_DIR, safe_filename(lid))
-        if not os.path.isfile(commute_file):
-            return False
 
-        # load per-listing commute output
-        try:
-            with open(commute_file, 'r', encoding='utf8') as f:
-                out = json.load(f)
-        except Exception:
-            return False
+def load_commute_output(listing_id: str) -> Optional[dict]:
+    """Return the stored commute results for listing_id, or None if missing/unreadable."""
+    try:
+        return get_store().get_commutes(listing_id)
+    except Exception:
+        return None
 
-        per = out.get("commutes") or []
 
-        # load config to know expected number of commutes
-        cfg = load_commute_config() or {}
-        expected = cfg.get("commutes", [])
+def reusable_commutes(existing: Optional[dict], commutes: list) -> dict:
+    """Map config index -> existing commute entry that is still valid for that definition.
 
-        if expected:
-            # require the same number of commute entries and that each has a non-null result
-            if len(per) != len(expected):
-                return False
-            for item in per:
-                if item.get("result") is None:
-                    return False
-            return True
-        else:
+    An entry is reusable when it has a result and its `config_hash` matches the
+    current definition (or, for entries written before hashes, its name,
+    destination, mode and arrival time match).
+    """
+    per = (existing or {}).get("commutes") or []
+    reuse = {}
+    for idx, commute in enumerate(commutes):
+        config_hash = commute_config_hash(commute)
+        for item in per:
+            if item.get("result") is None:
+                continue
+            if item.get("config_hash"):
+                matches = item["config_hash"] == config_hash
+            else:
+                matches = _legacy_entry_matches(item, commute)
+            if matches:
+                reuse[idx] = dict(item, config_hash=config_hash)
+                break
+    return reuse
+
+
+def has_travel_time(listing: dict, listing_id: Optional[str] = None, commutes: Optional[list] = None) -> bool:
+    """Return True if commute/<listing_id>.json has a current result for every configured commute.
+
+    Pass `commutes` to avoid re-reading the config; otherwise it is loaded.
+    """
+    try:
+        lid = listing_id or listing.get("id")
+        if not lid:
+            return False
+        existing = load_commute_output(lid)
+        if existing is None:
+            return False
+        if commutes is None:
+            commutes = (load_commute_config() or {}).get("commutes", [])
+        if not commutes:
             # no config present: require that all per-listing commutes have results
-            if not per:
-                return False
-            return all(item.get("result") is not None for item in per)
+            per = existing.get("commutes") or []
+            return bool(per) and all(item.get("result") is not None for item in per)
+        return len(reusable_commutes(existing, commutes)) == len(commutes)
     except Exception:
         return False
 
@@ -111,16 +237,15 @@ def get_travel_time_for_origin(origin_address, destination_address, arrival_ts,
     print("Requesting:", url)
 
     try:
-        resp = requests.get(url, timeout=15)
+        resp, data = google_request("GET", url, timeout=15)
     except Exception as e:
         print("  [ERROR] HTTP request failed for", origin_address, "-", e)
         return None
 
-    if resp.status_code != 200:
+    if data is None:
         print("  [ERROR] HTTP", resp.status_code, resp.text)
         return None
 
-    data = resp.json()
     status = data.get("status")
 
     if status != "OK":
@@ -137,8 +262,9 @@ def get_travel_time_for_origin(origin_address, destination_address, arrival_ts,
         # compute best route (by total duration)
         best_total = None
         best_text = None
+        best_idx = None
 
-        for r in routes:
+        for idx, r in enumerate(routes):
             legs = r.get("legs", [])
             total_seconds = 0
             total_text = []
@@ -153,10 +279,19 @@ def get_travel_time_for_origin(origin_address, destination_address, arrival_ts,
             if best_total is None or total_seconds < best_total:
                 best_total = total_seconds
                 best_text = ", ".join(total_text) if total_text else None
+                best_idx = idx
 
         if best_total is None:
             return None
 
+        if ARCHIVE_RAW:
+            archive_raw_response({
+                "origin": origin_address,
+                "destination": destination_address,
+                "mode": mode,
+                "arrival_timestamp": arrival_ts,
+            }, data)
+
         # Do NOT compute nearest station here — listing-level nearest station
         # should be computed once per-listing (see `process_listings`).
         return {
@@ -165,217 +300,163 @@ def get_travel_time_for_origin(origin_address, destination_address, arrival_ts,
                 "duration_seconds": int(best_total),
             },
             "arrival_timestamp": arrival_ts,
-            "raw_response": data,
+            # best route only, without polylines/instructions markup/alternates
+            "raw_response": compact_directions_response(data, best_idx),
         }
     except Exception as e:
         print("  [ERROR] Parsing Google response for", origin_address, "-", e)
         return None
 
 
-def find_nearest_transit_station(lat, lng):
-    """Two-step: use Places v1 searchNearby with rankPreference=DISTANCE to
-    get the nearest `train_station`, then request a walking Directions route
-    to compute walking duration and distance. Fall back to legacy Nearby
-    Search if v1 fails.
-    """
-    try:
-        places_url = "https://places.googleapis.com/v1/places:searchNearby"
-
-        radius = int(os.environ.get("PLACES_RADIUS", "2000"))
-        body = {
-            "includedTypes": ["train_station"],
-            "maxResultCount": 5,
-            "rankPreference": "DISTANCE",
-            "locationRestriction": {
-                "circle": {
-                    "center": {
-                        "latitude": float(lat),
-                        "longitude": float(lng),
-                    },
-                    "radius": radius,
-                }
-            },
-        }
+def _place_station(place: dict) -> Optional[dict]:
+    """{name, lat, lng} for a Places (v1 or legacy) result that is a train station."""
+    if not isinstance(place, dict):
+        return None
+    types = place.get("types") or []
+    if "train_station" not in types or "bus_station" in types:
+        return None
 
-        headers = {
-            "Content-Type": "application/json",
-            "X-Goog-Api-Key": API_KEY,
-            # request displayName, location and types (and name resource id)
-            "X-Goog-FieldMask": (
-                "places.displayName,"
-                "places.location,"
-                "places.types,"
-                "places.name"
-            ),
-        }
+    # displayName may be a dict {text:...} or a string
+    display = place.get("displayName") or place.get("display_name") or place.get("name") or place.get("vicinity")
+    if isinstance(display, dict):
+        name = display.get("text") or display.get("displayName")
+    else:
+        name = display
+    if not name:
+        return None
 
-        # call v1 searchNearby
-        try:
-            resp = requests.post(places_url, json=body, headers=headers, timeout=10)
-        except Exception as e:
-            print(f"  [WARN] Places v1 request failed: {e}")
-            resp = None
+    # location may be in different shapes; try common variants
+    loc = place.get("location") or (place.get("geometry") or {}).get("location") or {}
+    plat = loc.get("latitude") or loc.get("lat") or (loc.get("latLng") or {}).get("lat")
+    plng = loc.get("longitude") or loc.get("lng") or (loc.get("latLng") or {}).get("lng")
+    if plat is None or plng is None:
+        return None
+    return {"name": name, "lat": float(plat), "lng": float(plng)}
 
-        pdata = None
-        if resp is not None and resp.status_code == 200:
-            try:
-                pdata = resp.json()
-            except Exception:
-                pdata = None
-        else:
-            if resp is not None:
-                print(f"  [WARN] Places v1 returned HTTP {resp.status_code}")
 
-        places_list = (pdata.get("places") if isinstance(pdata, dict) else None) or []
+def fetch_stations_near(lat, lng, radius):
+    """Train stations within `radius` metres of (lat, lng) from Places v1
+    searchNearby, falling back to legacy Nearby Search. Returns None if
+    neither API could be reached.
+    """
+    places_url = "https://places.googleapis.com/v1/places:searchNearby"
+    body = {
+        "includedTypes": ["train_station"],
+        "maxResultCount": 20,
+        "rankPreference": "DISTANCE",
+        "locationRestriction": {
+            "circle": {
+                "center": {
+                    "latitude": float(lat),
+                    "longitude": float(lng),
+                },
+                "radius": radius,
+            }
+        },
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "X-Goog-Api-Key": API_KEY,
+        "X-Goog-FieldMask": (
+            "places.displayName,"
+            "places.location,"
+            "places.types,"
+            "places.name"
+        ),
+    }
 
-        if places_list:
-            # pick the first place returned under DISTANCE ranking
-            for entry in places_list:
-                place = entry.get("place") if isinstance(entry, dict) and "place" in entry else entry
-                if not isinstance(place, dict):
-                    continue
-                types = place.get("types") or []
-                if "train_station" not in types:
-                    continue
-                if "bus_station" in types:
-                    continue
+    stations = None
+    try:
+        resp, data = google_request("POST", places_url, json=body, headers=headers, timeout=10)
+        if data is not None:
+            places_list = data.get("places") or []
+            stations = [s for s in (_place_station(p.get("place", p)) for p in places_list) if s]
+        else:
+            print(f"  [WARN] Places v1 returned HTTP {resp.status_code}")
+    except Exception as e:
+        print(f"  [WARN] Places v1 request failed: {e}")
 
-                # displayName may be a dict {text:...} or a string
-                display = place.get("displayName") or place.get("display_name") or place.get("name")
-                if isinstance(display, dict):
-                    name = display.get("text") or display.get("displayName")
-                else:
-                    name = display
-                if not name:
-                    continue
+    if stations:
+        return stations
 
-                # location may be in different shapes; try common variants
-                loc = place.get("location") or place.get("geometry") or {}
-                plat = None
-                plng = None
-                if isinstance(loc, dict):
-                    plat = loc.get("latitude") or loc.get("lat") or (loc.get("latLng") or {}).get("lat")
-                    plng = loc.get("longitude") or loc.get("lng") or (loc.get("latLng") or {}).get("lng")
+    # fallback to legacy Nearby Search if v1 didn't return a usable station
+    legacy_url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    legacy_params = {
+        "location": f"{lat},{lng}",
+        "radius": radius,
+        "type": "train_station",
+        "key": API_KEY,
+    }
+    try:
+        r_legacy, legacy_data = google_request("GET", legacy_url, params=legacy_params, timeout=10)
+        if legacy_data is None:
+            print("  [WARN] Legacy Places returned:", r_legacy.status_code, r_legacy.text[:300])
+            return stations
+        results = legacy_data.get("results", [])
+    except Exception as e:
+        print(f"  [WARN] Legacy Places request failed: {e}")
+        return stations
+    return [s for s in (_place_station(r) for r in results) if s]
 
-                if plat is None or plng is None:
-                    continue
 
-                # request walking route to this station
-                now_ts = int(datetime.datetime.now().timestamp())
-                dest = f"{plat},{plng}"
-                try:
-                    r2 = requests.get(build_directions_url(f"{lat},{lng}", dest, now_ts, mode="walking"), timeout=10)
-                except Exception as e:
-                    print(f"    [DEBUG] Directions request failed for {name}: {e}")
-                    continue
-                if r2.status_code != 200:
-                    print(f"    [DEBUG] Directions HTTP {r2.status_code} for {name}")
-                    continue
-                try:
-                    d2 = r2.json()
-                except Exception as e:
-                    print(f"    [DEBUG] Failed to parse directions JSON for {name}: {e}")
-                    continue
-                if d2.get("status") != "OK":
-                    print(f"    [DEBUG] Directions status {d2.get('status')} for {name}")
-                    continue
-                routes = d2.get("routes", [])
-                if not routes:
-                    continue
-                legs = routes[0].get("legs", [])
-                if not legs:
-                    continue
-                leg = legs[0]
-                walking_seconds = leg.get("duration", {}).get("value")
-                walking_distance = leg.get("distance", {}).get("value")
-                if walking_seconds is None:
-                    continue
+def fetch_walking_leg(lat, lng, plat, plng):
+    """Walking duration/distance from (lat, lng) to (plat, plng), or None on failure."""
+    now_ts = int(datetime.datetime.now().timestamp())
+    try:
+        r2, d2 = google_request("GET", build_directions_url(f"{lat},{lng}", f"{plat},{plng}", now_ts, mode="walking"), timeout=10)
+        if d2 is None:
+            print(f"    [DEBUG] Directions HTTP {r2.status_code} for walking leg")
+            return None
+    except Exception as e:
+        print(f"    [DEBUG] Walking Directions request failed: {e}")
+        return None
+    if d2.get("status") != "OK":
+        print(f"    [DEBUG] Directions status {d2.get('status')} for walking leg")
+        return None
+    routes = d2.get("routes", [])
+    legs = routes[0].get("legs", []) if routes else []
+    if not legs:
+        return None
+    walking_seconds = legs[0].get("duration", {}).get("value")
+    walking_distance = legs[0].get("distance", {}).get("value")
+    if walking_seconds is None:
+        return None
+    return {
+        "walking_seconds": int(walking_seconds),
+        "walking_distance_m": int(walking_distance) if walking_distance is not None else None,
+    }
 
-                return {
-                    "name": name,
-                    "walking_seconds": int(walking_seconds),
-                    "walking_distance_m": int(walking_distance) if walking_distance is not None else None,
-                }
 
-        else:
-            print("  [DEBUG] Places v1 returned no places")
-
-        # fallback to legacy Nearby Search if v1 didn't return a usable station
-        legacy_url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-        legacy_params = {
-            "location": f"{lat},{lng}",
-            "radius": int(os.environ.get("PLACES_RADIUS", "2000")),
-            "type": "train_station",
-            "key": API_KEY,
-        }
-        try:
-            r_legacy = requests.get(legacy_url, params=legacy_params, timeout=10)
-        except Exception as e:
-            print(f"  [WARN] Legacy Places request failed: {e}")
-            r_legacy = None
-
-        if r_legacy is None or r_legacy.status_code != 200:
-            if r_legacy is not None:
-                try:
-                    print("  [WARN] Legacy Places returned:", r_legacy.status_code, r_legacy.text[:300])
-                except Exception:
-                    pass
-            return None
+_station_index = None
 
-        try:
-            legacy_data = r_legacy.json()
-        except Exception:
-            return None
 
-        results = legacy_data.get("results", [])
-        for r in results:
-            types = r.get("types", [])
-            if "train_station" not in types:
-                continue
-            if "bus_station" in types:
-                continue
-            name = r.get("name") or r.get("vicinity")
-            loc = r.get("geometry", {}).get("location", {})
-            plat = loc.get("lat")
-            plng = loc.get("lng")
-            if plat is None or plng is None:
-                continue
+def get_station_index() -> StationIndex:
+    global _station_index
+    if _station_index is None:
+        _station_index = StationIndex.load()
+    return _station_index
 
-            dest = f"{plat},{plng}"
-            now_ts = int(datetime.datetime.now().timestamp())
-            try:
-                r2 = requests.get(build_directions_url(f"{lat},{lng}", dest, now_ts, mode="walking"), timeout=10)
-            except Exception:
-                continue
-            if r2.status_code != 200:
-                continue
-            d2 = r2.json()
-            if d2.get("status") != "OK":
-                continue
-            routes = d2.get("routes", [])
-            if not routes:
-                continue
-            legs = routes[0].get("legs", [])
-            if not legs:
-                continue
-            leg = legs[0]
-            walking_seconds = leg.get("duration", {}).get("value")
-            walking_distance = leg.get("distance", {}).get("value")
-            return {
-                "name": name,
-                "walking_seconds": int(walking_seconds) if walking_seconds is not None else None,
-                "walking_distance_m": int(walking_distance) if walking_distance is not None else None,
-            }
+
+def find_nearest_transit_station(lat, lng):
+    """Nearest train station from the local catalogue (see station_index.py),
+    with the walking leg from the cache, Google Directions, or estimated from
+    distance when Directions is unavailable.
+    """
+    try:
+        index = get_station_index()
+        index.ensure_coverage(float(lat), float(lng), PLACES_RADIUS, fetch_stations_near)
+        hit = index.nearest(float(lat), float(lng), PLACES_RADIUS)
+        if hit is None:
+            print("  [DEBUG] No train station within", PLACES_RADIUS, "m")
+            return None
+        station, _distance = hit
+        walk = index.walking_leg(float(lat), float(lng), station, fetch_walking_leg)
+        return {"name": station["name"], **walk}
     except Exception as e:
         print("  [WARN] find_nearest_transit_station failed:", e)
         return None
 
 
-
-def safe_filename(id_str):
-    return f"{id_str}.json"
-
-
 def load_commute_config():
     # ensure commute dir exists
     try:
@@ -443,206 +524,265 @@ def next_day_at_time(day_type: str, time_str: str):
     return int(candidate.timestamp())
 
 
-def process_listings():
-    # Build list of CSV rows (fresh file each run)
-    csv_rows = []
-
-    # Make sure listings dir exists
-    if not os.path.isdir(LISTINGS_DIR):
-        print(f"Listings directory '{LISTINGS_DIR}' not found")
-        return
-
-    # Iterate files
-    files = sorted(os.listdir(LISTINGS_DIR))
-    # load commute config (ensures COMMUTE_DIR exists)
-    cfg = load_commute_config() or {}
-    commutes = cfg.get("commutes", [])
-    for filename in files:
-        if not filename.lower().endswith(".json"):
-            continue
-
-        path = os.path.join(LISTINGS_DIR, filename)
-        try:
-            with open(path, "r", encoding="utf8") as f:
-                listing = json.load(f)
-        except Exception as e:
-            print(f"  [WARN] Could not read {filename}: {e}")
-            continue
+def process_listing(stored_id, commutes, cache, manifest):
+    """Bring the commute results (commute/<id>.json) up to date for one listing.
 
-        listing_id = listing.get("id") or filename.replace(".json", "")
-        origin_address = (listing.get("address") or "").strip()
-        
-        # Skip listings that already have travel time (commute/<id>.json)
-        if has_travel_time(listing, listing_id):
-            print(f"  [SKIP] {listing_id} — travel time already present")
-            csv_rows.append({
-                "id": listing_id,
-                "address": listing.get("address"),
-                "travel_duration_text": listing.get("travel_duration_text"),
-                "travel_duration_seconds": listing.get("travel_duration_seconds"),
-                "google_maps_url": listing.get("google_maps_url"),
-            })
+    Returns (csv_row, pairs_queried, pairs_cached, pairs_reused): Directions
+    queries made, pairs answered by the commute cache, and entries reused
+    from commute/<id>.json. csv_row is None if the listing could not be read.
+    """
+    store = get_store()
+    try:
+        listing = store.get_listing(stored_id)
+    except Exception as e:
+        print(f"  [WARN] Could not read listing {stored_id}: {e}")
+        return None, 0, 0, 0
+    if listing is None:
+        print(f"  [WARN] Could not read listing {stored_id}")
+        return None, 0, 0, 0
+
+    listing_id = listing.get("id") or stored_id
+    origin_address = (listing.get("address") or "").strip()
+    origin_normalised = " ".join(origin_address.split())
+
+    # Reuse commute entries whose config definition is unchanged; results
+    # are only valid for the address they were computed from
+    existing = load_commute_output(listing_id)
+    if existing and existing.get("address") != origin_normalised:
+        existing = None
+    reuse = reusable_commutes(existing, commutes)
+
+    # Skip listings whose commute/<id>.json is current for every configured commute
+    if commutes and len(reuse) == len(commutes) == len(existing.get("commutes") or []):
+        print(f"  [SKIP] {listing_id} — travel time already present")
+        return {
+            "id": listing_id,
+            "address": listing.get("address"),
+            "travel_duration_text": listing.get("travel_duration_text"),
+            "travel_duration_seconds": listing.get("travel_duration_seconds"),
+            "google_maps_url": listing.get("google_maps_url"),
+        }, 0, 0, len(reuse)
+
+    if not origin_address:
+        print(f"  [SKIP] {listing_id} — no address present in JSON")
+        # still include a CSV row marking missing address if you want, or skip completely
+        return {
+            "id": listing_id,
+            "address": None,
+            "travel_duration_text": None,
+            "travel_duration_seconds": None,
+            "google_maps_url": None
+        }, 0, 0, 0
+
+    print(f"\nProcessing {listing_id}: {origin_normalised}")
+    # Missing or changed commute definitions are looked up (commute cache,
+    # then Directions); unchanged ones are reused as-is. Listings run
+    # concurrently, so one listing's queries run in turn on its worker.
+    queried = 0
+    cached = 0
+    reused = 0
+    per_listing_results = [None] * len(commutes)
+    for idx, commute in enumerate(commutes):
+        if idx in reuse:
+            reused += 1
+            per_listing_results[idx] = reuse[idx]
             continue
-
-        if not origin_address:
-            print(f"  [SKIP] {listing_id} — no address present in JSON")
-            # still include a CSV row marking missing address if you want, or skip completely
-            csv_rows.append({
-                "id": listing_id,
-                "address": None,
-                "travel_duration_text": None,
-                "travel_duration_seconds": None,
-                "google_maps_url": None
-            })
+        name = commute.get("name") or commute.get("address")
+        dest = commute.get("address")
+        mode = commute.get("mode") or "transit"
+        day = commute.get("day") or "any"
+        time_str = commute.get("time") or "09:00"
+
+        arrival_ts = next_day_at_time(day, time_str)
+        per_listing_results[idx] = {
+            "name": name,
+            "destination": dest,
+            "mode": mode,
+            "arrival_timestamp": arrival_ts,
+            "config_hash": commute_config_hash(commute),
+            "result": None,
+        }
+        key = commute_cache_key(origin_normalised, dest, mode, day, time_str)
+        travel = cache.get(key)
+        if travel:
+            print(f"  [CACHE] {name}: reusing cached result")
+            cached += 1
+            per_listing_results[idx]["result"] = travel
             continue
+        queried += 1
+        travel = get_travel_time_for_origin(origin_normalised, dest, arrival_ts, mode)
+        if travel:
+            cache.put(key, travel)
+            per_listing_results[idx]["result"] = travel
+        else:
+            print(f"  [WARN] No result for commute '{name}' for {listing_id}")
+
+    # Compute a single nearest station for the property (not per-commute)
+    listing_nearest_station = None
+    # Prefer any nearest_station returned by a commute result
+    for item in per_listing_results:
+        res = item.get('result')
+        if res:
+            ns = res.get('nearest_station')
+            if ns:
+                listing_nearest_station = ns
+                break
 
-        # Normalise address slightly (remove excessive commas/newlines)
-        origin_normalised = " ".join(origin_address.split())
-        print(f"\nProcessing {listing_id}: {origin_normalised}")
-        # For each commute definition in config, compute arrival timestamp and query Google
-        per_listing_results = []
-        for commute in commutes:
-            name = commute.get("name") or commute.get("address")
-            dest = commute.get("address")
-            mode = commute.get("mode") or "transit"
-            day = commute.get("day") or "any"
-            time_str = commute.get("time") or "09:00"
-
-            arrival_ts = next_day_at_time(day, time_str)
-            travel = get_travel_time_for_origin(origin_normalised, dest, arrival_ts, mode=mode)
-            if not travel:
-                print(f"  [WARN] No result for commute '{name}' for {listing_id}")
-                per_listing_results.append({
-                    "name": name,
-                    "destination": dest,
-                    "mode": mode,
-                    "arrival_timestamp": arrival_ts,
-                    "result": None,
-                })
-                continue
-
-            per_listing_results.append({
-                "name": name,
-                "destination": dest,
-                "mode": mode,
-                "arrival_timestamp": arrival_ts,
-                "result": travel,
-            })
+    # Then the station already found for this address on a previous run
+    if listing_nearest_station is None and existing:
+        listing_nearest_station = existing.get("nearest_station")
 
-        # Compute a single nearest station for the property (not per-commute)
-        listing_nearest_station = None
-        # Prefer any nearest_station returned by a commute result
+    # If none found, attempt to derive from first successful commute's raw_response
+    if listing_nearest_station is None:
         for item in per_listing_results:
             res = item.get('result')
-            if res:
-                ns = res.get('nearest_station')
-                if ns:
-                    listing_nearest_station = ns
-                    break
-
-        # If none found, attempt to derive from first successful commute's raw_response
-        if listing_nearest_station is None:
-            for item in per_listing_results:
-                res = item.get('result')
-                if not res:
-                    continue
-                try:
-                    raw = res.get('raw_response') or {}
-                    routes = raw.get('routes', [])
-                    if not routes:
-                        continue
-                    first_leg = routes[0].get('legs', [])[0]
-                    origin_loc = first_leg.get('start_location') or {}
-                    lat = origin_loc.get('lat')
-                    lng = origin_loc.get('lng')
-                    if lat and lng:
-                        ns = find_nearest_transit_station(lat, lng)
-                        if ns:
-                            listing_nearest_station = ns
-                            break
-                except Exception:
+            if not res:
+                continue
+            try:
+                raw = res.get('raw_response') or {}
+                routes = raw.get('routes', [])
+                if not routes:
                     continue
+                first_leg = routes[0].get('legs', [])[0]
+                origin_loc = first_leg.get('start_location') or {}
+                lat = origin_loc.get('lat')
+                lng = origin_loc.get('lng')
+                if lat and lng:
+                    ns = find_nearest_transit_station(lat, lng)
+                    if ns:
+                        listing_nearest_station = ns
+                        break
+            except Exception:
+                continue
 
-        # Remove per-commute nearest_station to avoid duplicates (we'll expose a single top-level one)
-        for item in per_listing_results:
-            if item.get('result') and item['result'].get('nearest_station'):
-                try:
-                    item['result']['nearest_station'] = None
-                except Exception:
-                    pass
+    # Remove per-commute nearest_station to avoid duplicates (we'll expose a single top-level one)
+    for item in per_listing_results:
+        if item.get('result') and item['result'].get('nearest_station'):
+            try:
+                item['result']['nearest_station'] = None
+            except Exception:
+                pass
+
+    outobj = {
+        "id": listing_id,
+        "address": origin_normalised,
+        "queried_at": datetime.datetime.now(ZoneInfo(TIMEZONE)).isoformat(),
+        "commutes": per_listing_results,
+        "nearest_station": listing_nearest_station,
+    }
+    try:
+        store.save_commutes(listing_id, outobj)
+        print(f"  [OK] Wrote commute results for {listing_id}")
+    except Exception as e:
+        print(f"  [ERROR] Failed to write commute results for {listing_id}: {e}")
+
+    # For backward compatibility, update listing with first successful commute (if any)
+    first_success = None
+    for item in per_listing_results:
+        if item.get("result"):
+            first_success = item
+            break
+
+    if first_success:
+        travel = first_success["result"]
+        dest = first_success.get("destination")
+        listing["travel_duration_text"] = travel["summary"]["duration_text"]
+        listing["travel_duration_seconds"] = travel["summary"]["duration_seconds"]
+        listing["travel_arrival_timestamp"] = travel["arrival_timestamp"]
+        listing["google_maps_url"] = build_google_maps_link(origin_normalised, dest)
+
+        listing["google_transit"] = {
+            "queried_at": datetime.datetime.now(ZoneInfo(TIMEZONE)).isoformat(),
+            "arrival_timestamp": travel["arrival_timestamp"],
+            "request": {
+                "origin": origin_normalised,
+                "destination": dest,
+                "mode": first_success.get("mode", "transit"),
+            },
+            "response": travel["raw_response"]
+        }
+        # precomputed for the frontend so it doesn't dig through the response
+        listing["route_summary"] = route_summary_from_response(travel["raw_response"])
+        listing["lat"], listing["lng"] = start_location_from_response(travel["raw_response"])
 
-        # Ensure commute dir exists and write per-listing JSON
         try:
-            os.makedirs(COMMUTE_DIR, exist_ok=True)
-        except Exception:
-            pass
+            listing, size = store.save_listing(stored_id, listing, merge=False)
+            manifest.record_listing(stored_id, listing, size)
+            print(f"  [OK] Updated listing {stored_id}")
+        except Exception as e:
+            print(f"  [ERROR] Failed to write listing {stored_id}: {e}")
 
-        outpath = os.path.join(COMMUTE_DIR, safe_filename(listing_id))
-        outobj = {
+        # CSV row using first_success
+        row = {
             "id": listing_id,
             "address": origin_normalised,
-            "queried_at": datetime.datetime.now(ZoneInfo(TIMEZONE)).isoformat(),
-            "commutes": per_listing_results,
-            "nearest_station": listing_nearest_station,
+            "travel_duration_text": travel["summary"]["duration_text"],
+            "travel_duration_seconds": travel["summary"]["duration_seconds"],
+            "google_maps_url": listing.get("google_maps_url"),
+        }
+    else:
+        # no successful commute results
+        row = {
+            "id": listing_id,
+            "address": origin_normalised,
+            "travel_duration_text": None,
+            "travel_duration_seconds": None,
+            "google_maps_url": None
         }
-        try:
-            with open(outpath, "w", encoding="utf8") as f:
-                json.dump(outobj, f, indent=2, ensure_ascii=False)
-            print(f"  [OK] Wrote commute results to {outpath}")
-        except Exception as e:
-            print(f"  [ERROR] Failed to write commute file {outpath}: {e}")
 
-        # For backward compatibility, update listing with first successful commute (if any)
-        first_success = None
-        for item in per_listing_results:
-            if item.get("result"):
-                first_success = item
-                break
+    return row, queried, cached, reused
 
-        if first_success:
-            travel = first_success["result"]
-            dest = first_success.get("destination")
-            listing["travel_duration_text"] = travel["summary"]["duration_text"]
-            listing["travel_duration_seconds"] = travel["summary"]["duration_seconds"]
-            listing["travel_arrival_timestamp"] = travel["arrival_timestamp"]
-            listing["google_maps_url"] = build_google_maps_link(origin_normalised, dest)
-
-            listing["google_transit"] = {
-                "queried_at": datetime.datetime.now(ZoneInfo(TIMEZONE)).isoformat(),
-                "arrival_timestamp": travel["arrival_timestamp"],
-                "request": {
-                    "origin": origin_normalised,
-                    "destination": dest,
-                    "mode": first_success.get("mode", "transit"),
-                },
-                "response": travel["raw_response"]
-            }
 
+def process_listings():
+    store = get_store()
+    listing_ids = store.listing_ids()
+    if not listing_ids:
+        print(f"No listings found in '{store.location}'")
+        return
+
+    # load commute config (ensures COMMUTE_DIR exists)
+    cfg = load_commute_config() or {}
+    commutes = cfg.get("commutes", [])
+    # origin/destination results shared across listings and runs
+    cache = CommuteCache.load()
+    # kept current for step 2, which plans its run from it
+    manifest = ListingManifest.load()
+    pairs_queried = 0
+    pairs_cached = 0
+    pairs_reused = 0
+    # load the station catalogue before the workers share it
+    get_station_index()
+    started = time.monotonic()
+    print(f"[INFO] Processing {len(listing_ids)} listings with {STEP3_WORKERS} workers at up to {STEP3_RATE_LIMIT} requests/s per host")
+
+    rows = [None] * len(listing_ids)
+    # one pool: at most STEP3_WORKERS listings, and so Google requests, in flight
+    with ThreadPoolExecutor(max_workers=max(1, STEP3_WORKERS)) as listing_pool:
+        futures = {
+            listing_pool.submit(process_listing, listing_id, commutes, cache, manifest): order
+            for order, listing_id in enumerate(listing_ids)
+        }
+        for future in as_completed(futures):
             try:
-                with open(path, "w", encoding="utf8") as f:
-                    json.dump(listing, f, indent=2, ensure_ascii=False)
-                print(f"  [OK] Updated {filename}")
+                row, queried, cached, reused = future.result()
             except Exception as e:
-                print(f"  [ERROR] Failed to write {filename}: {e}")
-
-            # Append CSV row using first_success
-            csv_rows.append({
-                "id": listing_id,
-                "address": origin_normalised,
-                "travel_duration_text": travel["summary"]["duration_text"],
-                "travel_duration_seconds": travel["summary"]["duration_seconds"],
-                "google_maps_url": listing.get("google_maps_url"),
-            })
-        else:
-            # no successful commute results
-            csv_rows.append({
-                "id": listing_id,
-                "address": origin_normalised,
-                "travel_duration_text": None,
-                "travel_duration_seconds": None,
-                "google_maps_url": None
-            })
-
+                print(f"  [ERROR] Failed to process {listing_ids[futures[future]]}: {e}")
+                continue
+            rows[futures[future]] = row
+            pairs_queried += queried
+            pairs_cached += cached
+            pairs_reused += reused
+            # persist cache and manifest progress in case the run is interrupted
+            cache.save(min_changes=50)
+            manifest.save(min_changes=100)
+    # Build list of CSV rows (fresh file each run), in listing order
+    csv_rows = [row for row in rows if row is not None]
+
+    cache.save()
+    manifest.save()
+    get_station_index().save()
+    print(f"\n[INFO] Processed {len(listing_ids)} listings in {time.monotonic() - started:.1f}s, Google latency: {latency.summary()}")
+    print(f"\n[INFO] Commute pairs: {pairs_queried} queried from Directions, {pairs_cached} from the commute cache, {pairs_reused} reused")
 
     # Write summary CSV with header even if empty
     fieldnames = ["id", "address", "travel_duration_text", "travel_duration_seconds", "google_maps_url"]
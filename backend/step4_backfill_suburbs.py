@@ -4,10 +4,11 @@ Backfill script to add suburb field to existing listing JSONs
 import json
 import os
 import re
-from pathlib import Path
+
+from listing_manifest import ListingManifest
+from listing_store import get_store
 
 DATA_DIR = os.environ.get("DATA_DIR", ".")
-LISTINGS_FOLDER = os.path.join(DATA_DIR, "listings")
 SUBURBS_FILE = os.path.join(DATA_DIR, "suburbs.json")
 
 
@@ -34,23 +35,20 @@ def extract_suburb_from_address(address):
 
 
 def main():
-    listings_path = Path(LISTINGS_FOLDER)
-    
-    if not listings_path.exists():
-        print(f"❌ Listings folder not found: {LISTINGS_FOLDER}")
+    store = get_store()
+    listing_ids = store.listing_ids()
+    if not listing_ids:
+        print(f"❌ No listings found in {store.location}")
         return
     
-    json_files = list(listings_path.glob("*.json"))
-    print(f"Found {len(json_files)} listing JSON files")
+    print(f"Found {len(listing_ids)} listings")
     
+    manifest = ListingManifest.load()
     suburbs = set()
     updated_count = 0
     
-    for json_file in json_files:
+    for listing_id, data, _ in store.iter_listings():
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
             # Skip if suburb already exists
             if data.get('suburb'):
                 suburbs.add(data['suburb'])
@@ -64,18 +62,20 @@ def main():
                 data['suburb'] = suburb
                 suburbs.add(suburb)
                 
-                # Save updated JSON
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                # Save updated listing
+                data, size = store.save_listing(listing_id, data, merge=False)
+                manifest.record_listing(listing_id, data, size)
                 
                 updated_count += 1
-                print(f"✓ {json_file.name}: {suburb}")
+                print(f"✓ {listing_id}: {suburb}")
             else:
-                print(f"⚠ {json_file.name}: Could not extract suburb from '{address}'")
+                print(f"⚠ {listing_id}: Could not extract suburb from '{address}'")
                 
         except Exception as e:
-            print(f"❌ Error processing {json_file.name}: {e}")
+            print(f"❌ Error processing {listing_id}: {e}")
     
+    manifest.save()
+
     # Save suburbs.json
     with open(SUBURBS_FILE, 'w', encoding='utf-8') as f:
         json.dump(sorted(list(suburbs)), f, indent=2, ensure_ascii=False)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the backend scripts import each other by bare name, as they run in the container
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
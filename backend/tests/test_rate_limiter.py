@@ -0,0 +1,172 @@
+import os
+import threading
+
+import pytest
+
+import rate_limiter
+from rate_limiter import LatencyStats, TokenBucket
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")  # step3 refuses to import without one
+import step3_comutedetails as step3  # noqa: E402
+
+
+class FakeClock:
+    """Stands in for the `time` module: sleeping just moves the clock on."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(step3, "time", clock)
+    return clock
+
+
+def acquire_times(bucket, clock, count):
+    times = []
+    for _ in range(count):
+        bucket.acquire()
+        times.append(clock.now - 1000.0)
+    return times
+
+
+def test_bucket_spaces_requests_at_the_rate(clock):
+    assert acquire_times(TokenBucket(rate=4), clock, 5) == [0, 0.25, 0.5, 0.75, 1.0]
+
+
+def test_bucket_allows_a_burst_then_refills(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert acquire_times(bucket, clock, 5) == [0, 0, 0, 0.5, 1.0]
+
+    clock.now += 10  # idle time refills only up to the capacity
+    assert [t - 11.0 for t in acquire_times(bucket, clock, 4)] == [0, 0, 0, 0.5]
+
+
+def test_zero_rate_disables_the_limit(clock):
+    bucket = TokenBucket(rate=0)
+    acquire_times(bucket, clock, 100)
+    assert clock.sleeps == []
+
+
+def test_bucket_is_shared_by_threads():
+    bucket = TokenBucket(rate=200)
+    done = []
+
+    def worker():
+        for _ in range(10):
+            bucket.acquire()
+        done.append(True)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    started = rate_limiter.time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    # 40 tokens at 200/s with a burst of one: at least 39 intervals
+    assert len(done) == 4
+    assert rate_limiter.time.monotonic() - started >= 39 / 200 * 0.9
+
+
+def test_latency_summary():
+    stats = LatencyStats()
+    assert stats.summary()["count"] == 0
+    for seconds in [0.4, 0.1, 0.2, 0.3, 1.0]:
+        stats.record(seconds)
+    assert stats.summary() == {"count": 5, "mean": 0.4, "p50": 0.3, "p95": 1.0, "max": 1.0}
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, text=""):
+        self.status_code = status_code
+        self._body = body
+        self.text = text
+        self.json_calls = 0
+
+    def json(self):
+        self.json_calls += 1
+        if self._body is None:
+            raise ValueError("no JSON body")
+        return self._body
+
+
+@pytest.fixture
+def google(monkeypatch, clock):
+    """Queue the responses Google gives, in order; records (method, url) per request."""
+    responses = []
+    requests = []
+
+    def request(method, url, **kwargs):
+        requests.append((method, url))
+        return responses.pop(0)
+
+    monkeypatch.setattr(step3.SESSION, "request", request)
+    monkeypatch.setattr(step3, "_host_limiters", {})
+    monkeypatch.setattr(step3.random, "uniform", lambda a, b: 0.5)
+    return responses, requests
+
+
+def test_over_query_limit_is_retried_with_backoff(google, clock):
+    responses, requests = google
+    ok = FakeResponse(200, {"status": "OK", "routes": []})
+    responses += [
+        FakeResponse(200, {"status": "OVER_QUERY_LIMIT"}),
+        FakeResponse(429, text="Too Many Requests"),
+        ok,
+    ]
+    resp, data = step3.google_request("GET", "https://maps.googleapis.com/maps/api/directions/json")
+
+    assert resp is ok and data == {"status": "OK", "routes": []}
+    assert len(requests) == 3
+    # exponential backoff (1s, 2s) plus jitter between attempts
+    assert [s for s in clock.sleeps if s >= 1] == [1.5, 2.5]
+    assert ok.json_calls == 1
+
+
+def test_backoff_gives_up_after_max_retries(google, clock, monkeypatch):
+    monkeypatch.setattr(step3, "STEP3_MAX_RETRIES", 2)
+    responses, requests = google
+    responses += [FakeResponse(429) for _ in range(3)]
+    resp, data = step3.google_request("GET", "https://maps.googleapis.com/x")
+
+    assert (resp.status_code, data) == (429, None)
+    assert len(requests) == 3
+    assert [s for s in clock.sleeps if s >= 1] == [1.5, 2.5]
+
+
+@pytest.mark.parametrize("response", [
+    FakeResponse(200, {"status": "ZERO_RESULTS"}),
+    FakeResponse(500, text="error"),
+    FakeResponse(200, None, text="<html>"),
+])
+def test_other_responses_are_not_retried(google, clock, response):
+    responses, requests = google
+    responses.append(response)
+    resp, data = step3.google_request("GET", "https://maps.googleapis.com/x")
+    assert resp is response and len(requests) == 1
+    assert data == (response._body if response.status_code == 200 else None)
+    assert response.json_calls <= 1
+
+
+def test_rate_limit_is_per_host(google, clock, monkeypatch):
+    monkeypatch.setattr(step3, "STEP3_RATE_LIMIT", 2)
+    responses, requests = google
+    responses += [FakeResponse(200, {"status": "OK"}) for _ in range(4)]
+    for url in ["https://maps.googleapis.com/a", "https://places.googleapis.com/b",
+                "https://maps.googleapis.com/c", "https://places.googleapis.com/d"]:
+        step3.google_request("GET", url)
+
+    # each host gets its own bucket: one wait per host for its second request
+    assert clock.sleeps == [0.5]
+    assert set(step3._host_limiters) == {"maps.googleapis.com", "places.googleapis.com"}
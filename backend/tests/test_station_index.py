@@ -0,0 +1,132 @@
+import math
+import random
+
+import pytest
+
+from station_index import (
+    CELL_DEGREES,
+    EARTH_RADIUS_M,
+    StationIndex,
+    cell_of,
+    cells_within,
+    haversine_m,
+)
+
+EPPING = (-33.7725, 151.0821)
+
+
+def offset(lat, lng, bearing_deg, distance_m):
+    """The point `distance_m` from (lat, lng) along `bearing_deg`."""
+    p1, l1, b = math.radians(lat), math.radians(lng), math.radians(bearing_deg)
+    d = distance_m / EARTH_RADIUS_M
+    p2 = math.asin(math.sin(p1) * math.cos(d) + math.cos(p1) * math.sin(d) * math.cos(b))
+    l2 = l1 + math.atan2(math.sin(b) * math.sin(d) * math.cos(p1), math.cos(d) - math.sin(p1) * math.sin(p2))
+    return math.degrees(p2), math.degrees(l2)
+
+
+def index_with(tmp_path, *stations):
+    index = StationIndex(str(tmp_path / "stations.json"))
+    for name, (lat, lng) in stations:
+        index._add({"name": name, "lat": lat, "lng": lng})
+    return index
+
+
+def cell_edges(lat, lng):
+    row, col = cell_of(lat, lng)
+    return row * CELL_DEGREES, (row + 1) * CELL_DEGREES, col * CELL_DEGREES, (col + 1) * CELL_DEGREES
+
+
+# (query, station across the edge), each 0.0001 degrees from a boundary of Epping's cell
+SOUTH, NORTH, WEST, EAST = cell_edges(*EPPING)
+ACROSS = {
+    "south": ((SOUTH + 1e-4, EPPING[1]), (SOUTH - 1e-4, EPPING[1])),
+    "north": ((NORTH - 1e-4, EPPING[1]), (NORTH + 1e-4, EPPING[1])),
+    "west": ((EPPING[0], WEST + 1e-4), (EPPING[0], WEST - 1e-4)),
+    "east": ((EPPING[0], EAST - 1e-4), (EPPING[0], EAST + 1e-4)),
+    "corner": ((SOUTH + 1e-4, WEST + 1e-4), (SOUTH - 1e-4, WEST - 1e-4)),
+}
+
+
+@pytest.mark.parametrize("edge", ACROSS)
+def test_nearest_station_across_a_cell_boundary(tmp_path, edge):
+    query, across = ACROSS[edge]
+    assert cell_of(*query) == cell_of(*EPPING) != cell_of(*across)
+
+    # a station in the query's own cell, but further away
+    same_cell = (sum(cell_edges(*EPPING)[:2]) / 2, sum(cell_edges(*EPPING)[2:]) / 2)
+    index = index_with(tmp_path, ("Across", across), ("Same cell", same_cell))
+    station, distance = index.nearest(*query, max_distance_m=2000)
+    assert station["name"] == "Across"
+    assert distance == pytest.approx(haversine_m(*query, *across))
+    assert distance < haversine_m(*query, *same_cell)
+
+
+def test_nearest_respects_max_distance(tmp_path):
+    index = index_with(tmp_path, ("Far", offset(*EPPING, 45, 2500)))
+    assert index.nearest(*EPPING, max_distance_m=2000) is None
+    assert index.nearest(*EPPING, max_distance_m=3000)[0]["name"] == "Far"
+
+
+@pytest.mark.parametrize("radius_m", [500, 2000, 6000, 12000])
+@pytest.mark.parametrize("origin", [EPPING, (-33.7501, 151.0249), (0.0, 0.0), (64.1466, -21.9426)])
+def test_cells_within_covers_every_point_in_range(origin, radius_m):
+    cells = set(cells_within(*origin, radius_m))
+    rng = random.Random(f"{origin}{radius_m}")
+    for _ in range(500):
+        point = offset(*origin, rng.uniform(0, 360), radius_m * math.sqrt(rng.random()))
+        assert cell_of(*point) in cells
+    for bearing in range(0, 360, 15):
+        assert cell_of(*offset(*origin, bearing, radius_m * 0.999)) in cells
+
+
+def test_radius_spanning_several_cells(tmp_path):
+    # two cells north of the query; only found because the block widens with the radius
+    station = offset(*EPPING, 0, 5500)
+    assert abs(cell_of(*station)[0] - cell_of(*EPPING)[0]) == 2
+    assert len(cells_within(*EPPING, 6000)) > 9
+
+    index = index_with(tmp_path, ("North", station))
+    assert index.nearest(*EPPING, max_distance_m=6000)[0]["name"] == "North"
+
+
+def test_coverage_fetches_each_cell_once(tmp_path):
+    calls = []
+
+    def fetch_stations(lat, lng, radius_m):
+        calls.append(cell_of(lat, lng))
+        return [{"name": "Epping", "lat": EPPING[0], "lng": EPPING[1]}] if cell_of(lat, lng) == cell_of(*EPPING) else []
+
+    index = StationIndex(str(tmp_path / "stations.json"))
+    index.ensure_coverage(*EPPING, 2000, fetch_stations)
+    assert sorted(calls) == sorted(cells_within(*EPPING, 2000))
+
+    # a query next door only searches the cells not already covered
+    calls.clear()
+    neighbour = (EPPING[0], EAST + 1e-4)
+    index.ensure_coverage(*neighbour, 2000, fetch_stations)
+    assert set(calls) == set(cells_within(*neighbour, 2000)) - set(cells_within(*EPPING, 2000))
+    assert index.nearest(*neighbour, 2000)[0]["name"] == "Epping"
+
+    index.save()
+    reloaded = StationIndex.load(str(tmp_path / "stations.json"))
+    calls.clear()
+    reloaded.ensure_coverage(*neighbour, 2000, fetch_stations)
+    assert calls == []
+    assert reloaded.nearest(*EPPING, 100)[0]["name"] == "Epping"
+
+
+def test_failed_cells_are_retried_on_a_later_run(tmp_path):
+    calls = []
+
+    def offline(lat, lng, radius_m):
+        calls.append((lat, lng))
+        return None
+
+    index = StationIndex(str(tmp_path / "stations.json"))
+    index.ensure_coverage(*EPPING, 2000, offline)
+    cells = len(calls)
+    index.ensure_coverage(*EPPING, 2000, offline)
+    assert len(calls) == cells  # not retried within the run
+    assert index.cells == {}
+    StationIndex(str(tmp_path / "stations.json")).ensure_coverage(*EPPING, 2000, offline)
+    assert len(calls) == 2 * cells
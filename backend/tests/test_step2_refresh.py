@@ -0,0 +1,103 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import step2_get_details as step2
+from listing_manifest import ListingManifest
+
+PAGE = "<html><script>var build = 1;</script><h1>1 Test St, Epping NSW 2121</h1><p>$1.2m</p></html>"
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return ListingManifest(str(tmp_path / "listings_manifest.json"), str(tmp_path / "listings"))
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Stand-in parser recording each call; the price comes from the page."""
+    calls = []
+
+    def parse_listing(html, listing_id):
+        calls.append(listing_id)
+        return {"id": listing_id, "price": "$1.3m" if "$1.3m" in html else "$1.2m"}
+
+    monkeypatch.setattr(step2, "parse_listing", parse_listing)
+    return calls
+
+
+def iso_hours_ago(hours):
+    return (datetime.now() - timedelta(hours=hours)).isoformat()
+
+
+def test_needs_update_for_unknown_listing(manifest):
+    assert step2.needs_update("1", manifest) is True
+
+
+def test_needs_update_without_timestamps(manifest):
+    manifest.update("1", status="sold")
+    assert step2.needs_update("1", manifest) is True
+
+
+@pytest.mark.parametrize("last_updated, checked_at, expected", [
+    (1, None, False),
+    (30, None, True),
+    (30, 2, False),  # an unchanged-content check counts as a refresh
+    (30, 25, True),
+])
+def test_needs_update_by_age(manifest, last_updated, checked_at, expected):
+    manifest.update("1", last_updated=iso_hours_ago(last_updated),
+                    checked_at=iso_hours_ago(checked_at) if checked_at else None)
+    assert step2.needs_update("1", manifest) is expected
+
+
+def test_unchanged_page_skips_the_parse(manifest, parses):
+    outcome, data = step2.refresh_from_page("1", PAGE, manifest, is_new=False, now="t1")
+    assert (outcome, parses) == ("changed", ["1"])
+
+    # only per-request noise in scripts differs
+    noisy = PAGE.replace("var build = 1;", "var build = 2; var nonce = 'x';")
+    outcome, data = step2.refresh_from_page("1", noisy, manifest, is_new=False, now="t2")
+    assert (outcome, data) == ("unchanged_html", None)
+    assert parses == ["1"]
+    assert manifest.get("1")["checked_at"] == "t2"
+
+
+def test_changed_page_is_parsed_again(manifest, parses):
+    step2.refresh_from_page("1", PAGE, manifest, is_new=False, now="t1")
+
+    restyled = PAGE.replace("<p>", '<p class="price">')
+    outcome, data = step2.refresh_from_page("1", restyled, manifest, is_new=False, now="t2")
+    assert outcome == "unchanged_data"
+    assert parses == ["1", "1"]
+
+    repriced = restyled.replace("$1.2m", "$1.3m")
+    outcome, data = step2.refresh_from_page("1", repriced, manifest, is_new=False, now="t3")
+    assert (outcome, data["price"]) == ("changed", "$1.3m")
+    assert len(parses) == 3
+
+
+def test_new_listing_is_always_parsed(manifest, parses):
+    step2.refresh_from_page("1", PAGE, manifest, is_new=False, now="t1")
+    outcome, _ = step2.refresh_from_page("1", PAGE, manifest, is_new=True, now="t2")
+    assert outcome == "changed"
+    assert len(parses) == 2
+
+
+def test_reconciled_manifest_forgets_lost_listings(tmp_path, parses):
+    listings = tmp_path / "listings"
+    listings.mkdir()
+    (listings / "1.json").write_text(json.dumps({"id": "1", "last_updated": iso_hours_ago(1)}))
+    manifest_path = tmp_path / "listings_manifest.json"
+    fresh = {"last_updated": iso_hours_ago(1), "html_fingerprint": step2.html_fingerprint(PAGE)}
+    manifest_path.write_text(json.dumps({"1": fresh, "2": fresh}))
+
+    # without reconcile the manifest is trusted as-is
+    assert "2" in ListingManifest.load(str(manifest_path), str(listings))
+
+    manifest = ListingManifest.load(str(manifest_path), str(listings), reconcile=True)
+    assert step2.needs_update("1", manifest) is False
+    assert step2.needs_update("2", manifest) is True
+    # the lost listing's old fingerprint no longer short-cuts the rewrite
+    assert step2.refresh_from_page("2", PAGE, manifest, is_new=False, now="t")[0] == "changed"
@@ -0,0 +1,67 @@
+"""
+The vote log format, shared by everything that reads votes.
+
+The frontend (frontend/vote_store.py) records votes, workflow statuses and
+comments as one JSON event per line in `votes.journal`, next to the
+`votes.json` snapshot. The backend, the rejection scanner and the API import
+rebuild the current votes from the snapshot plus the journal with the helpers
+below, so there is a single reducer for the format.
+
+This module has no dependencies outside the standard library so every
+container can import it: bare (`from vote_events import ...`) with backend/ on
+the path, or as `backend.vote_events` from the repo root.
+"""
+
+import json
+from typing import Iterator
+
+
+def apply_vote_event(votes: dict, event: dict) -> None:
+    """Apply one vote log event to the materialised votes."""
+    key = str(event["id"])
+    if "vote" in event:
+        # full-record lines written before the log recorded events
+        votes[key] = event["vote"]
+        return
+    v = votes.setdefault(key, {})
+    v.update(event.get("set") or {})
+    kind = event.get("event")
+    if kind == "comment_added":
+        comments = v.setdefault("comments", [])
+        # replaying after a crash mid-compaction must not duplicate the comment
+        if not any(str(c.get("id")) == str(event["comment"]["id"]) for c in comments):
+            comments.append(dict(event["comment"]))
+    elif kind == "comment_edited":
+        for c in v.get("comments", []):
+            if str(c.get("id")) == str(event["comment_id"]):
+                c["text"] = event["text"]
+                c["edited_ts"] = event["edited_ts"]
+    elif kind == "comment_deleted":
+        v["comments"] = [c for c in v.get("comments", []) if str(c.get("id")) != str(event["comment_id"])]
+
+
+def journal_events(data: bytes) -> Iterator[dict]:
+    """The events in a chunk of journal, skipping lines that don't parse.
+
+    Only complete lines count: anything after the last newline is a write
+    still in progress or torn by a crash.
+    """
+    for line in data[:data.rfind(b"\n") + 1].splitlines():
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict) and "id" in event:
+            yield event
+
+
+def replay_journal(votes: dict, data: bytes) -> int:
+    """Apply every event in `data` to `votes`; returns how many applied."""
+    applied = 0
+    for event in journal_events(data):
+        try:
+            apply_vote_event(votes, event)
+        except Exception:
+            continue
+        applied += 1
+    return applied
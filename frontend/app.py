@@ -2,12 +2,18 @@ from flask import Flask, jsonify, render_template, send_from_directory, abort
 import os
 import json
 import time
+import threading
+from functools import partial
 from pathlib import Path
 from flask import request
 from urllib.parse import urlencode
 from urllib.request import urlopen
 from datetime import datetime
 from config import WORKFLOW_STATUSES
+from listing_index import ListingIndex
+from vote_store import VoteStore
+from plan_routing import LegCache, leg_minutes, travel_matrix
+from plan_optimiser import format_clock, inspection_windows, optimise_order, parse_clock, schedule
 
 app = Flask(__name__, static_folder='static')
 
@@ -17,9 +23,19 @@ LISTING_IDS_FILE = DATA_DIR / 'listing_ids.json'
 VOTES_FILE = DATA_DIR / 'votes.json'
 INSPECTION_PLANS_FILE = DATA_DIR / 'inspection_plans.json'
 SUBURBS_FILE = DATA_DIR / 'suburbs.json'
+PLAN_LEG_CACHE_FILE = DATA_DIR / 'plan_leg_cache.json'
 
 
 PAGE_SIZE = 20
+# seconds between listing directory re-scans for the in-memory index
+LISTING_INDEX_REFRESH_SECONDS = float(os.environ.get('LISTING_INDEX_REFRESH_SECONDS', '2'))
+# how long a plan leg's travel time is reused, and how many legs are fetched at once
+PLAN_LEG_CACHE_TTL_HOURS = float(os.environ.get('PLAN_LEG_CACHE_TTL_HOURS', '168'))
+PLAN_ROUTE_WORKERS = int(os.environ.get('PLAN_ROUTE_WORKERS', '8'))
+# minutes spent at each inspection when optimising a plan
+PLAN_VISIT_MINUTES = float(os.environ.get('PLAN_VISIT_MINUTES', '10'))
+# vote changes journaled before they are folded into votes.json
+VOTES_COMPACT_EVERY = int(os.environ.get('VOTES_COMPACT_EVERY', '200'))
 
 
 def load_listing_json(path: Path):
@@ -30,29 +46,56 @@ def load_listing_json(path: Path):
         return None
 
 
+class CachedJsonFile:
+    """Parsed contents of a JSON file, re-read only when its mtime or size changes.
+
+    The returned object is shared between requests; treat it as read-only.
+    """
+
+    def __init__(self, path: Path, default=dict):
+        self.path = path
+        self.default = default
+        self._lock = threading.Lock()
+        self._key = None
+        self._data = default()
+
+    def _stat_key(self):
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self):
+        key = self._stat_key()
+        with self._lock:
+            if key is not None and key == self._key:
+                return self._data
+            try:
+                with self.path.open('r', encoding='utf8') as f:
+                    data = json.load(f)
+            except Exception:
+                data = self.default()
+            self._key = key
+            self._data = data
+            return data
+
+
+vote_store = VoteStore(VOTES_FILE, compact_every=VOTES_COMPACT_EVERY)
+listing_ids_cache = CachedJsonFile(LISTING_IDS_FILE)
+
+
 def load_votes():
-    try:
-        with VOTES_FILE.open('r', encoding='utf8') as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    return vote_store.load()
 
 
-def save_votes(votes: dict):
-    try:
-        VOTES_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with VOTES_FILE.open('w', encoding='utf8') as f:
-            json.dump(votes, f, indent=2)
-    except Exception:
-        pass
+def record_vote_event(listing_id, make_event):
+    """Append `make_event(current_record)` to the vote log; returns the updated record or None."""
+    return vote_store.record(listing_id, make_event)
 
 
 def load_listing_ids():
-    try:
-        with LISTING_IDS_FILE.open('r', encoding='utf8') as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    return listing_ids_cache.load()
 
 
 def load_plans():
@@ -111,45 +154,125 @@ def extract_route_summary_from_listing(data: dict):
         return None
 
 
+def extract_start_location_from_listing(data: dict):
+    """(lat, lng) from google_transit start_location, or (None, None)."""
+    try:
+        g = data.get('google_transit') or {}
+        resp = g.get('response') or g.get('raw_response') or {}
+        leg = (resp.get('routes') or [{}])[0].get('legs', [{}])[0]
+        if leg and isinstance(leg, dict):
+            start_loc = leg.get('start_location') or {}
+            return start_loc.get('lat'), start_loc.get('lng')
+    except Exception:
+        pass
+    return None, None
+
+
+def listing_route_fields(data: dict):
+    """route_summary, lat and lng as written by step 3, derived for listings it hasn't backfilled."""
+    route_summary = data.get('route_summary')
+    if route_summary is None:
+        route_summary = extract_route_summary_from_listing(data)
+    lat = data.get('lat')
+    lng = data.get('lng')
+    if lat is None or lng is None:
+        lat, lng = extract_start_location_from_listing(data)
+    return route_summary, lat, lng
+
+
 def get_listing_with_coords(listing_id: str):
     """Load a listing JSON and derive lat/lng if available."""
-    if not LISTINGS_DIR.is_dir():
+    path = listing_index.path_for(listing_id)
+    if path is None:
         return None
-    path = LISTINGS_DIR / f"{listing_id}.json"
-    data = None
-    if path.exists():
-        data = load_listing_json(path)
-    else:
-        # fallback search
-        for p in LISTINGS_DIR.iterdir():
-            if p.suffix.lower() != '.json':
-                continue
-            d = load_listing_json(p)
-            if d and str(d.get('id')) == str(listing_id):
-                data = d
-                break
+    data = load_listing_json(path)
     if not data:
         return None
 
     lat = data.get('lat')
     lng = data.get('lng')
     if lat is None or lng is None:
-        try:
-            g = data.get('google_transit') or {}
-            resp = g.get('response') or g.get('raw_response') or {}
-            leg = (resp.get('routes') or [{}])[0].get('legs', [{}])[0]
-            if leg and isinstance(leg, dict):
-                start_loc = leg.get('start_location') or {}
-                lat = start_loc.get('lat')
-                lng = start_loc.get('lng')
-        except Exception:
-            lat = None
-            lng = None
+        lat, lng = extract_start_location_from_listing(data)
     data['lat'] = lat
     data['lng'] = lng
     return data
 
 
+def summarize_listing(data: dict, stem: str):
+    """Build the vote-independent summary row kept in the listing index."""
+    # route summary and lat/lng (precomputed by step 3)
+    route_summary, lat, lng = listing_route_fields(data)
+    # pick first non-agent image (exclude urls containing 'contact')
+    img = None
+    for u in (data.get('image_urls') or []):
+        if not u:
+            continue
+        if 'contact' in u.lower():
+            continue
+        if 'logo' in u.lower():
+            continue
+        if 'svg' in u.lower():
+            continue
+        img = u
+        break
+    # fallback to first image if none matched
+    if not img:
+        img = (data.get('image_urls') or [None])[0]
+    # include all non-agent images for carousel
+    all_images = [u for u in (data.get('image_urls') or []) if u and 'contact' not in u.lower() and 'logo' not in u.lower() and 'svg' not in u.lower()]
+    if not all_images:
+        all_images = data.get('image_urls') or []
+    status = data.get('status') or 'unknown'
+    return {
+        'id': data.get('id') or stem,
+        'address': data.get('address'),
+        'suburb': data.get('suburb'),
+        'bedrooms': data.get('bedrooms'),
+        'bathrooms': data.get('bathrooms'),
+        'price': data.get('price'),
+        'travel_duration_text': data.get('travel_duration_text'),
+        'travel_duration_seconds': data.get('travel_duration_seconds'),
+        'status': status,
+        'property_type': data.get('property_type'),
+        'image': img,
+        'images': all_images,  # Add all images for carousel
+        'url': data.get('url'),
+        'google_maps_url': data.get('google_maps_url'),
+        'route_summary': route_summary,
+        'lat': lat,
+        'lng': lng,
+        'inspections': data.get('inspections', []),
+        'auctions': data.get('auctions', []),
+        # precomputed filter keys, stripped again in build_listing_summary
+        'sold': str(status).lower() == 'sold',
+        'address_lower': (data.get('address') or '').lower(),
+    }
+
+
+def build_listing_summary(row: dict, v: dict, listing_ids: dict):
+    """Merge an index row with its votes and listing_ids metadata for the API response."""
+    summary = {k: val for k, val in row.items() if k not in ('sold', 'address_lower')}
+    # include latest comments (if any)
+    comments = v.get('comments', []) if isinstance(v, dict) else []
+    # sort comments by ts desc
+    comments_sorted = sorted(comments, key=lambda c: c.get('ts', 0), reverse=True)
+    summary.update({
+        'added_date': (listing_ids.get(str(row['id'])) or {}).get('added_date'),
+        'workflow_status': v.get('workflow_status', 'active'),
+        'tom': v.get('tom'),
+        'mq': v.get('mq'),
+        'tom_score': v.get('tom_score'),
+        'mq_score': v.get('mq_score'),
+        'tom_comment': v.get('tom_comment'),
+        'mq_comment': v.get('mq_comment'),
+        'comments': comments_sorted[:3],
+    })
+    return summary
+
+
+listing_index = ListingIndex(LISTINGS_DIR, summarize_listing, refresh_interval=LISTING_INDEX_REFRESH_SECONDS)
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -185,95 +308,16 @@ def api_listings():
     status_filter = request.args.get('status', 'all')  # all, available, sold
     sort = request.args.get('sort', 'none')  # travel or none
 
-    summaries = []
     if not LISTINGS_DIR.is_dir():
         return jsonify({'listings': [], 'offset': offset, 'limit': limit, 'total': 0, 'available': 0, 'sold': 0})
 
-    files = sorted([p for p in LISTINGS_DIR.iterdir() if p.suffix.lower() == '.json'])
+    rows = listing_index.rows()
+    votes = load_votes()
     # load listing_ids metadata (contains added_date)
     listing_ids = load_listing_ids()
-    for p in files:
-        data = load_listing_json(p)
-        if not data:
-            continue
-        # attach votes if present
-        votes = load_votes()
-        v = votes.get(str(data.get('id') or p.stem), {})
-        tom_vote = v.get('tom')
-        mq_vote = v.get('mq')
-        # route summary
-        route_summary = extract_route_summary_from_listing(data)
-        # lat/lng from google_transit start_location (if present)
-        lat = None
-        lng = None
-        try:
-            g = data.get('google_transit') or {}
-            resp = g.get('response') or g.get('raw_response') or {}
-            leg = (resp.get('routes') or [{}])[0].get('legs', [{}])[0]
-            if leg and isinstance(leg, dict):
-                start_loc = leg.get('start_location') or {}
-                lat = start_loc.get('lat')
-                lng = start_loc.get('lng')
-        except Exception:
-            lat = None
-            lng = None
-        # pick first non-agent image (exclude urls containing 'contact')
-        img = None
-        for u in (data.get('image_urls') or []):
-            if not u:
-                continue
-            if 'contact' in u.lower():
-                continue
-            if 'logo' in u.lower():
-                continue
-            if 'svg' in u.lower():
-                continue
-            img = u
-            break
-        # fallback to first image if none matched
-        if not img:
-            img = (data.get('image_urls') or [None])[0]
-        # include all non-agent images for carousel
-        all_images = [u for u in (data.get('image_urls') or []) if u and 'contact' not in u.lower() and 'logo' not in u.lower() and 'svg' not in u.lower()]
-        if not all_images:
-            all_images = data.get('image_urls') or []
-        # include latest comments (if any)
-        comments = v.get('comments', []) if isinstance(v, dict) else []
-        # sort comments by ts desc
-        comments_sorted = sorted(comments, key=lambda c: c.get('ts', 0), reverse=True)
-        summaries.append({
-            'id': data.get('id') or p.stem,
-            'address': data.get('address'),
-            'suburb': data.get('suburb'),
-            'bedrooms': data.get('bedrooms'),
-            'bathrooms': data.get('bathrooms'),
-            'price': data.get('price'),
-            'added_date': (listing_ids.get(str(data.get('id') or p.stem)) or {}).get('added_date'),
-            'travel_duration_text': data.get('travel_duration_text'),
-            'travel_duration_seconds': data.get('travel_duration_seconds'),
-            'status': data.get('status') or 'unknown',
-            'workflow_status': v.get('workflow_status', 'active'),
-            'property_type': data.get('property_type'),
-            'image': img,
-            'images': all_images,  # Add all images for carousel
-            'url': data.get('url'),
-            'google_maps_url': data.get('google_maps_url'),
-            'tom': tom_vote,
-            'mq': mq_vote,
-            'tom_score': v.get('tom_score'),
-            'mq_score': v.get('mq_score'),
-            'tom_comment': v.get('tom_comment'),
-            'mq_comment': v.get('mq_comment'),
-            'route_summary': route_summary,
-            'lat': lat,
-            'lng': lng,
-            'comments': comments_sorted[:3],
-            'inspections': data.get('inspections', []),
-            'auctions': data.get('auctions', []),
-        })
 
-    total = len(summaries)
-    sold_count = sum(1 for s in summaries if str(s.get('status')).lower() == 'sold')
+    total = len(rows)
+    sold_count = sum(1 for r in rows if r['sold'])
     available_count = total - sold_count
 
     # Filter by workflow status (multi-select, defaults to ['active'])
@@ -293,37 +337,40 @@ def api_listings():
     if not valid_statuses:
         app.logger.warning("No valid workflow_status values provided, defaulting to ['active']")
         valid_statuses = ['active']
-    
+
+    # pair each prebuilt row with its vote record; filters below only look at these
+    matches = [(r, votes.get(str(r['id']), {})) for r in rows]
+
     # Apply workflow status filter
-    summaries = [s for s in summaries if s.get('workflow_status') in valid_statuses]
+    matches = [(r, v) for r, v in matches if v.get('workflow_status', 'active') in valid_statuses]
 
     # apply status filter
     if status_filter == 'sold':
-        summaries = [s for s in summaries if str(s.get('status')).lower() == 'sold']
+        matches = [(r, v) for r, v in matches if r['sold']]
     elif status_filter == 'available':
-        summaries = [s for s in summaries if str(s.get('status')).lower() != 'sold']
+        matches = [(r, v) for r, v in matches if not r['sold']]
 
     # apply Tom/MQ filters (tri-state: any, yes, no)
     tom_filter = request.args.get('tom', 'any')  # any, yes, no
     mq_filter = request.args.get('mq', 'any')
     if tom_filter == 'yes':
-        summaries = [s for s in summaries if s.get('tom') is True]
+        matches = [(r, v) for r, v in matches if v.get('tom') is True]
     elif tom_filter == 'no':
-        summaries = [s for s in summaries if s.get('tom') is False]
+        matches = [(r, v) for r, v in matches if v.get('tom') is False]
     if mq_filter == 'yes':
-        summaries = [s for s in summaries if s.get('mq') is True]
+        matches = [(r, v) for r, v in matches if v.get('mq') is True]
     elif mq_filter == 'no':
-        summaries = [s for s in summaries if s.get('mq') is False]
+        matches = [(r, v) for r, v in matches if v.get('mq') is False]
 
     # optionally exclude listings based on who voted: 'none', 'tom', 'mq', 'either'
     exclude_mode = request.args.get('exclude_voted_mode', 'none')
     if exclude_mode == 'tom':
-        summaries = [s for s in summaries if s.get('tom') is None]
+        matches = [(r, v) for r, v in matches if v.get('tom') is None]
     elif exclude_mode == 'mq':
-        summaries = [s for s in summaries if s.get('mq') is None]
+        matches = [(r, v) for r, v in matches if v.get('mq') is None]
     elif exclude_mode == 'either':
         # exclude listings where either Tom or MQ has voted => keep only those with no votes
-        summaries = [s for s in summaries if s.get('tom') is None and s.get('mq') is None]
+        matches = [(r, v) for r, v in matches if v.get('tom') is None and v.get('mq') is None]
 
     # filter by maximum travel time in minutes (optional)
     travel_max = request.args.get('travel_max')
@@ -331,28 +378,28 @@ def api_listings():
         if travel_max is not None and travel_max != 'any':
             tm = int(travel_max)
             if tm >= 0:
-                summaries = [s for s in summaries if (s.get('travel_duration_seconds') is not None and s.get('travel_duration_seconds') <= tm * 60)]
+                matches = [(r, v) for r, v in matches if (r.get('travel_duration_seconds') is not None and r.get('travel_duration_seconds') <= tm * 60)]
     except Exception:
         pass
 
     # filter by suburbs (multi-select)
     suburbs_filter = request.args.getlist('suburb')
     if suburbs_filter and len(suburbs_filter) > 0:
-        summaries = [s for s in summaries if s.get('suburb') in suburbs_filter]
+        matches = [(r, v) for r, v in matches if r.get('suburb') in suburbs_filter]
 
     # filter by search term (case-insensitive, searches in address)
     search_term = request.args.get('search', '').strip()
     if search_term:
         search_lower = search_term.lower()
-        summaries = [s for s in summaries if s.get('address') and search_lower in s.get('address', '').lower()]
+        matches = [(r, v) for r, v in matches if search_lower in r['address_lower']]
 
     # apply sorting
     if sort == 'travel':
         # None travel times should be placed at end
-        summaries.sort(key=lambda s: (s.get('travel_duration_seconds') is None, s.get('travel_duration_seconds') or 0))
+        matches.sort(key=lambda m: (m[0].get('travel_duration_seconds') is None, m[0].get('travel_duration_seconds') or 0))
 
-    # pagination
-    selected = summaries[offset: offset + limit]
+    # pagination: only the selected page is expanded into full summaries
+    selected = [build_listing_summary(r, v, listing_ids) for r, v in matches[offset: offset + limit]]
 
     return jsonify({
         'listings': selected,
@@ -380,19 +427,9 @@ def api_suburbs():
 
 @app.route('/api/listing/<listing_id>')
 def api_listing(listing_id):
-    # look for file in LISTINGS_DIR
-    path = LISTINGS_DIR / f"{listing_id}.json"
-    if not path.exists():
-        # maybe the id is stored inside files: search
-        if LISTINGS_DIR.is_dir():
-            for p in LISTINGS_DIR.iterdir():
-                if p.suffix.lower() != '.json':
-                    continue
-                data = load_listing_json(p)
-                if not data:
-                    continue
-                if str(data.get('id')) == listing_id:
-                    return jsonify(data)
+    # `<id>.json`, or a file whose inner id matches, via the listing index
+    path = listing_index.path_for(listing_id)
+    if path is None:
         return jsonify({'error': 'not found'}), 404
 
     data = load_listing_json(path)
@@ -408,8 +445,9 @@ def api_listing(listing_id):
     data['tom_comment'] = v.get('tom_comment')
     data['mq_comment'] = v.get('mq_comment')
     data['workflow_status'] = v.get('workflow_status', 'active')
-    # route summary
-    data['route_summary'] = extract_route_summary_from_listing(data)
+    # route summary (precomputed by step 3)
+    if data.get('route_summary') is None:
+        data['route_summary'] = extract_route_summary_from_listing(data)
     # pick non-agent image
     img = None
     for u in (data.get('image_urls') or []):
@@ -450,39 +488,40 @@ def api_vote(listing_id):
     tom_score = payload.get('tom_score') if 'tom_score' in payload else None
     mq_score = payload.get('mq_score') if 'mq_score' in payload else None
 
-    votes = load_votes()
-    key = str(listing_id)
-    v = votes.get(key, {})
+    changes = {}
     if tom is not None:
         # accept true/false/null
-        v['tom'] = True if tom is True else (False if tom is False else None)
+        changes['tom'] = True if tom is True else (False if tom is False else None)
     # validate and store scores
     if tom_score is not None:
         try:
             ts = int(tom_score)
             if 1 <= ts <= 5:
-                v['tom_score'] = ts
+                changes['tom_score'] = ts
             else:
-                v['tom_score'] = None
+                changes['tom_score'] = None
         except Exception:
-            v['tom_score'] = None
+            changes['tom_score'] = None
     if mq is not None:
-        v['mq'] = True if mq is True else (False if mq is False else None)
+        changes['mq'] = True if mq is True else (False if mq is False else None)
     if mq_score is not None:
         try:
             ms = int(mq_score)
             if 1 <= ms <= 5:
-                v['mq_score'] = ms
+                changes['mq_score'] = ms
             else:
-                v['mq_score'] = None
+                changes['mq_score'] = None
         except Exception:
-            v['mq_score'] = None
+            changes['mq_score'] = None
     if tom_comment is not None:
-        v['tom_comment'] = tom_comment
+        changes['tom_comment'] = tom_comment
     if mq_comment is not None:
-        v['mq_comment'] = mq_comment
-    votes[key] = v
-    save_votes(votes)
+        changes['mq_comment'] = mq_comment
+
+    if changes:
+        v = record_vote_event(listing_id, lambda current: {'event': 'vote', 'set': changes})
+    else:
+        v = load_votes().get(str(listing_id), {})
     return jsonify({'ok': True, 'tom': v.get('tom'), 'mq': v.get('mq'), 'tom_score': v.get('tom_score'), 'mq_score': v.get('mq_score')})
 
 
@@ -497,13 +536,8 @@ def api_update_status(listing_id):
         app.logger.error(f"Invalid workflow_status in update: {new_status}")
         return jsonify({'ok': False, 'error': f'Invalid status. Must be one of: {", ".join(WORKFLOW_STATUSES)}'}), 400
     
-    # Load votes file (we'll store status there for now since listings are read-only from backend)
-    votes = load_votes()
-    key = str(listing_id)
-    v = votes.get(key, {})
-    v['workflow_status'] = new_status
-    votes[key] = v
-    save_votes(votes)
+    # Stored with the votes for now since listings are read-only from backend
+    record_vote_event(listing_id, lambda current: {'event': 'status', 'set': {'workflow_status': new_status}})
     
     return jsonify({'ok': True, 'workflow_status': new_status})
 
@@ -533,6 +567,25 @@ def fetch_directions_minutes(origin_lat, origin_lng, dest_lat, dest_lng, mode, a
         return None
 
 
+leg_cache = LegCache(PLAN_LEG_CACHE_FILE, ttl_seconds=PLAN_LEG_CACHE_TTL_HOURS * 3600)
+
+
+def resolve_stop_coords(listing_ids):
+    """Map each listing id to (lat, lng), or None, in one pass over the listing index."""
+    wanted = {str(i) for i in listing_ids if i is not None}
+    coords = {}
+    for row in listing_index.rows():
+        lid = str(row.get('id'))
+        if lid in wanted and row.get('lat') is not None and row.get('lng') is not None:
+            coords[lid] = (row['lat'], row['lng'])
+    for lid in wanted - coords.keys():
+        # ids that are only a filename stem; one file read each
+        data = get_listing_with_coords(lid)
+        if data and data.get('lat') is not None and data.get('lng') is not None:
+            coords[lid] = (data['lat'], data['lng'])
+    return coords
+
+
 @app.route('/api/inspection-plans', methods=['GET', 'POST'])
 def api_inspection_plans():
     plans = load_plans()
@@ -576,28 +629,109 @@ def api_inspection_plan_route(plan_id):
     mode = 'walking' if mode == 'walking' else 'driving'
     stops = plan.get('stops', [])
     api_key = os.environ.get('MAPS_API_KEY', '')
-    legs = []
+    coords = resolve_stop_coords(stop.get('listing_id') for stop in stops)
+
+    # every leg that needs a lookup, fetched concurrently (or served from the leg cache)
+    pairs = []
+    for a, b in zip(stops, stops[1:]):
+        ca = coords.get(str(a.get('listing_id')))
+        cb = coords.get(str(b.get('listing_id')))
+        if b.get('override_minutes') is None and ca and cb:
+            pairs.append((ca, cb))
+    fetch = partial(fetch_directions_minutes, api_key=api_key)
+    minutes_by_pair = leg_minutes(pairs, mode, fetch, leg_cache, max_workers=PLAN_ROUTE_WORKERS)
 
-    for i in range(len(stops) - 1):
-        a = stops[i]
-        b = stops[i + 1]
+    legs = []
+    for a, b in zip(stops, stops[1:]):
         b_override = b.get('override_minutes')
         if b_override is not None:
             legs.append({'from': a.get('listing_id'), 'to': b.get('listing_id'), 'minutes': b_override, 'source': 'manual'})
             continue
 
-        la = get_listing_with_coords(a.get('listing_id'))
-        lb = get_listing_with_coords(b.get('listing_id'))
-        if not la or not lb or la.get('lat') is None or la.get('lng') is None or lb.get('lat') is None or lb.get('lng') is None:
+        ca = coords.get(str(a.get('listing_id')))
+        cb = coords.get(str(b.get('listing_id')))
+        if not ca or not cb:
             legs.append({'from': a.get('listing_id'), 'to': b.get('listing_id'), 'minutes': None, 'source': 'missing_coords'})
             continue
 
-        minutes = fetch_directions_minutes(la['lat'], la['lng'], lb['lat'], lb['lng'], mode, api_key)
-        legs.append({'from': a.get('listing_id'), 'to': b.get('listing_id'), 'minutes': minutes, 'source': 'directions' if minutes is not None else 'unavailable'})
+        minutes, source = minutes_by_pair[(ca, cb)]
+        legs.append({'from': a.get('listing_id'), 'to': b.get('listing_id'), 'minutes': minutes, 'source': source})
 
     return jsonify({'ok': True, 'mode': mode, 'legs': legs, 'plan': plan})
 
 
+@app.route('/api/inspection-plans/<plan_id>/optimise')
+def api_inspection_plan_optimise(plan_id):
+    """Suggest the stop order with the least travel that still makes each inspection window.
+
+    Query args: `mode`, `start` (HH:MM, default the earliest window) and
+    `visit` (minutes per stop). The saved plan is not modified.
+    """
+    plans = load_plans()
+    plan = plans.get(plan_id)
+    if not plan:
+        return jsonify({'ok': False, 'error': 'plan not found'}), 404
+
+    mode = request.args.get('mode', plan.get('mode', 'driving'))
+    mode = 'walking' if mode == 'walking' else 'driving'
+    visit_minutes = request.args.get('visit', default=PLAN_VISIT_MINUTES, type=float)
+    api_key = os.environ.get('MAPS_API_KEY', '')
+    try:
+        day = datetime.strptime(plan.get('date') or '', '%Y-%m-%d').date()
+    except ValueError:
+        day = None
+
+    ids = list(dict.fromkeys(str(stop.get('listing_id')) for stop in plan.get('stops', [])))
+    coords = resolve_stop_coords(ids)
+    routable = [i for i in ids if i in coords]
+    unrouted = [i for i in ids if i not in coords]
+    if not routable:
+        return jsonify({'ok': False, 'error': 'no stops could be routed', 'unrouted': unrouted}), 400
+    rows = {str(row.get('id')): row for row in listing_index.rows()}
+    windows = [inspection_windows((rows.get(i) or {}).get('inspections'), day) if day else [] for i in routable]
+
+    start_time = parse_clock(request.args.get('start', ''))
+    if start_time is None:
+        opens = [w[0] for stop_windows in windows for w in stop_windows]
+        start_time = min(opens) if opens else 9 * 60
+
+    matrix, sources = travel_matrix([coords[i] for i in routable], mode, api_key, leg_cache, max_workers=PLAN_ROUTE_WORKERS)
+    order, (late, travel) = optimise_order(matrix, windows, start_time, visit_minutes)
+    _cost, visits = schedule(order, matrix, windows, start_time, visit_minutes)
+    (original_late, original_travel), _visits = schedule(list(range(len(routable))), matrix, windows, start_time, visit_minutes)
+
+    stops_out = []
+    for visit in visits:
+        window = visit['window']
+        stops_out.append({
+            'listing_id': routable[visit['stop']],
+            'arrive': format_clock(visit['arrive']),
+            'start': format_clock(visit['start']),
+            'depart': format_clock(visit['depart']),
+            'window': f"{format_clock(window[0])}-{format_clock(window[1])}" if window else None,
+            'late_minutes': max(0, round(visit['start'] + visit_minutes - window[1])) if window else 0,
+        })
+    legs = [
+        {'from': routable[a], 'to': routable[b], 'minutes': matrix[a][b]}
+        for a, b in zip(order, order[1:])
+    ]
+    return jsonify({
+        'ok': True,
+        'mode': mode,
+        'order': [routable[i] for i in order] + unrouted,
+        'stops': stops_out,
+        'legs': legs,
+        'unrouted': unrouted,
+        'total_travel_minutes': travel,
+        'original_travel_minutes': original_travel,
+        # stops without coordinates were not scheduled, so the day isn't known to work
+        'feasible': late == 0 and not unrouted,
+        'late_minutes': late,
+        'original_late_minutes': original_late,
+        'matrix_sources': sources,
+    })
+
+
 @app.route('/api/listing/<listing_id>/comment', methods=['POST'])
 def api_comment_create(listing_id):
     payload = request.get_json() or {}
@@ -606,18 +740,18 @@ def api_comment_create(listing_id):
     if person not in ('tom', 'mq') or not isinstance(text, str) or text.strip() == '':
         return jsonify({'error': 'invalid'}), 400
 
-    votes = load_votes()
-    key = str(listing_id)
-    v = votes.get(key, {})
-    comments = v.get('comments', [])
-    # comment id use timestamp-ms
-    import time
-    cid = str(int(time.time() * 1000))
-    comment = {'id': cid, 'person': person, 'text': text.strip(), 'ts': int(time.time())}
-    comments.append(comment)
-    v['comments'] = comments
-    votes[key] = v
-    save_votes(votes)
+    comment = {'person': person, 'text': text.strip(), 'ts': int(time.time())}
+
+    def add(current):
+        # comment id use timestamp-ms, bumped past any id already on this listing
+        taken = {str(c.get('id')) for c in current.get('comments', [])}
+        cid = int(time.time() * 1000)
+        while str(cid) in taken:
+            cid += 1
+        comment['id'] = str(cid)
+        return {'event': 'comment_added', 'by': person, 'comment': comment}
+
+    record_vote_event(listing_id, add)
     return jsonify({'ok': True, 'comment': comment})
 
 
@@ -628,40 +762,37 @@ def api_comment_update(listing_id, comment_id):
     if not isinstance(text, str):
         return jsonify({'error': 'invalid'}), 400
 
-    votes = load_votes()
-    key = str(listing_id)
-    v = votes.get(key, {})
-    comments = v.get('comments', [])
-    found = False
-    for c in comments:
-        if str(c.get('id')) == str(comment_id):
-            c['text'] = text.strip()
-            c['edited_ts'] = int(__import__('time').time())
-            found = True
-            break
-    if not found:
+    def edit(current):
+        for c in current.get('comments', []):
+            if str(c.get('id')) == str(comment_id):
+                return {'event': 'comment_edited', 'by': c.get('person'), 'comment_id': str(comment_id),
+                        'text': text.strip(), 'edited_ts': int(time.time())}
+        return None
+
+    if record_vote_event(listing_id, edit) is None:
         return jsonify({'error': 'not found'}), 404
-    v['comments'] = comments
-    votes[key] = v
-    save_votes(votes)
     return jsonify({'ok': True})
 
 
 @app.route('/api/listing/<listing_id>/comment/<comment_id>', methods=['DELETE'])
 def api_comment_delete(listing_id, comment_id):
-    votes = load_votes()
-    key = str(listing_id)
-    v = votes.get(key, {})
-    comments = v.get('comments', [])
-    new_comments = [c for c in comments if str(c.get('id')) != str(comment_id)]
-    if len(new_comments) == len(comments):
+    def remove(current):
+        for c in current.get('comments', []):
+            if str(c.get('id')) == str(comment_id):
+                return {'event': 'comment_deleted', 'by': c.get('person'), 'comment_id': str(comment_id)}
+        return None
+
+    if record_vote_event(listing_id, remove) is None:
         return jsonify({'error': 'not found'}), 404
-    v['comments'] = new_comments
-    votes[key] = v
-    save_votes(votes)
     return jsonify({'ok': True})
 
 
+@app.route('/api/listing/<listing_id>/history')
+def api_listing_history(listing_id):
+    """Audit trail of vote, status and comment events for a listing, oldest first."""
+    return jsonify({'ok': True, 'events': vote_store.history(listing_id)})
+
+
 @app.route('/static/<path:path>')
 def static_proxy(path):
     return send_from_directory('static', path)
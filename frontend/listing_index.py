@@ -0,0 +1,96 @@
+"""In-memory index of listing summary rows, refreshed incrementally by file mtime."""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class ListingIndex:
+    """Process-wide cache of per-listing summary rows.
+
+    `build_row(data, stem)` turns a parsed listing JSON into the row that is
+    kept in memory. The listings directory is re-scanned at most once every
+    `refresh_interval` seconds and only files whose mtime or size changed are
+    parsed again, so requests filter and paginate over prebuilt rows.
+
+    It also maps each row's `id` to its file, so lookups by id never have to
+    open other listings.
+    """
+
+    def __init__(self, listings_dir: Path, build_row, refresh_interval: float = 2.0):
+        self.listings_dir = Path(listings_dir)
+        self.build_row = build_row
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._entries = {}  # filename -> (mtime_ns, size, row)
+        self._rows = []
+        self._by_id = {}  # str(row['id']) -> filename
+        self._last_scan = None
+
+    def rows(self):
+        """Return summary rows for every readable listing, sorted by filename."""
+        self.refresh()
+        return self._rows
+
+    def path_for(self, listing_id):
+        """Return the file for `listing_id` (by filename stem or inner id), or None."""
+        path = self.listings_dir / f"{listing_id}.json"
+        if path.is_file():
+            return path
+        self.refresh()
+        name = self._by_id.get(str(listing_id))
+        return self.listings_dir / name if name else None
+
+    def refresh(self, force: bool = False):
+        if not force and not self._is_stale():
+            return
+        with self._lock:
+            # another thread may have refreshed while we waited for the lock
+            if not force and not self._is_stale():
+                return
+            self._scan()
+            self._last_scan = time.monotonic()
+
+    def _is_stale(self):
+        return self._last_scan is None or time.monotonic() - self._last_scan >= self.refresh_interval
+
+    def _scan(self):
+        if not self.listings_dir.is_dir():
+            self._entries = {}
+            self._rows = []
+            self._by_id = {}
+            return
+
+        entries = {}
+        changed = False
+        with os.scandir(self.listings_dir) as it:
+            for entry in it:
+                if not entry.name.lower().endswith('.json') or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                previous = self._entries.get(entry.name)
+                if previous and previous[0] == st.st_mtime_ns and previous[1] == st.st_size:
+                    entries[entry.name] = previous
+                    continue
+
+                changed = True
+                try:
+                    with open(entry.path, 'r', encoding='utf8') as f:
+                        data = json.load(f)
+                except Exception:
+                    data = None
+                row = self.build_row(data, Path(entry.name).stem) if data else None
+                entries[entry.name] = (st.st_mtime_ns, st.st_size, row)
+
+        if changed or entries.keys() != self._entries.keys():
+            self._rows = [entries[name][2] for name in sorted(entries) if entries[name][2] is not None]
+            self._by_id = {
+                str(row['id']): name
+                for name, (_mtime, _size, row) in entries.items()
+                if row is not None and row.get('id') is not None
+            }
+        self._entries = entries
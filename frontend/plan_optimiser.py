@@ -0,0 +1,161 @@
+"""Visiting order for inspection plans: shortest travel that fits inspection windows.
+
+Times are minutes since midnight. Each stop has zero or more windows
+`(open, close)`; a visit may start at `max(arrival, open)` and must end by
+`close`. Stops without windows can be visited any time. Orders are compared
+by (minutes late, total travel), so an infeasible plan still gets the order
+that misses its windows by the least.
+"""
+import re
+from datetime import date
+from itertools import permutations
+
+DAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+# up to this many stops every order is tried
+EXACT_MAX_STOPS = 7
+
+
+def parse_clock(text):
+    """'10:30am' / '2pm' / '14:00' -> minutes since midnight, or None."""
+    m = re.match(r'\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)?', text or '', re.I)
+    if not m:
+        return None
+    hours, minutes, period = int(m.group(1)), int(m.group(2) or 0), (m.group(3) or '').lower()
+    if period == 'pm' and hours != 12:
+        hours += 12
+    if period == 'am' and hours == 12:
+        hours = 0
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def format_clock(minutes):
+    if minutes is None:
+        return None
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _inspection_on(inspection, day: date):
+    """True if an inspection's day label ('Saturday, 18 Oct') falls on `day`."""
+    label = (inspection.get('day') or '').lower()
+    m = re.search(r'(\d{1,2})\s+([a-z]{3})', label)
+    if m and m.group(2) in MONTHS:
+        return int(m.group(1)) == day.day and MONTHS.index(m.group(2)) + 1 == day.month
+    return DAY_NAMES[day.weekday()] in label
+
+
+def inspection_windows(inspections, day: date):
+    """[(open, close), ...] for the listing's inspections on `day`, earliest first."""
+    windows = []
+    for inspection in inspections or []:
+        if not _inspection_on(inspection, day):
+            continue
+        parts = re.split(r'\s*[-–—]\s*', inspection.get('time') or '')
+        start = parse_clock(parts[0]) if parts else None
+        end = parse_clock(parts[1]) if len(parts) > 1 else None
+        if start is None:
+            continue
+        windows.append((start, end if end is not None and end > start else start + 30))
+    return sorted(windows)
+
+
+def schedule(order, matrix, windows, start_time, visit_minutes):
+    """Simulate visiting `order`; returns (cost, visits) with cost = (late, travel)."""
+    visits = []
+    late = 0
+    travel = 0
+    t = start_time
+    previous = None
+    for stop in order:
+        if previous is not None:
+            leg = matrix[previous][stop]
+            travel += leg
+            t += leg
+        arrive = t
+        begin = arrive
+        window = None
+        for w_open, w_close in windows[stop]:
+            if max(arrive, w_open) + visit_minutes <= w_close:
+                window = (w_open, w_close)
+                begin = max(arrive, w_open)
+                break
+        if windows[stop] and window is None:
+            # missed every window: charge how late we are for the last one
+            window = windows[stop][-1]
+            begin = max(arrive, window[0])
+            late += begin + visit_minutes - window[1]
+        t = begin + visit_minutes
+        visits.append({'stop': stop, 'arrive': arrive, 'start': begin, 'depart': t, 'window': window})
+        previous = stop
+    return (late, travel), visits
+
+
+def _cost(order, matrix, windows, start_time, visit_minutes):
+    return schedule(order, matrix, windows, start_time, visit_minutes)[0]
+
+
+def _nearest_neighbour(first, n, matrix):
+    order = [first]
+    remaining = set(range(n)) - {first}
+    while remaining:
+        nxt = min(remaining, key=lambda j: matrix[order[-1]][j])
+        order.append(nxt)
+        remaining.remove(nxt)
+    return order
+
+
+def _local_search(order, cost_of):
+    """Relocate and 2-opt moves until no move lowers the cost."""
+    best = cost_of(order)
+    improved = True
+    while improved:
+        improved = False
+        n = len(order)
+        for i in range(n):
+            for j in range(n):
+                if i == j:
+                    continue
+                candidate = order[:i] + order[i + 1:]
+                candidate.insert(j, order[i])
+                cost = cost_of(candidate)
+                if cost < best:
+                    order, best, improved = candidate, cost, True
+        for i in range(n - 1):
+            for j in range(i + 2, n + 1):
+                candidate = order[:i] + order[i:j][::-1] + order[j:]
+                cost = cost_of(candidate)
+                if cost < best:
+                    order, best, improved = candidate, cost, True
+    return order, best
+
+
+def optimise_order(matrix, windows, start_time, visit_minutes, initial=None):
+    """Best visiting order over stops 0..n-1; returns (order, cost)."""
+    n = len(matrix)
+    if n <= 1:
+        return list(range(n)), _cost(list(range(n)), matrix, windows, start_time, visit_minutes)
+
+    def cost_of(order):
+        return _cost(order, matrix, windows, start_time, visit_minutes)
+
+    if n <= EXACT_MAX_STOPS:
+        best = min(permutations(range(n)), key=cost_of)
+        return list(best), cost_of(best)
+
+    # seeds: the user's order, earliest window deadline first, and nearest
+    # neighbour from the stop whose window closes first
+    def deadline(stop):
+        return windows[stop][0][1] if windows[stop] else float('inf')
+
+    by_deadline = sorted(range(n), key=deadline)
+    seeds = [list(initial) if initial else list(range(n)), by_deadline, _nearest_neighbour(by_deadline[0], n, matrix)]
+
+    best_order, best_cost = None, None
+    for seed in seeds:
+        order, cost = _local_search(seed, cost_of)
+        if best_cost is None or cost < best_cost:
+            best_order, best_cost = order, cost
+    return best_order, best_cost
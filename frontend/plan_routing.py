@@ -0,0 +1,203 @@
+"""Travel times between inspection plan stops, cached by (coordinate pair, mode)."""
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+# Distance Matrix allows at most 100 elements per request
+MATRIX_BLOCK = 10
+# straight-line fallback when Google can't be reached: average speed (km/h) and detour factor
+ESTIMATE_SPEED_KMH = {'driving': 30.0, 'walking': 4.8}
+ESTIMATE_DETOUR = 1.3
+
+
+def coord_key(lat, lng):
+    """Coordinates rounded to ~1m so the same listing always maps to the same key."""
+    return f"{float(lat):.5f},{float(lng):.5f}"
+
+
+def leg_key(origin, dest, mode):
+    return f"{coord_key(*origin)}|{coord_key(*dest)}|{mode}"
+
+
+class LegCache:
+    """Persistent leg -> minutes map with a TTL, shared by all requests.
+
+    Entries are `{"minutes": int, "cached_at": epoch}`; failed lookups are not
+    cached so they are retried next time. Writes merge with whatever another
+    worker process saved in the meantime.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._mtime_ns = None
+
+    def _reload_if_changed(self):
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime_ns == self._mtime_ns:
+            return
+        try:
+            with self.path.open('r', encoding='utf8') as f:
+                self._entries = json.load(f)
+            self._mtime_ns = mtime_ns
+        except Exception:
+            pass
+
+    def get(self, origin, dest, mode):
+        """Cached minutes for the leg, or None if unknown or expired."""
+        with self._lock:
+            self._reload_if_changed()
+            entry = self._entries.get(leg_key(origin, dest, mode))
+        if entry and time.time() - entry.get('cached_at', 0) < self.ttl_seconds:
+            return entry['minutes']
+        return None
+
+    def put_many(self, legs):
+        """Store {(origin, dest, mode): minutes} and write the cache file once."""
+        if not legs:
+            return
+        now = int(time.time())
+        with self._lock:
+            self._reload_if_changed()
+            for (origin, dest, mode), minutes in legs.items():
+                self._entries[leg_key(origin, dest, mode)] = {'minutes': minutes, 'cached_at': now}
+            # drop expired entries while we're rewriting the file anyway
+            self._entries = {k: v for k, v in self._entries.items() if now - v.get('cached_at', 0) < self.ttl_seconds}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + '.tmp')
+                with tmp.open('w', encoding='utf8') as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp, self.path)
+                self._mtime_ns = self.path.stat().st_mtime_ns
+            except Exception:
+                pass
+
+
+def leg_minutes(pairs, mode, fetch_minutes, cache: LegCache, max_workers: int = 8):
+    """Travel minutes for each (origin, dest) coordinate pair.
+
+    Cached legs are answered immediately; the rest are fetched concurrently
+    with `fetch_minutes(origin_lat, origin_lng, dest_lat, dest_lng, mode)`.
+    Returns {pair: (minutes, source)} where source is 'cache', 'directions'
+    or 'unavailable'.
+    """
+    results = {}
+    misses = []
+    for pair in dict.fromkeys(pairs):
+        minutes = cache.get(pair[0], pair[1], mode)
+        if minutes is not None:
+            results[pair] = (minutes, 'cache')
+        else:
+            misses.append(pair)
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(misses)))) as pool:
+            fetched = list(pool.map(lambda p: fetch_minutes(p[0][0], p[0][1], p[1][0], p[1][1], mode), misses))
+        cache.put_many({(p[0], p[1], mode): m for p, m in zip(misses, fetched) if m is not None})
+        for pair, minutes in zip(misses, fetched):
+            results[pair] = (minutes, 'directions' if minutes is not None else 'unavailable')
+    return results
+
+
+def estimate_minutes(origin, dest, mode):
+    """Rough travel minutes from straight-line distance, used when Google is unavailable."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (origin[0], origin[1], dest[0], dest[1]))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    km = 2 * 6371 * math.asin(math.sqrt(a)) * ESTIMATE_DETOUR
+    return max(1, round(km / ESTIMATE_SPEED_KMH.get(mode, 30.0) * 60))
+
+
+def fetch_matrix_minutes(origins, destinations, mode, api_key):
+    """Distance Matrix minutes as a list of rows (None for missing elements), or None on failure."""
+    if not api_key:
+        return None
+    try:
+        params = {
+            'origins': '|'.join(f"{lat},{lng}" for lat, lng in origins),
+            'destinations': '|'.join(f"{lat},{lng}" for lat, lng in destinations),
+            'mode': mode,
+            'key': api_key,
+        }
+        url = f"https://maps.googleapis.com/maps/api/distancematrix/json?{urlencode(params)}"
+        with urlopen(url, timeout=8) as resp:
+            data = json.loads(resp.read().decode('utf-8'))
+        if data.get('status') != 'OK':
+            return None
+        rows = []
+        for row in data.get('rows') or []:
+            cells = []
+            for element in row.get('elements') or []:
+                dur = (element.get('duration') or {}).get('value') if element.get('status') == 'OK' else None
+                cells.append(round(dur / 60) if dur is not None else None)
+            rows.append(cells)
+        return rows
+    except Exception:
+        return None
+
+
+def travel_matrix(points, mode, api_key, cache: LegCache, max_workers: int = 8):
+    """Pairwise travel minutes between `points` (list of (lat, lng)).
+
+    Returns (matrix, sources): matrix[i][j] is minutes from i to j, and
+    sources counts how many legs came from the cache, Distance Matrix or a
+    distance estimate. Only Distance Matrix results are cached.
+    """
+    n = len(points)
+    matrix = [[0] * n for _ in range(n)]
+    sources = {'cache': 0, 'matrix': 0, 'estimate': 0}
+    missing = set()
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                continue
+            minutes = cache.get(points[i], points[j], mode)
+            if minutes is None:
+                missing.add((i, j))
+            else:
+                matrix[i][j] = minutes
+                sources['cache'] += 1
+
+    if missing:
+        origins = sorted({i for i, _ in missing})
+        dests = sorted({j for _, j in missing})
+        blocks = [
+            (origins[a:a + MATRIX_BLOCK], dests[b:b + MATRIX_BLOCK])
+            for a in range(0, len(origins), MATRIX_BLOCK)
+            for b in range(0, len(dests), MATRIX_BLOCK)
+        ]
+
+        def fetch_block(block):
+            rows_idx, cols_idx = block
+            return block, fetch_matrix_minutes([points[i] for i in rows_idx], [points[j] for j in cols_idx], mode, api_key)
+
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(blocks)))) as pool:
+            for (rows_idx, cols_idx), rows in pool.map(fetch_block, blocks):
+                if not rows:
+                    continue
+                for r, i in enumerate(rows_idx):
+                    for c, j in enumerate(cols_idx):
+                        if (i, j) in missing and r < len(rows) and c < len(rows[r]) and rows[r][c] is not None:
+                            fetched[(i, j)] = rows[r][c]
+
+        cache.put_many({(points[i], points[j], mode): m for (i, j), m in fetched.items()})
+        for i, j in missing:
+            if (i, j) in fetched:
+                matrix[i][j] = fetched[(i, j)]
+                sources['matrix'] += 1
+            else:
+                matrix[i][j] = estimate_minutes(points[i], points[j], mode)
+                sources['estimate'] += 1
+    return matrix, sources
@@ -309,6 +309,28 @@
     }
   }
 
+  document.getElementById('optimise-order').onclick = async () => {
+    // the optimiser works on the saved plan, so save the current stops first
+    await document.getElementById('save-plan').onclick()
+    if (!currentPlan.id) return
+    const mode = document.getElementById('plan-mode').value || 'driving'
+    const legsBox = document.getElementById('legs')
+    try {
+      const res = await fetch(`/api/inspection-plans/${currentPlan.id}/optimise?mode=${mode}`)
+      const j = await res.json()
+      if (!j.ok) { legsBox.textContent = `Optimise failed${j.error ? `: ${j.error}` : ''}`; return }
+      const byId = Object.fromEntries(currentPlan.stops.map(s => [String(s.listing_id), s]))
+      currentPlan.stops = j.order.map(id => byId[id]).filter(Boolean)
+      renderStops()
+      let note = j.late_minutes ? ` — ${j.late_minutes} min past inspection windows` : ''
+      if (j.unrouted.length) note += ` — not routed (no location): ${j.unrouted.join(', ')}`
+      legsBox.innerHTML = `<div class="font-medium">Travel ${j.total_travel_minutes} min (was ${j.original_travel_minutes})${note}</div>` +
+        j.stops.map(s => `<div>${s.start} ${s.listing_id}${s.window ? ` (inspection ${s.window})` : ''}${s.late_minutes ? ` late ${s.late_minutes} min` : ''}</div>`).join('')
+    } catch (e) {
+      legsBox.textContent = 'Optimise failed'
+    }
+  }
+
   // Load existing plans on init
   async function initPlan() {
     await loadListings()
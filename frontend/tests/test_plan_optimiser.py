@@ -0,0 +1,150 @@
+import itertools
+import random
+
+import pytest
+
+import plan_optimiser
+from plan_optimiser import EXACT_MAX_STOPS, _local_search, optimise_order, schedule
+
+
+def line_matrix(positions):
+    """Travel minutes between stops on a straight road."""
+    return [[abs(a - b) for b in positions] for a in positions]
+
+
+def random_matrix(n, seed):
+    rng = random.Random(seed)
+    return [[0 if i == j else rng.randint(3, 40) for j in range(n)] for i in range(n)]
+
+
+def brute_force(matrix, windows, start, visit):
+    return min(
+        schedule(list(order), matrix, windows, start, visit)[0]
+        for order in itertools.permutations(range(len(matrix)))
+    )
+
+
+@pytest.mark.parametrize('n', range(2, EXACT_MAX_STOPS + 1))
+def test_exact_search_up_to_the_cutoff(n, monkeypatch):
+    def no_local_search(*args):
+        raise AssertionError('local search used below the cutoff')
+
+    monkeypatch.setattr(plan_optimiser, '_local_search', no_local_search)
+    matrix = random_matrix(n, seed=n)
+    windows = [[(600 + 20 * i, 660 + 20 * i)] if i % 2 else [] for i in range(n)]
+    _order, cost = optimise_order(matrix, windows, 540, 10)
+    assert cost == brute_force(matrix, windows, 540, 10)
+
+
+def test_local_search_above_the_cutoff(monkeypatch):
+    def no_permutations(*args):
+        raise AssertionError('exact search used above the cutoff')
+
+    monkeypatch.setattr(plan_optimiser, 'permutations', no_permutations)
+    positions = [40, 5, 90, 20, 75, 0, 60, 35]
+    assert len(positions) == EXACT_MAX_STOPS + 1
+    order, (late, travel) = optimise_order(line_matrix(positions), [[]] * len(positions), 540, 10)
+    assert (late, travel) == (0, 90)
+    assert [positions[i] for i in order] in (sorted(positions), sorted(positions, reverse=True))
+
+
+@pytest.mark.parametrize('order', [
+    [0, 1, 3, 2, 4, 5],  # one stop out of place: relocate
+    [0, 4, 3, 2, 1, 5],  # a reversed run: 2-opt
+    [5, 0, 1, 2, 3, 4],
+    [3, 1, 5, 0, 4, 2],
+])
+def test_local_search_reaches_the_straight_route(order):
+    matrix = line_matrix([0, 10, 20, 30, 40, 50])
+
+    def cost_of(o):
+        return schedule(o, matrix, [[]] * 6, 0, 0)[0]
+
+    best, cost = _local_search(order, cost_of)
+    assert cost == (0, 50)
+    assert best in ([0, 1, 2, 3, 4, 5], [5, 4, 3, 2, 1, 0])
+
+
+def test_local_search_keeps_an_optimal_seed():
+    matrix = line_matrix([0, 10, 20])
+    order = [0, 1, 2]
+    assert _local_search(order, lambda o: schedule(o, matrix, [[]] * 3, 0, 0)[0]) == (order, (0, 20))
+
+
+def test_schedule_waits_for_the_window_and_charges_late_minutes():
+    matrix = line_matrix([0, 30, 45])
+    windows = [[], [(600, 615)], [(560, 600), (640, 660)]]
+    (late, travel), visits = schedule([0, 1, 2], matrix, windows, 540, 10)
+
+    # stop 1: arrive 9:40, wait for 10:00; stop 2: 10:25 misses 9:20-10:00, makes 10:40-11:00
+    assert [(v['arrive'], v['start'], v['window']) for v in visits] == [
+        (540, 540, None), (580, 600, (600, 615)), (625, 640, (640, 660)),
+    ]
+    assert (late, travel) == (0, 45)
+
+    # starting at 10:00 misses both: each is charged against its last window
+    (late, _), visits = schedule([0, 1, 2], matrix, windows, 600, 10)
+    assert [(v['start'], v['window']) for v in visits[1:]] == [(640, (600, 615)), (665, (640, 660))]
+    assert late == (640 + 10 - 615) + (665 + 10 - 660)
+
+
+def test_windows_outrank_travel():
+    # the straight route reaches the middle stop after its window closes
+    matrix = line_matrix([0, 10, 20])
+    windows = [[], [(540, 550)], []]
+    assert schedule([0, 1, 2], matrix, windows, 540, 5)[0] == (10, 20)
+
+    order, cost = optimise_order(matrix, windows, 540, 5)
+    assert order[0] == 1
+    assert cost == (0, 30)
+
+
+def test_infeasible_plan_is_late_by_the_fewest_minutes():
+    matrix = line_matrix([0, 60, 120])
+    windows = [[(540, 560)], [(540, 560)], [(540, 560)]]
+    order, (late, _travel) = optimise_order(matrix, windows, 540, 10)
+    assert late > 0
+    assert late == brute_force(matrix, windows, 540, 10)[0]
+
+
+@pytest.fixture
+def optimise(tmp_path, monkeypatch):
+    """GET the optimise endpoint for a one-plan store; `coords` maps listing id -> (lat, lng)."""
+    import app as frontend_app
+    from plan_routing import LegCache
+
+    monkeypatch.delenv('MAPS_API_KEY', raising=False)  # straight-line estimates only
+    monkeypatch.setattr(frontend_app, 'leg_cache', LegCache(tmp_path / 'legs.json', ttl_seconds=3600))
+    monkeypatch.setattr(frontend_app.listing_index, 'rows', lambda: [])
+
+    def get(stop_ids, coords):
+        plan = {'id': 'p1', 'date': '2026-10-18', 'stops': [{'listing_id': i} for i in stop_ids]}
+        monkeypatch.setattr(frontend_app, 'load_plans', lambda: {'p1': plan})
+        monkeypatch.setattr(frontend_app, 'resolve_stop_coords', lambda ids: {i: coords[i] for i in ids if i in coords})
+        response = frontend_app.app.test_client().get('/api/inspection-plans/p1/optimise')
+        return response.status_code, response.get_json()
+
+    return get
+
+
+def test_optimise_without_any_routable_stop(optimise):
+    status, body = optimise(['1', '2'], {})
+    assert status == 400
+    assert body['ok'] is False and body['error']
+    assert body['unrouted'] == ['1', '2']
+
+    status, body = optimise([], {})
+    assert (status, body['unrouted']) == (400, [])
+
+
+def test_optimise_with_some_unrouted_stops_is_not_feasible(optimise):
+    coords = {'1': (-33.7725, 151.0821), '3': (-33.8151, 151.1010)}
+    status, body = optimise(['1', '2', '3'], coords)
+    assert status == 200 and body['ok'] is True
+    assert [s['listing_id'] for s in body['stops']] == body['order'][:2]
+    assert body['order'][2:] == body['unrouted'] == ['2']
+    assert body['late_minutes'] == 0
+    assert body['feasible'] is False
+
+    status, body = optimise(['1', '3'], coords)
+    assert (body['unrouted'], body['feasible']) == ([], True)
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+import plan_routing
+from plan_routing import MATRIX_BLOCK, LegCache, leg_key, travel_matrix
+
+A, B, C = (-33.7725, 151.0821), (-33.8151, 151.1010), (-33.7967, 151.1819)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(plan_routing.time, 'time', lambda: now[0])
+    return now
+
+
+def test_leg_cache_expires_after_ttl(tmp_path, clock):
+    cache = LegCache(tmp_path / 'legs.json', ttl_seconds=3600)
+    cache.put_many({(A, B, 'driving'): 12})
+    assert cache.get(A, B, 'driving') == 12
+    assert cache.get(A, B, 'walking') is None
+    assert cache.get(B, A, 'driving') is None
+
+    clock[0] += 3599
+    assert LegCache(tmp_path / 'legs.json', ttl_seconds=3600).get(A, B, 'driving') == 12
+    clock[0] += 1
+    assert cache.get(A, B, 'driving') is None
+
+
+def test_leg_cache_drops_expired_entries_on_write(tmp_path, clock):
+    cache = LegCache(tmp_path / 'legs.json', ttl_seconds=3600)
+    cache.put_many({(A, B, 'driving'): 12})
+    clock[0] += 1800
+    cache.put_many({(B, C, 'driving'): 9})
+    clock[0] += 2000
+    cache.put_many({(A, C, 'driving'): 15})
+
+    saved = json.loads((tmp_path / 'legs.json').read_text())
+    assert set(saved) == {leg_key(B, C, 'driving'), leg_key(A, C, 'driving')}
+
+
+def test_leg_cache_sees_other_workers_writes(tmp_path, clock):
+    path = tmp_path / 'legs.json'
+    mine, theirs = LegCache(path, ttl_seconds=60), LegCache(path, ttl_seconds=60)
+    mine.put_many({(A, B, 'driving'): 12})
+    theirs.put_many({(B, A, 'driving'): 13})
+    assert mine.get(B, A, 'driving') == 13
+    assert theirs.get(A, B, 'driving') == 12
+
+
+def grid(n):
+    return [(-33.8 + i * 0.01, 151.0 + i * 0.01) for i in range(n)]
+
+
+@pytest.fixture
+def matrix_calls(monkeypatch):
+    """Fake Distance Matrix over `grid` points: minutes are 100 * origin + destination index."""
+    calls = []
+    index = {point: i for i, point in enumerate(grid(30))}
+
+    def fetch_matrix_minutes(origins, destinations, mode, api_key):
+        calls.append((origins, destinations))
+        return [[100 * index[o] + index[d] for d in destinations] for o in origins]
+
+    monkeypatch.setattr(plan_routing, 'fetch_matrix_minutes', fetch_matrix_minutes)
+    return calls
+
+
+@pytest.mark.parametrize('n, blocks', [(2, 1), (10, 1), (11, 4), (12, 4), (25, 9)])
+def test_matrix_is_fetched_in_10x10_blocks(tmp_path, matrix_calls, n, blocks):
+    points = grid(n)
+    cache = LegCache(tmp_path / 'legs.json', ttl_seconds=3600)
+    matrix, sources = travel_matrix(points, 'driving', 'key', cache)
+
+    assert len(matrix_calls) == blocks
+    assert all(len(o) <= MATRIX_BLOCK and len(d) <= MATRIX_BLOCK for o, d in matrix_calls)
+    # together the blocks cover every origin/destination pair exactly once
+    pairs = [(o, d) for origins, dests in matrix_calls for o in origins for d in dests]
+    assert len(pairs) == len(set(pairs)) == n * n
+    assert all(matrix[i][j] == 100 * i + j for i in range(n) for j in range(n) if i != j)
+    assert sources == {'cache': 0, 'matrix': n * (n - 1), 'estimate': 0}
+
+    # the second lookup is all cache
+    matrix_calls.clear()
+    again, sources = travel_matrix(points, 'driving', 'key', cache)
+    assert (matrix_calls, again) == ([], matrix)
+    assert sources == {'cache': n * (n - 1), 'matrix': 0, 'estimate': 0}
+
+
+def test_only_missing_legs_are_requested(tmp_path, matrix_calls):
+    points = grid(12)
+    cache = LegCache(tmp_path / 'legs.json', ttl_seconds=3600)
+    cache.put_many({(points[i], points[j], 'driving'): 1 for i in range(12) for j in range(12) if i != j and i < 11})
+    matrix, sources = travel_matrix(points, 'driving', 'key', cache)
+
+    # only row 11 is missing: one origin, destinations 0..10 in two blocks
+    assert [(len(o), len(d)) for o, d in matrix_calls] == [(1, 10), (1, 1)]
+    assert sources == {'cache': 121, 'matrix': 11, 'estimate': 0}
+    assert matrix[11][:3] == [1100, 1101, 1102]
+
+
+def test_failed_blocks_are_estimated_and_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(plan_routing, 'fetch_matrix_minutes', lambda *args: None)
+    cache = LegCache(tmp_path / 'legs.json', ttl_seconds=3600)
+    matrix, sources = travel_matrix([A, B, C], 'walking', 'key', cache)
+
+    assert sources == {'cache': 0, 'matrix': 0, 'estimate': 6}
+    assert matrix[0][1] == plan_routing.estimate_minutes(A, B, 'walking') > 0
+    assert cache.get(A, B, 'walking') is None
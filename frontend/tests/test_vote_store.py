@@ -0,0 +1,158 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from vote_store import VoteStore
+
+FRONTEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def vote(**fields):
+    return lambda current: {'event': 'vote', 'set': fields}
+
+
+def add_comment(comment_id, person, text):
+    return lambda current: {
+        'event': 'comment_added',
+        'by': person,
+        'comment': {'id': comment_id, 'person': person, 'text': text, 'ts': 1},
+    }
+
+
+def journal_lines(store):
+    return store.journal_path.read_bytes().splitlines(keepends=True)
+
+
+@pytest.fixture
+def votes_file(tmp_path):
+    path = tmp_path / 'votes.json'
+    path.write_text(json.dumps({'1': {'tom': True, 'workflow_status': 'active'}}))
+    return path
+
+
+def test_replays_journal_over_snapshot(votes_file):
+    votes_file.with_suffix('.journal').write_text(
+        json.dumps({'id': '1', 'ts': 1, 'event': 'vote', 'set': {'mq': False}}) + '\n'
+        + json.dumps({'id': '2', 'ts': 2, 'event': 'status', 'set': {'workflow_status': 'rejected'}}) + '\n'
+    )
+    votes = VoteStore(votes_file).load()
+    assert votes['1'] == {'tom': True, 'workflow_status': 'active', 'mq': False}
+    assert votes['2'] == {'workflow_status': 'rejected'}
+
+
+def test_torn_last_line_is_ignored_then_trimmed_by_next_write(votes_file):
+    journal = votes_file.with_suffix('.journal')
+    good = json.dumps({'id': '1', 'ts': 1, 'event': 'vote', 'set': {'mq': True}}) + '\n'
+    torn = '{"id": "1", "ts": 2, "event": "vote", "set": {"tom": fa'
+    journal.write_text(good + torn)
+
+    store = VoteStore(votes_file)
+    assert store.load()['1'] == {'tom': True, 'workflow_status': 'active', 'mq': True}
+
+    store.record('3', vote(tom=False))
+    lines = journal_lines(store)
+    assert lines[0].decode() == good
+    assert len(lines) == 2 and json.loads(lines[1])['id'] == '3'
+
+    fresh = VoteStore(votes_file).load()
+    assert fresh['1']['tom'] is True
+    assert fresh['3'] == {'tom': False}
+
+
+def test_garbled_complete_line_is_skipped(votes_file):
+    votes_file.with_suffix('.journal').write_text(
+        'not json\n' + json.dumps({'id': '1', 'ts': 1, 'event': 'vote', 'set': {'mq': True}}) + '\n'
+    )
+    assert VoteStore(votes_file).load()['1']['mq'] is True
+
+
+def test_compaction_moves_events_to_history(votes_file):
+    store = VoteStore(votes_file, compact_every=3)
+    store.record('1', vote(mq=True))
+    store.record('2', add_comment(1, 'tom', 'big yard'))
+    assert len(journal_lines(store)) == 2
+    assert not store.history_path.exists()
+
+    store.record('1', vote(tom_score=4))
+    assert store.journal_path.read_bytes() == b''
+    snapshot = json.loads(votes_file.read_text())
+    assert snapshot['1'] == {'tom': True, 'workflow_status': 'active', 'mq': True, 'tom_score': 4}
+    assert snapshot['2']['comments'][0]['text'] == 'big yard'
+    history = [json.loads(line) for line in store.history_path.read_text().splitlines()]
+    assert [e['id'] for e in history] == ['1', '2', '1']
+
+    # later events go to the journal again; the audit trail spans both files
+    store.record('1', vote(mq=False))
+    assert len(journal_lines(store)) == 1
+    assert [e['set'] for e in store.history('1')] == [{'mq': True}, {'tom_score': 4}, {'mq': False}]
+    assert VoteStore(votes_file).load() == store.load()
+
+
+def test_loaded_view_is_not_changed_by_later_events(votes_file):
+    store = VoteStore(votes_file)
+    store.record('1', add_comment(1, 'mq', 'first'))
+    before = store.load()
+    store.record('1', add_comment(2, 'mq', 'second'))
+    store.record('5', vote(tom=True))
+
+    assert [c['text'] for c in before['1']['comments']] == ['first']
+    assert '5' not in before
+    after = store.load()
+    assert after is not before
+    assert [c['text'] for c in after['1']['comments']] == ['first', 'second']
+
+
+CHILD = '''
+import sys
+sys.path.insert(0, {frontend!r})
+from vote_store import VoteStore
+store = VoteStore({path!r}, compact_every={compact_every})
+for i in range({count}):
+    store.record('7', lambda current, i=i: {{
+        'event': 'comment_added', 'by': {who!r},
+        'comment': {{'id': {who!r} + str(i), 'person': {who!r}, 'text': str(i), 'ts': i}},
+    }})
+'''
+
+
+def run_writer(votes_file, who, count, compact_every):
+    script = CHILD.format(frontend=str(FRONTEND_DIR), path=str(votes_file),
+                          compact_every=compact_every, who=who, count=count)
+    return subprocess.Popen([sys.executable, '-c', script])
+
+
+def test_reads_see_writes_from_other_processes(votes_file):
+    store = VoteStore(votes_file, compact_every=5)
+    store.record('7', vote(tom=True))
+    assert 'comments' not in store.load()['7']
+
+    # two writer processes interleave appends and compactions with this one
+    writers = [run_writer(votes_file, who, 12, compact_every=5) for who in ('tom', 'mq')]
+    for i in range(6):
+        store.record('8', vote(mq_score=i))
+    assert [w.wait(timeout=60) for w in writers] == [0, 0]
+
+    votes = store.load()
+    assert len(votes['7']['comments']) == 24
+    assert votes['8']['mq_score'] == 5
+    assert VoteStore(votes_file).load() == votes
+    assert len(store.history('7')) == 25
+
+
+def test_history_endpoint(votes_file, monkeypatch):
+    import app as frontend_app
+
+    store = VoteStore(votes_file, compact_every=2)
+    monkeypatch.setattr(frontend_app, 'vote_store', store)
+    store.record('1', vote(mq=True))
+    store.record('1', add_comment(1, 'tom', 'nice'))
+    store.record('2', vote(tom=False))
+    store.record('1', vote(tom_score=2))
+
+    body = frontend_app.app.test_client().get('/api/listing/1/history').get_json()
+    assert body['ok'] is True
+    assert [e['event'] for e in body['events']] == ['vote', 'comment_added', 'vote']
+    assert body['events'][0]['ts'] <= body['events'][-1]['ts']
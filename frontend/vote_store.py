@@ -0,0 +1,230 @@
+"""Votes, workflow statuses and comments as an append-only event log.
+
+Every change is one JSON line appended to `votes.journal`, e.g.
+
+    {"id": "123", "ts": 1760000000.1, "event": "vote", "set": {"tom": true, "tom_score": 4}}
+    {"id": "123", "ts": ..., "event": "comment_added", "by": "mq", "comment": {...}}
+
+Current state (listing id -> vote record, the shape `votes.json` always had)
+is materialised in memory from the `votes.json` snapshot plus the journal
+tail, so a write is one small append and reads never touch the disk beyond a
+stat. Once the journal holds `compact_every` events the view is written as a
+new snapshot (temp file + rename), the events move to `votes_history.jsonl`,
+which is kept as the audit trail, and the journal is emptied.
+
+Writers hold an exclusive `flock` on `votes.lock` (and a thread lock within
+this process); readers hold a shared one. The view is copy-on-write: new
+events produce a new dict, so one handed out by `load()` never changes under
+a request that is still iterating it. The backend and the rejection
+scanner follow the same protocol. A torn last journal line from a crash is
+ignored and trimmed by the next writer.
+"""
+import copy
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# the journal format and its reducer are shared with the backend, the
+# rejection scanner and the API import: backend/vote_events.py, copied next
+# to this file in the image, the sibling directory in a checkout
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
+from vote_events import apply_vote_event, journal_events
+
+try:
+    import fcntl
+    FLOCK_AVAILABLE = True
+except ImportError:  # not on POSIX: only the in-process lock applies
+    FLOCK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class VoteStore:
+    """Thread- and process-safe materialised view over the votes snapshot and event log."""
+
+    def __init__(self, path: Path, compact_every: int = 200):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix('.journal')
+        self.history_path = self.path.with_name(self.path.stem + '_history.jsonl')
+        self.lock_path = self.path.with_suffix('.lock')
+        self.compact_every = max(1, compact_every)
+        self._lock = threading.Lock()
+        self._votes = {}
+        self._snapshot_key = None
+        self._snapshot_ok = True
+        self._journal_offset = 0  # bytes of the journal already applied
+        self._journal_entries = 0
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if not FLOCK_AVAILABLE:
+            yield
+            return
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stat_key(self):
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        """Bring the in-memory view up to date with the files (file lock held)."""
+        key = self._stat_key()
+        try:
+            journal_size = self.journal_path.stat().st_size
+        except OSError:
+            journal_size = 0
+        if key != self._snapshot_key or journal_size < self._journal_offset:
+            votes = {}
+            self._snapshot_ok = True
+            if key is not None:
+                try:
+                    with self.path.open('r', encoding='utf8') as f:
+                        votes = json.load(f)
+                except Exception as e:
+                    # keep serving what we had; compaction is blocked so the
+                    # damaged file is never replaced by a partial view
+                    logger.error(f"Could not read {self.path}: {e}")
+                    votes = self._votes
+                    self._snapshot_ok = False
+            self._votes = votes
+            self._snapshot_key = key
+            self._journal_offset = 0
+            self._journal_entries = 0
+        if journal_size > self._journal_offset:
+            self._replay(journal_size)
+
+    def _replay(self, journal_size):
+        with self.journal_path.open('rb') as f:
+            f.seek(self._journal_offset)
+            chunk = f.read(journal_size - self._journal_offset)
+        # only complete lines; a torn final write is left for the next writer to trim
+        end = chunk.rfind(b'\n') + 1
+        self._votes, applied = self._with_events(journal_events(chunk[:end]))
+        self._journal_entries += applied
+        self._journal_offset += end
+
+    def _with_events(self, events):
+        """A new view with `events` applied, and how many of them applied.
+
+        The current dict is left untouched: the top level is copied and each
+        record an event touches is deep-copied before its first change.
+        """
+        votes = dict(self._votes)
+        copied = set()
+        applied = 0
+        for event in events:
+            key = str(event['id'])
+            if key not in copied:
+                copied.add(key)
+                if key in votes:
+                    votes[key] = copy.deepcopy(votes[key])
+            try:
+                apply_vote_event(votes, event)
+            except Exception:
+                continue
+            applied += 1
+        return votes, applied
+
+    def load(self):
+        """All vote records, keyed by listing id.
+
+        The dict is never modified once returned (later events replace it), so
+        it is safe to iterate without a lock. Treat it as read-only.
+        """
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+            return self._votes
+
+    def record(self, listing_id, make_event):
+        """Append the event `make_event(current_record)` for one listing.
+
+        `make_event` sees the listing's current record (read-only) and returns
+        the event fields (`event`, plus `set`/`comment`/... as needed), or None
+        to record nothing. Returns the updated record, or None if skipped.
+        """
+        key = str(listing_id)
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            event = make_event(self._votes.get(key, {}))
+            if event is None:
+                return None
+            event = dict(event, id=key, ts=round(time.time(), 3))
+            self._append(event)
+            self._votes, _ = self._with_events([event])
+            if self._journal_entries >= self.compact_every and self._snapshot_ok:
+                self._compact()
+            return self._votes[key]
+
+    def _append(self, event):
+        line = (json.dumps(event) + '\n').encode('utf8')
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.journal_path.open('ab') as f:
+            if f.tell() > self._journal_offset:
+                f.truncate(self._journal_offset)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_offset += len(line)
+        self._journal_entries += 1
+
+    def _compact(self):
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with tmp.open('w', encoding='utf8') as f:
+            json.dump(self._votes, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        # the snapshot now holds every event; keep them as history, then empty the journal
+        with self.journal_path.open('rb') as src:
+            events = src.read(self._journal_offset)
+        with self.history_path.open('ab') as dst:
+            dst.write(events)
+            dst.flush()
+            os.fsync(dst.fileno())
+        with self.journal_path.open('wb'):
+            pass
+        self._snapshot_key = self._stat_key()
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    def compact(self):
+        """Fold the journal into the snapshot now."""
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            if self._journal_entries and self._snapshot_ok:
+                self._compact()
+
+    def history(self, listing_id):
+        """Every recorded event for one listing, oldest first."""
+        key = str(listing_id)
+        events = []
+        with self._lock, self._file_lock(exclusive=False):
+            for path in (self.history_path, self.journal_path):
+                try:
+                    with path.open('rb') as f:
+                        for line in f:
+                            if not line.endswith(b'\n') or f'"{key}"'.encode() not in line:
+                                continue
+                            try:
+                                event = json.loads(line)
+                            except Exception:
+                                continue
+                            if str(event.get('id')) == key:
+                                events.append(event)
+                except OSError:
+                    continue
+        return events
@@ -14,10 +14,17 @@ import json
 import logging
 import os
 import ssl
+import sys
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+# vote_events.py lives in backend/: copied next to this script in the image,
+# the sibling directory in a checkout
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
+from vote_events import replay_journal
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,22 +40,75 @@ except ImportError:
     MQTT_AVAILABLE = False
     logger.warning("paho-mqtt not installed, MQTT notifications disabled")
 
+try:
+    import fcntl
+    FLOCK_AVAILABLE = True
+except ImportError:
+    FLOCK_AVAILABLE = False
+
+
+@contextmanager
+def votes_lock(votes_file: Path):
+    """Exclusive lock shared with the frontend's vote store (votes.lock)."""
+    if not FLOCK_AVAILABLE:
+        yield
+        return
+    with open(votes_file.with_suffix('.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
 
 def load_votes(votes_file: Path) -> dict:
-    """Load votes from votes.json."""
-    if not votes_file.exists():
+    """Load votes.json and apply the frontend's pending journal events (hold votes_lock)."""
+    votes = {}
+    if votes_file.exists():
+        with open(votes_file, 'r') as f:
+            votes = json.load(f)
+    else:
         logger.warning(f"Votes file not found: {votes_file}")
-        return {}
-    
-    with open(votes_file, 'r') as f:
-        return json.load(f)
 
+    journal = votes_file.with_suffix('.journal')
+    if journal.exists():
+        # one event line per change since the last compaction
+        replay_journal(votes, journal.read_bytes())
+    return votes
 
-def save_votes(votes: dict, votes_file: Path) -> None:
-    """Save updated votes to votes.json."""
-    with open(votes_file, 'w') as f:
-        json.dump(votes, f, indent=2)
-    logger.info(f"Saved updated votes to {votes_file}")
+
+def save_status_changes(votes: dict, listing_ids: list, votes_file: Path) -> None:
+    """Append a status event per changed listing to the vote log (hold votes_lock).
+
+    The frontend folds the log into votes.json on its next compaction.
+    """
+    if not listing_ids:
+        return
+    journal = votes_file.with_suffix('.journal')
+    ts = round(datetime.now().timestamp(), 3)
+    lines = b''.join(
+        (json.dumps({
+            'id': str(lid),
+            'ts': ts,
+            'event': 'status',
+            'by': 'rejection_scanner',
+            'set': {'workflow_status': votes[lid]['workflow_status']},
+        }) + '\n').encode('utf8')
+        for lid in listing_ids
+    )
+    with open(journal, 'ab') as f:
+        # drop a torn final line left by a crashed writer before appending
+        size = f.tell()
+        if size:
+            with open(journal, 'rb') as r:
+                r.seek(size - 1)
+                if r.read(1) != b'\n':
+                    r.seek(0)
+                    f.truncate(r.read().rfind(b'\n') + 1)
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    logger.info(f"Recorded {len(listing_ids)} status changes in {journal}")
 
 
 def process_votes(votes: dict) -> dict:
@@ -194,19 +254,20 @@ def main():
     
     logger.info(f"Starting rejection scanner with DATA_DIR={data_dir}")
     
-    if not votes_file.exists():
+    if not votes_file.exists() and not votes_file.with_suffix('.journal').exists():
         logger.error(f"Votes file not found: {votes_file}")
         return 1
     
-    # Load votes
-    votes = load_votes(votes_file)
-    logger.info(f"Loaded {len(votes)} listing vote records")
-    
-    # Process votes
-    stats = process_votes(votes)
-    
-    # Save updated votes
-    save_votes(votes, votes_file)
+    # Hold the lock from load to save so votes cast meanwhile aren't overwritten
+    with votes_lock(votes_file):
+        votes = load_votes(votes_file)
+        logger.info(f"Loaded {len(votes)} listing vote records")
+        
+        # Process votes
+        stats = process_votes(votes)
+        
+        # Record the changes in the vote log
+        save_status_changes(votes, stats['rejected_ids'] + stats['reviewed_ids'], votes_file)
     
     # Send MQTT notification
     send_mqtt_notification(stats)